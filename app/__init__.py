@@ -34,6 +34,42 @@ def create_app(config_class=None):
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
     app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'doc', 'docx'}
     
+    # Upload storage: 'local' (UPLOAD_FOLDER) or 's3' (any S3-compatible API, e.g. MinIO).
+    # S3 credentials come from the standard AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY variables.
+    app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'local')
+    app.config['S3_BUCKET'] = os.environ.get('S3_BUCKET')
+    app.config['S3_ENDPOINT_URL'] = os.environ.get('S3_ENDPOINT_URL')
+    app.config['S3_REGION'] = os.environ.get('S3_REGION')
+    app.config['S3_PREFIX'] = os.environ.get('S3_PREFIX', '')
+    app.config['S3_URL_EXPIRES'] = int(os.environ.get('S3_URL_EXPIRES', 3600))
+    
+    # Upload offload: behind nginx set UPLOAD_ACCEL_REDIRECT to an `internal` location
+    # aliased to UPLOAD_FOLDER; under Apache/lighttpd set USE_X_SENDFILE=true instead.
+    app.config['UPLOAD_ACCEL_REDIRECT'] = os.environ.get('UPLOAD_ACCEL_REDIRECT')
+    app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '').lower() == 'true'
+    
+    # Background threads rendering avatar/cover image variants
+    app.config['IMAGE_WORKERS'] = int(os.environ.get('IMAGE_WORKERS', 2))
+    
+    # Appointment times are stored as wall-clock times in SCHEDULING_TIMEZONE.
+    # Booking hours (24h clock) apply to developers without a weekly calendar.
+    app.config['SCHEDULING_TIMEZONE'] = os.environ.get('SCHEDULING_TIMEZONE', 'Asia/Kolkata')
+    app.config['SCHEDULING_DAY_START'] = int(os.environ.get('SCHEDULING_DAY_START', 9))
+    app.config['SCHEDULING_DAY_END'] = int(os.environ.get('SCHEDULING_DAY_END', 18))
+    app.config['SCHEDULING_SLOT_MINUTES'] = int(os.environ.get('SCHEDULING_SLOT_MINUTES', 30))
+    
+    # Reminder delivery: 'smtp' (defaults suit a local debugging server on port 1025),
+    # 'webhook' (JSON POST per message) or 'log'
+    app.config['NOTIFICATION_TRANSPORT'] = os.environ.get('NOTIFICATION_TRANSPORT', 'smtp')
+    app.config['SMTP_HOST'] = os.environ.get('SMTP_HOST', 'localhost')
+    app.config['SMTP_PORT'] = int(os.environ.get('SMTP_PORT', 1025))
+    app.config['SMTP_USERNAME'] = os.environ.get('SMTP_USERNAME')
+    app.config['SMTP_PASSWORD'] = os.environ.get('SMTP_PASSWORD')
+    app.config['SMTP_USE_TLS'] = os.environ.get('SMTP_USE_TLS', '').lower() == 'true'
+    app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', 'Asan DevNest <no-reply@asandevnest.com>')
+    app.config['NOTIFICATION_WEBHOOK_URL'] = os.environ.get('NOTIFICATION_WEBHOOK_URL')
+    app.config['NOTIFICATION_WEBHOOK_SECRET'] = os.environ.get('NOTIFICATION_WEBHOOK_SECRET')
+    
     # Create upload directories
     upload_dirs = ['kyc', 'articles', 'portfolios', 'projects', 'avatars']
     for dir_name in upload_dirs:
@@ -74,6 +110,18 @@ def create_app(config_class=None):
     app.register_blueprint(articles_bp, url_prefix='/community')
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # Keep profile stats, cached booking slots and calendar feeds in step with the rows they derive from
+    from app.utils.file_store import register_release_events
+    register_release_events()
+    from app.utils.counters import register_counter_events
+    register_counter_events()
+    from app.utils.scheduling import register_schedule_events
+    register_schedule_events()
+    from app.utils.calendar_feed import register_feed_events
+    register_feed_events()
+    from app.utils.message_hub import register_message_events
+    register_message_events()
+    
     # Create database tables
     with app.app_context():
         db.create_all()
@@ -81,8 +129,8 @@ def create_app(config_class=None):
     # Serve uploaded files
     @app.route('/uploads/<path:filename>')
     def uploaded_file(filename):
-        from flask import send_from_directory
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        from app.utils.upload_serving import serve_upload
+        return serve_upload(filename)
     
     # Register error handlers
     register_error_handlers(app)
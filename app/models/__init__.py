@@ -6,13 +6,15 @@ from app.models.user import User, DeveloperProfile, ClientProfile
 from app.models.article import Article, ArticleComment
 from app.models.project import Project, ProjectMessage
 from app.models.team import Team, TeamMember
-from app.models.appointment import Appointment
+from app.models.appointment import Appointment, AvailabilityRule
 from app.models.kyc import KYCDocument
+from app.models.stored_file import StoredFile, UploadSession
+from app.models.notification import ReminderDelivery
 
 from app.models.lead_management import (
     Lead, LeadFollowUp, StudentProject, Payment, 
     PaymentTransaction, ProjectDocument, DeveloperAssignment,
-    ProjectMilestone
+    ProjectMilestone, CallbackDailyStat, RevenueDailyFact, DeveloperPayout
 )
 
 __all__ = [
@@ -26,7 +28,11 @@ __all__ = [
     'Team',
     'TeamMember',
     'Appointment',
+    'AvailabilityRule',
     'KYCDocument',
+    'StoredFile',
+    'UploadSession',
+    'ReminderDelivery',
     'Lead',
     'LeadFollowUp',
     'StudentProject',
@@ -34,5 +40,8 @@ __all__ = [
     'PaymentTransaction',
     'ProjectDocument',
     'DeveloperAssignment',
-    'ProjectMilestone'
+    'ProjectMilestone',
+    'CallbackDailyStat',
+    'RevenueDailyFact',
+    'DeveloperPayout'
 ]
@@ -2,16 +2,20 @@
 Appointment Models - Booking system for 1-1 sessions
 """
 
-from datetime import datetime
+from datetime import datetime, date
 from app import db
 
 
 class Appointment(db.Model):
     """Appointments between clients and developers"""
     __tablename__ = 'appointments'
+    __table_args__ = (
+        # Conflict checks and slot searches scan one developer's bookings by time
+        db.Index('ix_appointments_developer_schedule', 'developer_id', 'scheduled_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    client_id = db.Column(db.Integer, db.ForeignKey('client_profiles.id'), nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('client_profiles.id'), nullable=False, index=True)
     developer_id = db.Column(db.Integer, db.ForeignKey('developer_profiles.id'), nullable=False)
     
     # Appointment Details
@@ -20,7 +24,7 @@ class Appointment(db.Model):
     description = db.Column(db.Text)
     
     # Schedule
-    scheduled_at = db.Column(db.DateTime, nullable=False)
+    scheduled_at = db.Column(db.DateTime, nullable=False, index=True)  # Reminder scans cover all developers
     duration_minutes = db.Column(db.Integer, default=60)
     timezone = db.Column(db.String(50), default='Asia/Kolkata')
     
@@ -51,6 +55,9 @@ class Appointment(db.Model):
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped on every ORM update; calendar feed ETags sum it, since updated_at
+    # only has second precision on MySQL
+    revision = db.Column(db.Integer, default=0, nullable=False)
     
     # Relationships
     developer = db.relationship('DeveloperProfile', backref='appointments')
@@ -115,3 +122,65 @@ class Appointment(db.Model):
     
     def __repr__(self):
         return f'<Appointment {self.id}>'
+
+
+@db.event.listens_for(Appointment, 'before_update')
+def _bump_appointment_revision(mapper, connection, target):
+    # Incremented in SQL, so concurrent writers never store the same revision
+    target.revision = Appointment.revision + 1
+
+
+class AvailabilityRule(db.Model):
+    """Weekly recurring window in which a developer takes bookings"""
+    __tablename__ = 'availability_rules'
+    
+    WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    
+    id = db.Column(db.Integer, primary_key=True)
+    developer_id = db.Column(db.Integer, db.ForeignKey('developer_profiles.id'), nullable=False, index=True)
+    
+    # Recurrence: every `interval_weeks` weeks on `weekday`, counted from valid_from
+    weekday = db.Column(db.Integer, nullable=False)  # 0 = Monday ... 6 = Sunday
+    interval_weeks = db.Column(db.Integer, default=1, nullable=False)
+    valid_from = db.Column(db.Date, default=date.today, nullable=False)
+    valid_until = db.Column(db.Date)  # Inclusive; open-ended when empty
+    
+    # Window, as wall-clock times in the developer's timezone
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    timezone = db.Column(db.String(50), default='Asia/Kolkata', nullable=False)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    developer = db.relationship('DeveloperProfile', backref=db.backref('availability_rules', lazy='dynamic',
+                                                                       cascade='all, delete-orphan'))
+    
+    def get_weekday_display(self):
+        return self.WEEKDAYS[self.weekday]
+    
+    def occurs_on(self, day):
+        """Whether the window recurs on `day` (a date in the rule's timezone)"""
+        if day.weekday() != self.weekday or day < self.valid_from:
+            return False
+        if self.valid_until and day > self.valid_until:
+            return False
+        return ((day - self.valid_from).days // 7) % (self.interval_weeks or 1) == 0
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'developer_id': self.developer_id,
+            'weekday': self.weekday,
+            'weekday_display': self.get_weekday_display(),
+            'interval_weeks': self.interval_weeks,
+            'start_time': self.start_time.strftime('%H:%M'),
+            'end_time': self.end_time.strftime('%H:%M'),
+            'timezone': self.timezone,
+            'valid_from': self.valid_from.isoformat() if self.valid_from else None,
+            'valid_until': self.valid_until.isoformat() if self.valid_until else None
+        }
+    
+    def __repr__(self):
+        return f'<AvailabilityRule {self.developer_id} {self.get_weekday_display()} {self.start_time}-{self.end_time}>'
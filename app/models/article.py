@@ -74,10 +74,11 @@ class Article(db.Model):
         """Set technologies from Python list"""
         self.technologies = json.dumps(tech_list)
     
-    def get_cover_url(self):
-        """Return cover image URL or default"""
+    def get_cover_url(self, size='card'):
+        """Return cover image URL (a resized variant: thumb, card or full) or default"""
         if self.cover_image:
-            return f'/uploads/articles/{self.cover_image}'
+            from app.utils.images import variant_url
+            return variant_url('articles', self.cover_image, size)
         return '/static/images/default-article-cover.jpg'
     
     def get_reading_time(self):
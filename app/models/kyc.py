@@ -32,12 +32,26 @@ class KYCDocument(db.Model):
     reviewed_at = db.Column(db.DateTime)
     admin_notes = db.Column(db.Text)  # Internal notes
     
+    # Automated pre-checks (see app.utils.kyc_checks)
+    check_status = db.Column(db.String(20), default='pending')  # pending, done, failed
+    detected_type = db.Column(db.String(20))  # From magic bytes: jpeg, png, gif, pdf, unknown
+    image_width = db.Column(db.Integer)
+    image_height = db.Column(db.Integer)
+    sharpness = db.Column(db.Float)
+    perceptual_hash = db.Column(db.String(16), index=True)
+    page_count = db.Column(db.Integer)
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey('kyc_documents.id'))
+    confidence = db.Column(db.Float, index=True)  # 0-1, higher needs less scrutiny
+    check_notes = db.Column(db.Text)  # Issues found, one per line
+    checked_at = db.Column(db.DateTime)
+    
     # Timestamps
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     reviewer = db.relationship('User', foreign_keys=[reviewed_by], backref='kyc_reviews')
+    duplicate_of = db.relationship('KYCDocument', remote_side=[id])
     
     def get_document_type_display(self):
         """Return human-readable document type"""
@@ -65,6 +79,18 @@ class KYCDocument(db.Model):
         }
         return status_classes.get(self.status, 'bg-gray-100 text-gray-800')
     
+    def get_check_issues(self):
+        return self.check_notes.splitlines() if self.check_notes else []
+    
+    def get_confidence_badge_class(self):
+        if self.confidence is None:
+            return 'bg-gray-100 text-gray-800'
+        if self.confidence >= 0.8:
+            return 'bg-green-100 text-green-800'
+        if self.confidence >= 0.5:
+            return 'bg-yellow-100 text-yellow-800'
+        return 'bg-red-100 text-red-800'
+    
     def approve(self, admin_id, notes=None):
         """Approve the KYC document"""
         self.status = 'approved'
@@ -15,11 +15,16 @@ class Lead(db.Model):
     phone = db.Column(db.String(20), nullable=False)
     email = db.Column(db.String(120))
     college = db.Column(db.String(200))
-    domain = db.Column(db.String(100))  # AI, Web, IoT, etc.
+    domain = db.column_property(db.Column(db.String(100)), active_history=True)  # AI, Web, IoT, etc.
     source = db.Column(db.String(50))  # call, WhatsApp, referral, website
     requirement_summary = db.Column(db.Text)
     status = db.Column(db.String(30), default='New Lead')  # New, Follow-up, Interested, Confirmed, Dropped
     
+    # Deduplication keys (kept in sync on insert/update)
+    phone_normalized = db.Column(db.String(20), index=True)  # E.164
+    email_normalized = db.Column(db.String(120), index=True)  # Lowercased
+    match_key = db.Column(db.String(50), index=True)  # Blocking key for fuzzy name+college matching
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -41,6 +46,18 @@ class Lead(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+    def update_match_keys(self):
+        """Recompute the normalized dedup columns from the raw fields"""
+        from app.utils.lead_dedup import match_keys
+        for column, value in match_keys(self.student_name, self.phone, self.email, self.college).items():
+            setattr(self, column, value)
+
+
+@db.event.listens_for(Lead, 'before_insert')
+@db.event.listens_for(Lead, 'before_update')
+def _sync_lead_match_keys(mapper, connection, target):
+    target.update_match_keys()
+
 class LeadFollowUp(db.Model):
     """Follow-up tracking for Leads"""
     __tablename__ = 'lead_follow_ups'
@@ -49,22 +66,49 @@ class LeadFollowUp(db.Model):
     lead_id = db.Column(db.Integer, db.ForeignKey('leads.id'), nullable=False)
     interaction_notes = db.Column(db.Text, nullable=False)
     callback_datetime = db.Column(db.DateTime)
+    callback_status = db.Column(db.String(20))  # pending, done, missed (None if no callback)
     status_at_time = db.Column(db.String(30))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))  # Admin who made the call
     
     # Relationship
     user = db.relationship('User', foreign_keys=[created_by])
+    
+    # Due-queue lookups: time window first, then rep
+    __table_args__ = (db.Index('ix_follow_ups_callback_due', 'callback_datetime', 'created_by'),)
+
+    def is_overdue(self, now=None):
+        from app.utils.scheduling import platform_now
+        return (self.callback_status == 'pending' and self.callback_datetime is not None
+                and self.callback_datetime < (now or platform_now()))
+
+class CallbackDailyStat(db.Model):
+    """Per-rep, per-day callback counts rolled up by the callback sweeper"""
+    __tablename__ = 'callback_daily_stats'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    
+    scheduled = db.Column(db.Integer, default=0)
+    completed = db.Column(db.Integer, default=0)
+    missed = db.Column(db.Integer, default=0)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    user = db.relationship('User', foreign_keys=[user_id])
+    
+    __table_args__ = (db.UniqueConstraint('day', 'user_id', name='unique_callback_day_user'),)
 
 class StudentProject(db.Model):
     """Confirmed Student Projects"""
     __tablename__ = 'student_projects'
     
     id = db.Column(db.Integer, primary_key=True)
-    lead_id = db.Column(db.Integer, db.ForeignKey('leads.id'), unique=True) # Linked if converted from lead
+    lead_id = db.column_property(db.Column(db.Integer, db.ForeignKey('leads.id'), unique=True), active_history=True) # Linked if converted from lead
     
     # Responsibility tracking
-    closed_by_id = db.Column(db.Integer, db.ForeignKey('users.id'))  # Sales rep / Admin who closed the deal
+    closed_by_id = db.column_property(db.Column(db.Integer, db.ForeignKey('users.id')), active_history=True)  # Sales rep / Admin who closed the deal
     confirmed_by_id = db.Column(db.Integer, db.ForeignKey('users.id'))  # Admin who performed confirmation
 
     
@@ -110,16 +154,16 @@ class Payment(db.Model):
     __tablename__ = 'payments'
     
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('student_projects.id'), nullable=False)
+    project_id = db.column_property(db.Column(db.Integer, db.ForeignKey('student_projects.id'), nullable=False), active_history=True)
     
-    total_cost = db.Column(db.Numeric(12, 2), nullable=False)
+    total_cost = db.column_property(db.Column(db.Numeric(12, 2), nullable=False), active_history=True)
     payment_structure = db.Column(db.String(100))  # e.g., "50% Advance, 50% Delivery"
     amount_paid = db.Column(db.Numeric(12, 2), default=0.0)
     pending_balance = db.Column(db.Numeric(12, 2))
     payment_mode = db.Column(db.String(50))  # UPI, Cash, Bank Transfer
     invoice_ref = db.Column(db.String(50))
     
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.column_property(db.Column(db.DateTime, default=datetime.utcnow), active_history=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
@@ -130,12 +174,12 @@ class PaymentTransaction(db.Model):
     __tablename__ = 'payment_transactions'
     
     id = db.Column(db.Integer, primary_key=True)
-    payment_id = db.Column(db.Integer, db.ForeignKey('payments.id'), nullable=False)
+    payment_id = db.column_property(db.Column(db.Integer, db.ForeignKey('payments.id'), nullable=False), active_history=True)
     
-    amount = db.Column(db.Numeric(12, 2), nullable=False)
+    amount = db.column_property(db.Column(db.Numeric(12, 2), nullable=False), active_history=True)
     payment_mode = db.Column(db.String(50))
     invoice_ref = db.Column(db.String(100))
-    transaction_date = db.Column(db.DateTime, default=datetime.utcnow)
+    transaction_date = db.column_property(db.Column(db.DateTime, default=datetime.utcnow), active_history=True)
     notes = db.Column(db.Text)
 
 class ProjectDocument(db.Model):
@@ -169,14 +213,117 @@ class DeveloperAssignment(db.Model):
     __tablename__ = 'developer_assignments'
     
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('student_projects.id'), nullable=False)
+    project_id = db.column_property(db.Column(db.Integer, db.ForeignKey('student_projects.id'), nullable=False), active_history=True)
     developer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     role = db.Column(db.String(50), default='Developer')  # Developer, Mentor
-    payout_amount = db.Column(db.Numeric(12, 2), default=0.0)
+    payout_amount = db.column_property(db.Column(db.Numeric(12, 2), default=0.0), active_history=True)
     internal_notes = db.Column(db.Text)
     
-    assigned_at = db.Column(db.DateTime, default=datetime.utcnow)
+    assigned_at = db.column_property(db.Column(db.DateTime, default=datetime.utcnow), active_history=True)
     
     # Relationship to get developer info easily
     developer = db.relationship('User', foreign_keys=[developer_id])
+
+class DeveloperPayout(db.Model):
+    """Money paid out to a developer against an assignment"""
+    __tablename__ = 'developer_payouts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('developer_assignments.id'), nullable=False, index=True)
+    developer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    
+    amount = db.Column(db.Numeric(12, 2), nullable=False)
+    reference = db.Column(db.String(100))  # UTR / transfer ref
+    notes = db.Column(db.Text)
+    paid_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    
+    assignment = db.relationship('DeveloperAssignment', backref=db.backref('payouts', lazy=True, cascade="all, delete-orphan"))
+    developer = db.relationship('User', foreign_keys=[developer_id])
+
+class RevenueDailyFact(db.Model):
+    """Revenue per closer, per day, per domain - kept current by the listeners below"""
+    __tablename__ = 'revenue_daily_facts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    closer_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    domain = db.Column(db.String(100), nullable=False)
+    
+    projects_closed = db.Column(db.Integer, default=0)
+    booked_revenue = db.Column(db.Numeric(14, 2), default=0)  # Payment.total_cost
+    collected = db.Column(db.Numeric(14, 2), default=0)  # PaymentTransaction.amount
+    dev_cost = db.Column(db.Numeric(14, 2), default=0)  # DeveloperAssignment.payout_amount
+    
+    closer = db.relationship('User', foreign_keys=[closer_id])
+    
+    __table_args__ = (db.UniqueConstraint('day', 'closer_id', 'domain', name='unique_revenue_fact'),)
+
+
+# The columns these listeners read are declared with active_history=True, so an
+# edit loads the old value and the facts can take back what the row contributed
+@db.event.listens_for(Payment, 'after_insert')
+def _fact_payment_booked(mapper, connection, target):
+    from app.utils.revenue_facts import record_payment
+    record_payment(connection, target)
+
+
+@db.event.listens_for(Payment, 'after_update')
+def _fact_payment_changed(mapper, connection, target):
+    from app.utils.revenue_facts import update_payment
+    update_payment(connection, target)
+
+
+@db.event.listens_for(Payment, 'after_delete')
+def _fact_payment_removed(mapper, connection, target):
+    from app.utils.revenue_facts import remove_payment
+    remove_payment(connection, target)
+
+
+@db.event.listens_for(PaymentTransaction, 'after_insert')
+def _fact_transaction_collected(mapper, connection, target):
+    from app.utils.revenue_facts import record_transaction
+    record_transaction(connection, target)
+
+
+@db.event.listens_for(PaymentTransaction, 'after_update')
+def _fact_transaction_changed(mapper, connection, target):
+    from app.utils.revenue_facts import update_transaction
+    update_transaction(connection, target)
+
+
+@db.event.listens_for(PaymentTransaction, 'after_delete')
+def _fact_transaction_removed(mapper, connection, target):
+    from app.utils.revenue_facts import remove_transaction
+    remove_transaction(connection, target)
+
+
+@db.event.listens_for(DeveloperAssignment, 'after_insert')
+def _fact_assignment_cost(mapper, connection, target):
+    from app.utils.revenue_facts import record_assignment
+    record_assignment(connection, target)
+
+
+@db.event.listens_for(DeveloperAssignment, 'after_update')
+def _fact_assignment_changed(mapper, connection, target):
+    from app.utils.revenue_facts import update_assignment
+    update_assignment(connection, target)
+
+
+@db.event.listens_for(DeveloperAssignment, 'after_delete')
+def _fact_assignment_removed(mapper, connection, target):
+    from app.utils.revenue_facts import remove_assignment
+    remove_assignment(connection, target)
+
+
+@db.event.listens_for(StudentProject, 'after_update')
+def _fact_project_moved(mapper, connection, target):
+    from app.utils.revenue_facts import update_project_dims
+    update_project_dims(connection, target)
+
+
+@db.event.listens_for(Lead, 'after_update')
+def _fact_lead_domain_changed(mapper, connection, target):
+    from app.utils.revenue_facts import update_lead_domain
+    update_lead_domain(connection, target)
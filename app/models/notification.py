@@ -0,0 +1,36 @@
+"""
+Notification Models - Delivery log that makes reminders idempotent
+"""
+
+from datetime import datetime
+from app import db
+
+
+class ReminderDelivery(db.Model):
+    """One reminder item for one recipient; the unique key stops it being sent twice"""
+    __tablename__ = 'reminder_deliveries'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # e.g. appointment:12:1h:202501061530:7 - changes if the appointment is rescheduled
+    idempotency_key = db.Column(db.String(120), unique=True, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # appointment, callback
+    recipient_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    transport = db.Column(db.String(20))
+    
+    # Status
+    status = db.Column(db.String(20), default='sending', nullable=False)  # sending, sent, failed
+    attempts = db.Column(db.Integer, default=1, nullable=False)
+    last_error = db.Column(db.Text)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    
+    # Retry scans look for failed or abandoned rows
+    __table_args__ = (db.Index('ix_reminder_deliveries_status', 'status', 'updated_at'),)
+    
+    recipient = db.relationship('User', foreign_keys=[recipient_id])
+    
+    def __repr__(self):
+        return f'<ReminderDelivery {self.idempotency_key} {self.status}>'
@@ -118,6 +118,10 @@ class Project(db.Model):
 class ProjectMessage(db.Model):
     """Messages/updates for projects"""
     __tablename__ = 'project_messages'
+    __table_args__ = (
+        # Message history pages walk one project's thread newest-first by (created_at, id)
+        db.Index('ix_project_messages_history', 'project_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
@@ -129,7 +133,8 @@ class ProjectMessage(db.Model):
     
     is_internal = db.Column(db.Boolean, default=False)  # Admin-only message
     
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Part of the history cursor, so never NULL (update_db_message_history.py backfills old rows)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
     # Relationships
     sender = db.relationship('User', backref='project_messages')
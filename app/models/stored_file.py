@@ -0,0 +1,66 @@
+"""
+Stored File Models - Content-addressed upload blobs
+"""
+
+from datetime import datetime
+from app import db
+
+
+class StoredFile(db.Model):
+    """One physical upload per (folder, SHA-256), shared by every record that references it"""
+    __tablename__ = 'stored_files'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    folder = db.Column(db.String(50), nullable=False)  # avatars, articles, kyc, projects
+    sha256 = db.Column(db.String(64), nullable=False)
+    path = db.Column(db.String(255), nullable=False)  # Relative to the folder, e.g. ab/abcd...ef.pdf
+    size = db.Column(db.Integer)
+    
+    ref_count = db.Column(db.Integer, default=1, nullable=False)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('folder', 'sha256', name='unique_stored_file_hash'),
+        db.Index('ix_stored_files_folder_path', 'folder', 'path'),
+    )
+    
+    def __repr__(self):
+        return f'<StoredFile {self.folder}/{self.path} x{self.ref_count}>'
+
+
+class UploadSession(db.Model):
+    """A chunked upload in progress; chunks are appended to a file under uploads/.incoming"""
+    __tablename__ = 'upload_sessions'
+    
+    id = db.Column(db.String(32), primary_key=True)  # Random hex token, also the temp file name
+    folder = db.Column(db.String(50), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('student_projects.id'))
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    original_name = db.Column(db.String(255), nullable=False)
+    document_type = db.Column(db.String(50))
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    received_bytes = db.Column(db.BigInteger, default=0, nullable=False)
+    
+    status = db.Column(db.String(20), default='open')  # open, complete
+    document_id = db.Column(db.Integer, db.ForeignKey('project_documents.id'))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'filename': self.original_name,
+            'size': self.total_size,
+            'chunk_size': self.chunk_size,
+            'offset': self.received_bytes,
+            'status': self.status,
+            'document_id': self.document_id
+        }
+    
+    def __repr__(self):
+        return f'<UploadSession {self.id} {self.received_bytes}/{self.total_size}>'
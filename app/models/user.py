@@ -52,10 +52,11 @@ class User(UserMixin, db.Model):
     def is_verified(self):
         return self.status == 'verified'
     
-    def get_avatar_url(self):
-        """Return avatar URL or default"""
+    def get_avatar_url(self, size='thumb'):
+        """Return avatar URL (a resized variant: thumb, card or full) or default"""
         if self.avatar:
-            return f'/uploads/avatars/{self.avatar}'
+            from app.utils.images import variant_url
+            return variant_url('avatars', self.avatar, size)
         return '/static/images/default-avatar.png'
     
     def to_dict(self):
@@ -103,9 +104,10 @@ class DeveloperProfile(db.Model):
     twitter_url = db.Column(db.String(255))
     
     # Stats
-    articles_count = db.Column(db.Integer, default=0)
+    # Maintained by app.utils.counters - do not edit directly
+    articles_count = db.Column(db.Integer, default=0, index=True)
     projects_completed = db.Column(db.Integer, default=0)
-    rating = db.Column(db.Numeric(3, 2), default=0.0)
+    rating = db.Column(db.Numeric(3, 2), default=0.0, index=True)
     reviews_count = db.Column(db.Integer, default=0)
     
     # Relationships
@@ -176,7 +178,7 @@ class ClientProfile(db.Model):
     contact_name = db.Column(db.String(100))
     contact_position = db.Column(db.String(100))
     
-    # Stats
+    # Stats, maintained by app.utils.counters
     projects_submitted = db.Column(db.Integer, default=0)
     projects_completed = db.Column(db.Integer, default=0)
     
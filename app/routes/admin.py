@@ -5,9 +5,13 @@ Admin Routes - Admin dashboard and management
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from app import db
-from app.models import User, DeveloperProfile, ClientProfile, Article, Project, Team, TeamMember, Appointment, KYCDocument
+from app.models import User, ClientProfile, Article, Project, Team, TeamMember, Appointment, KYCDocument
 from app.utils.decorators import admin_required
-from app.utils.helpers import save_file
+from app.utils.helpers import save_file, delete_file
+from app.utils.matching import match_developers_for_project, search_developers
+from app.utils.kyc_review import review_documents
+from app.utils.moderation import moderate_articles, moderate_developers
+from app.utils.message_hub import message_page
 from datetime import datetime, timedelta
 
 admin_bp = Blueprint('admin', __name__)
@@ -141,8 +145,7 @@ def developer_detail(user_id):
 def verify_developer(user_id):
     """Verify a developer"""
     user = User.query.filter_by(id=user_id, role='developer').first_or_404()
-    user.status = 'verified'
-    db.session.commit()
+    moderate_developers([user_id], 'verify')
     
     flash(f'{user.full_name} has been verified successfully.', 'success')
     return redirect(url_for('admin.developer_detail', user_id=user_id))
@@ -156,8 +159,7 @@ def reject_developer(user_id):
     user = User.query.filter_by(id=user_id, role='developer').first_or_404()
     reason = request.form.get('reason', '')
     
-    user.status = 'rejected'
-    db.session.commit()
+    moderate_developers([user_id], 'reject')
     
     flash(f'{user.full_name} has been rejected.', 'warning')
     return redirect(url_for('admin.developer_detail', user_id=user_id))
@@ -169,13 +171,49 @@ def reject_developer(user_id):
 def suspend_developer(user_id):
     """Suspend a developer"""
     user = User.query.filter_by(id=user_id, role='developer').first_or_404()
-    user.status = 'suspended'
-    db.session.commit()
+    moderate_developers([user_id], 'suspend')
     
     flash(f'{user.full_name} has been suspended.', 'warning')
     return redirect(url_for('admin.developer_detail', user_id=user_id))
 
 
+def _bulk_response(summary, noun, redirect_url):
+    """JSON per-item summary for API callers, otherwise a flash and redirect"""
+    if request.is_json or request.accept_mimetypes.best == 'application/json':
+        return jsonify(summary)
+    
+    message = f"{summary['updated']} {noun} updated"
+    if summary['unchanged']:
+        message += f", {summary['unchanged']} already in that state"
+    if summary['not_found']:
+        message += f", {summary['not_found']} not found"
+    flash(message + '.', 'success')
+    return redirect(redirect_url)
+
+
+def _bulk_ids(field):
+    if request.is_json:
+        return [int(i) for i in (request.get_json().get(field) or [])]
+    return request.form.getlist(field, type=int)
+
+
+@admin_bp.route('/developers/bulk', methods=['POST'])
+@login_required
+@admin_required
+def bulk_moderate_developers():
+    """Verify, reject or suspend a selection of developers"""
+    data = request.get_json() if request.is_json else request.form
+    redirect_url = url_for('admin.developers', status=data.get('status', ''))
+    try:
+        summary = moderate_developers(_bulk_ids('user_ids'), data.get('action'))
+    except (TypeError, ValueError) as e:
+        if request.is_json:
+            return jsonify({'error': str(e)}), 400
+        flash(str(e), 'danger')
+        return redirect(redirect_url)
+    return _bulk_response(summary, 'developers', redirect_url)
+
+
 # ============ KYC Management ============
 
 @admin_bp.route('/kyc')
@@ -185,19 +223,29 @@ def kyc_list():
     """List all KYC submissions"""
     page = request.args.get('page', 1, type=int)
     status = request.args.get('status', 'pending')
+    sort = request.args.get('sort', 'newest')
     
     query = KYCDocument.query
     
     if status:
         query = query.filter_by(status=status)
     
-    kyc_docs = query.order_by(KYCDocument.submitted_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    # Pre-check confidence: unchecked documents always sort last
+    if sort == 'confidence':
+        query = query.order_by(KYCDocument.confidence.is_(None), KYCDocument.confidence.desc(),
+                               KYCDocument.submitted_at.asc())
+    elif sort == 'risk':
+        query = query.order_by(KYCDocument.confidence.is_(None), KYCDocument.confidence.asc(),
+                               KYCDocument.submitted_at.asc())
+    else:
+        query = query.order_by(KYCDocument.submitted_at.desc())
+    
+    kyc_docs = query.paginate(page=page, per_page=20, error_out=False)
     
     return render_template('admin/kyc_list.html',
                          kyc_docs=kyc_docs,
-                         current_status=status)
+                         current_status=status,
+                         current_sort=sort)
 
 
 @admin_bp.route('/kyc/<int:kyc_id>')
@@ -214,17 +262,10 @@ def kyc_detail(kyc_id):
 @admin_required
 def approve_kyc(kyc_id):
     """Approve KYC document"""
-    kyc = KYCDocument.query.get_or_404(kyc_id)
+    KYCDocument.query.get_or_404(kyc_id)
     notes = request.form.get('notes', '')
     
-    kyc.approve(current_user.id, notes)
-    
-    # Check if all KYC documents are approved
-    all_approved = all(doc.status == 'approved' for doc in kyc.user.kyc_documents)
-    if all_approved:
-        kyc.user.status = 'verified'
-    
-    db.session.commit()
+    review_documents([kyc_id], 'approve', current_user.id, notes=notes)
     
     flash('KYC document approved successfully.', 'success')
     return redirect(url_for('admin.kyc_list'))
@@ -235,17 +276,50 @@ def approve_kyc(kyc_id):
 @admin_required
 def reject_kyc(kyc_id):
     """Reject KYC document"""
-    kyc = KYCDocument.query.get_or_404(kyc_id)
+    KYCDocument.query.get_or_404(kyc_id)
     reason = request.form.get('reason', 'Document rejected')
     notes = request.form.get('notes', '')
     
-    kyc.reject(current_user.id, reason, notes)
-    db.session.commit()
+    review_documents([kyc_id], 'reject', current_user.id, reason=reason, notes=notes)
     
     flash('KYC document rejected.', 'warning')
     return redirect(url_for('admin.kyc_list'))
 
 
+@admin_bp.route('/kyc/bulk', methods=['POST'])
+@login_required
+@admin_required
+def bulk_review_kyc():
+    """Approve or reject a selection of KYC documents in one transaction"""
+    action = request.form.get('action')
+    doc_ids = request.form.getlist('kyc_ids', type=int)
+    redirect_url = url_for('admin.kyc_list', status=request.form.get('status', 'pending'),
+                           sort=request.form.get('sort', 'newest'))
+    
+    if not doc_ids:
+        flash('Select at least one document.', 'warning')
+        return redirect(redirect_url)
+    if action == 'reject' and not request.form.get('reason', '').strip():
+        flash('A rejection reason is required.', 'danger')
+        return redirect(redirect_url)
+    
+    try:
+        result = review_documents(doc_ids, action, current_user.id,
+                                  reason=request.form.get('reason', '').strip(),
+                                  notes=request.form.get('notes', ''))
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(redirect_url)
+    
+    message = f"{result['updated']} documents {'approved' if action == 'approve' else 'rejected'}"
+    if result['skipped']:
+        message += f", {result['skipped']} already reviewed"
+    if result['verified_users']:
+        message += f", {result['verified_users']} developers verified"
+    flash(message + '.', 'success' if action == 'approve' else 'warning')
+    return redirect(redirect_url)
+
+
 # ============ Article Management ============
 
 @admin_bp.route('/articles')
@@ -284,19 +358,8 @@ def article_detail(article_id):
 @admin_required
 def approve_article(article_id):
     """Approve an article"""
-    article = Article.query.get_or_404(article_id)
-    article.status = 'approved'
-    article.reviewed_by = current_user.id
-    article.reviewed_at = datetime.utcnow()
-    article.published_at = datetime.utcnow()
-    
-    # Update developer's article count
-    if article.developer:
-        article.developer.articles_count = Article.query.filter_by(
-            developer_id=article.developer_id, status='approved'
-        ).count() + 1
-    
-    db.session.commit()
+    Article.query.get_or_404(article_id)
+    moderate_articles([article_id], 'approve', current_user.id)
     
     flash('Article approved and published.', 'success')
     return redirect(url_for('admin.articles'))
@@ -307,20 +370,33 @@ def approve_article(article_id):
 @admin_required
 def reject_article(article_id):
     """Reject an article"""
-    article = Article.query.get_or_404(article_id)
+    Article.query.get_or_404(article_id)
     reason = request.form.get('reason', '')
     
-    article.status = 'rejected'
-    article.rejection_reason = reason
-    article.reviewed_by = current_user.id
-    article.reviewed_at = datetime.utcnow()
-    
-    db.session.commit()
+    moderate_articles([article_id], 'reject', current_user.id, reason=reason)
     
     flash('Article rejected.', 'warning')
     return redirect(url_for('admin.articles'))
 
 
+@admin_bp.route('/articles/bulk', methods=['POST'])
+@login_required
+@admin_required
+def bulk_moderate_articles():
+    """Approve, reject or hide a selection of articles"""
+    data = request.get_json() if request.is_json else request.form
+    redirect_url = url_for('admin.articles', status=data.get('status', ''))
+    try:
+        summary = moderate_articles(_bulk_ids('article_ids'), data.get('action'), current_user.id,
+                                    reason=data.get('reason') or 'Does not meet quality standards')
+    except (TypeError, ValueError) as e:
+        if request.is_json:
+            return jsonify({'error': str(e)}), 400
+        flash(str(e), 'danger')
+        return redirect(redirect_url)
+    return _bulk_response(summary, 'articles', redirect_url)
+
+
 @admin_bp.route('/article/<int:article_id>/edit', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -350,7 +426,8 @@ def edit_article(article_id):
                 # Save new file
                 filename = save_file(file, 'articles')
                 if filename:
-                    # Update article
+                    # Update article, releasing the previous cover
+                    delete_file(article.cover_image, 'articles')
                     article.cover_image = filename
                 else:
                     flash('Invalid image file. Allowed formats: PNG, JPG, JPEG, GIF.', 'warning')
@@ -374,9 +451,8 @@ def edit_article(article_id):
 @admin_required
 def hide_article(article_id):
     """Hide (unpublish) an article"""
-    article = Article.query.get_or_404(article_id)
-    article.status = 'hidden'
-    db.session.commit()
+    Article.query.get_or_404(article_id)
+    moderate_articles([article_id], 'hide', current_user.id)
     
     flash('Article has been hidden from the community.', 'info')
     return redirect(url_for('admin.articles'))
@@ -391,7 +467,6 @@ def delete_article(article_id):
     
     # Delete cover image if exists
     if article.cover_image:
-        from app.utils.helpers import delete_file
         delete_file(article.cover_image, 'articles')
         
     db.session.delete(article)
@@ -432,16 +507,15 @@ def project_detail(project_id):
     """Project detail page"""
     project = Project.query.get_or_404(project_id)
     
-    # Get available developers for team formation
-    available_developers = DeveloperProfile.query\
-        .join(User)\
-        .filter(User.status == 'verified')\
-        .filter(DeveloperProfile.availability == 'available')\
-        .all()
+    # Ranked shortlist for team formation
+    matches = match_developers_for_project(project)
     
+    messages, older_cursor = message_page(project.id, include_internal=True)
     return render_template('admin/project_detail.html',
                          project=project,
-                         available_developers=available_developers)
+                         matches=matches,
+                         available_developers=[m['developer'] for m in matches],
+                         messages=messages, older_cursor=older_cursor)
 
 
 @admin_bp.route('/project/<int:project_id>/update-status', methods=['POST'])
@@ -543,14 +617,15 @@ def create_team():
         Project.status.in_(['submitted', 'reviewing', 'approved'])
     ).all()
     
-    available_developers = DeveloperProfile.query\
-        .join(User)\
-        .filter(User.status == 'verified')\
-        .all()
+    # Rank developers against the selected project (or by load alone)
+    selected_project_id = request.args.get('project_id', type=int)
+    selected_project = Project.query.get(selected_project_id) if selected_project_id else None
+    matches = match_developers_for_project(selected_project)
     
     return render_template('admin/create_team.html',
                          available_projects=available_projects,
-                         available_developers=available_developers)
+                         selected_project_id=selected_project_id,
+                         matches=matches)
 
 
 @admin_bp.route('/team/<int:team_id>')
@@ -560,14 +635,46 @@ def team_detail(team_id):
     """Team detail page"""
     team = Team.query.get_or_404(team_id)
     
-    available_developers = DeveloperProfile.query\
-        .join(User)\
-        .filter(User.status == 'verified')\
-        .all()
+    # Rank developers against the team's project, skipping current members
+    member_ids = [m.developer_id for m in team.members]
+    matches = match_developers_for_project(team.project, exclude_ids=member_ids)
     
     return render_template('admin/team_detail.html',
                          team=team,
-                         available_developers=available_developers)
+                         matches=matches)
+
+
+def _developer_option(developer, match=None):
+    option = {
+        'id': developer.id,
+        'name': developer.user.full_name,
+        'experience_years': developer.experience_years or 0,
+        'avatar_url': developer.user.get_avatar_url(),
+    }
+    if match:
+        option.update(score=match['score'], load=match['load'], matched_skills=match['matched_skills'])
+    return option
+
+
+@admin_bp.route('/developers/matches.json')
+@login_required
+@admin_required
+def developer_matches():
+    """Ranked shortlist for a project (or by load alone), for refreshing the team form without a reload"""
+    project_id = request.args.get('project_id', type=int)
+    project = Project.query.get(project_id) if project_id else None
+    matches = match_developers_for_project(project)
+    return jsonify({'developers': [_developer_option(m['developer'], m) for m in matches]})
+
+
+@admin_bp.route('/developers/lookup.json')
+@login_required
+@admin_required
+def developer_lookup():
+    """Verified developers by name or email, for picking someone outside the ranked shortlist"""
+    exclude_ids = [int(i) for i in request.args.get('exclude', '').split(',') if i.isdigit()]
+    developers = search_developers(request.args.get('q'), exclude_ids=exclude_ids)
+    return jsonify({'developers': [_developer_option(d) for d in developers]})
 
 
 @admin_bp.route('/team/<int:team_id>/add-member', methods=['POST'])
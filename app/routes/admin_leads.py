@@ -8,11 +8,20 @@ from app import db
 from app.models import (
     User, Lead, LeadFollowUp, StudentProject, 
     Payment, PaymentTransaction, ProjectDocument, DeveloperAssignment, DeveloperProfile,
-    ProjectMilestone
+    ProjectMilestone, DeveloperPayout, UploadSession
 )
 from app.utils.decorators import admin_required
 from app.utils.helpers import save_file
-from datetime import datetime
+from app.utils.matching import recommend_assignees, invalidate_assignment_loads
+from app.utils.lead_dedup import find_duplicates, merge_leads
+from app.utils.callback_queue import get_rep_queue, get_queue_counts, close_pending_callbacks
+from app.utils.scheduling import platform_now
+from app.utils.revenue_facts import get_revenue_totals, get_leaderboard, revenue_by_period, PERIODS
+from app.utils.lead_funnel import get_funnel
+from app.utils.payouts import build_statements, render_statements, current_period, period_bounds
+from app.utils.ar_aging import aging_query, aging_summary, stream_aging_csv, days_outstanding, AGING_BUCKETS
+from app.utils.chunked_upload import init_upload, append_chunk, complete_upload, ChunkOffsetError
+from datetime import datetime, timedelta
 from decimal import Decimal
 import os
 import json
@@ -24,9 +33,10 @@ admin_leads_bp = Blueprint('admin_leads', __name__)
 @admin_required
 def dashboard():
     """Lead Management Dashboard"""
-    # Financial Stats
-    total_revenue = db.session.query(db.func.sum(Payment.total_cost)).scalar() or 0
-    total_dev_cost = db.session.query(db.func.sum(DeveloperAssignment.payout_amount)).scalar() or 0
+    # Financial Stats (pre-aggregated daily facts)
+    totals = get_revenue_totals()
+    total_revenue = totals['booked_revenue']
+    total_dev_cost = totals['dev_cost']
     total_profit = Decimal(total_revenue) - Decimal(total_dev_cost)
     
     stats = {
@@ -35,32 +45,189 @@ def dashboard():
         'confirmed_projects': StudentProject.query.count(),
         'ongoing_projects': StudentProject.query.filter(StudentProject.status == 'In Progress').count(),
         'completed_projects': StudentProject.query.filter(StudentProject.status == 'Completed').count(),
-        'pending_payments': db.session.query(db.func.sum(Payment.pending_balance)).scalar() or 0,
+        'pending_payments': totals['outstanding'],
         'total_revenue': total_revenue,
         'total_dev_cost': total_dev_cost,
         'total_profit': total_profit
     }
     
     recent_leads = Lead.query.order_by(Lead.created_at.desc()).limit(5).all()
-    upcoming_callbacks = LeadFollowUp.query.filter(LeadFollowUp.callback_datetime >= datetime.utcnow())\
+    upcoming_callbacks = LeadFollowUp.query.filter(LeadFollowUp.callback_datetime >= platform_now())\
+        .filter(LeadFollowUp.callback_status == 'pending')\
         .order_by(LeadFollowUp.callback_datetime.asc()).limit(5).all()
+    my_queue = get_rep_queue(current_user.id)
         
     # Sales Leaderboard
-    leaderboard = db.session.query(
-        User,
-        db.func.count(StudentProject.id).label('project_count'),
-        db.func.sum(Payment.total_cost).label('revenue')
-    ).join(StudentProject, User.id == StudentProject.closed_by_id)\
-     .join(Payment, StudentProject.id == Payment.project_id)\
-     .group_by(User.id)\
-     .order_by(db.desc('revenue')).all()
+    leaderboard = get_leaderboard()
     
     return render_template('admin/leads/dashboard.html', 
                          stats=stats, 
                          recent_leads=recent_leads,
                          upcoming_callbacks=upcoming_callbacks,
+                         my_queue=my_queue,
                          leaderboard=leaderboard)
 
+@admin_leads_bp.route('/revenue')
+@login_required
+@admin_required
+def revenue_report():
+    """Period-over-period revenue from the daily fact table"""
+    period = request.args.get('period', 'month')
+    if period not in PERIODS:
+        period = 'month'
+    count = min(max(request.args.get('count', 6, type=int), 1), 24)
+    rows = revenue_by_period(period, count=count)
+    
+    return render_template('admin/leads/revenue.html',
+                         period=period,
+                         periods=PERIODS,
+                         rows=rows,
+                         peak=max([r['booked_revenue'] for r in rows] + [1]),
+                         leaderboard=get_leaderboard(rows[0]['start'] if rows else None))
+
+def _aging_filters():
+    return {
+        'closer_id': request.args.get('closer', type=int),
+        'domain': request.args.get('domain') or None
+    }
+
+@admin_leads_bp.route('/reports/aging')
+@login_required
+@admin_required
+def aging_report():
+    """Accounts receivable aging for outstanding student project balances"""
+    page = request.args.get('page', 1, type=int)
+    filters = _aging_filters()
+    query = aging_query(**filters)
+    
+    rows = query.paginate(page=page, per_page=25, error_out=False)
+    closers = User.query.join(StudentProject, StudentProject.closed_by_id == User.id)\
+        .distinct().order_by(User.full_name).all()
+    domains = [d for (d,) in db.session.query(Lead.domain).filter(Lead.domain.isnot(None))
+               .distinct().order_by(Lead.domain)]
+    
+    return render_template('admin/leads/aging.html',
+                         rows=rows,
+                         summary=aging_summary(query),
+                         buckets=[label for _, label in AGING_BUCKETS],
+                         closers=closers,
+                         domains=domains,
+                         current_closer=filters['closer_id'],
+                         current_domain=filters['domain'],
+                         days_outstanding=days_outstanding)
+
+@admin_leads_bp.route('/reports/aging/export')
+@login_required
+@admin_required
+def export_aging():
+    """Stream the aging report as CSV"""
+    from flask import Response, stream_with_context
+    
+    response = Response(stream_with_context(stream_aging_csv(aging_query(**_aging_filters()))),
+                        mimetype='text/csv')
+    response.headers["Content-Disposition"] = \
+        f"attachment; filename=ar_aging_{datetime.utcnow().strftime('%Y%m%d')}.csv"
+    return response
+
+def _payout_period():
+    period = request.args.get('period') or current_period()
+    try:
+        period_bounds(period)
+    except ValueError:
+        period = current_period()
+    return period
+
+@admin_leads_bp.route('/payouts')
+@login_required
+@admin_required
+def payouts():
+    """Developer earnings, payouts and statements for a month"""
+    period = _payout_period()
+    statements = build_statements(period)
+    
+    return render_template('admin/leads/payouts.html',
+                         period=period,
+                         statements=statements,
+                         totals={key: sum(s[key] for s in statements)
+                                 for key in ('earned', 'paid', 'paid_in_period', 'outstanding')})
+
+@admin_leads_bp.route('/payouts/record', methods=['POST'])
+@login_required
+@admin_required
+def record_payout():
+    """Record money paid to a developer against an assignment"""
+    from app.utils.payment_ledger import parse_amount
+    
+    assignment = DeveloperAssignment.query.get_or_404(request.form.get('assignment_id', type=int))
+    try:
+        amount = parse_amount(request.form.get('amount'))
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('admin_leads.payouts', period=request.form.get('period')))
+    
+    payout = DeveloperPayout(
+        assignment_id=assignment.id,
+        developer_id=assignment.developer_id,
+        amount=amount,
+        reference=request.form.get('reference'),
+        notes=request.form.get('notes'),
+        created_by=current_user.id
+    )
+    db.session.add(payout)
+    db.session.commit()
+    invalidate_assignment_loads()
+    
+    flash(f'Payout of ₹{amount:,.2f} recorded for {assignment.developer.full_name}.', 'success')
+    return redirect(url_for('admin_leads.payouts', period=request.form.get('period')))
+
+@admin_leads_bp.route('/payouts/<int:developer_id>/statement')
+@login_required
+@admin_required
+def payout_statement(developer_id):
+    """Download a developer's payout statement PDF"""
+    from flask import send_file
+    
+    period = _payout_period()
+    statements = build_statements(period, developer_ids=[developer_id])
+    if not statements:
+        flash('No assignments for this developer in that period.', 'warning')
+        return redirect(url_for('admin_leads.payouts', period=period))
+    
+    path = render_statements(statements)[developer_id]
+    return send_file(path, as_attachment=True, mimetype='application/pdf',
+                     download_name=f'payout_statement_{developer_id}_{period}.pdf')
+
+def _funnel_range():
+    """Whole-day [start, end) from ?start=&end= (YYYY-MM-DD), defaulting to the last year"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d') + timedelta(days=1)
+    except (KeyError, ValueError):
+        end = today + timedelta(days=1)
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d')
+    except (KeyError, ValueError):
+        start = end - timedelta(days=365)
+    return start, end
+
+@admin_leads_bp.route('/analytics/funnel')
+@login_required
+@admin_required
+def funnel():
+    """Lead funnel and cohort analytics"""
+    start, end = _funnel_range()
+    return render_template('admin/leads/funnel.html',
+                         start=start.date(),
+                         end=(end - timedelta(days=1)).date())
+
+@admin_leads_bp.route('/analytics/funnel.json')
+@login_required
+@admin_required
+def funnel_data():
+    """Funnel report as JSON for the dashboard chart"""
+    start, end = _funnel_range()
+    return jsonify(get_funnel(start, end))
+
 @admin_leads_bp.route('/leads')
 @login_required
 @admin_required
@@ -122,6 +289,18 @@ def export_leads():
 def add_lead():
     """Manual lead entry"""
     if request.method == 'POST':
+        # Warn about likely duplicates unless the admin already confirmed
+        if not request.form.get('ignore_duplicates'):
+            duplicates = find_duplicates(
+                request.form.get('student_name'),
+                phone=request.form.get('phone'),
+                email=request.form.get('email'),
+                college=request.form.get('college')
+            )
+            if duplicates:
+                flash('Possible duplicate lead found. Review the matches below before saving.', 'warning')
+                return render_template('admin/leads/add_lead.html', duplicates=duplicates, form=request.form)
+        
         lead = Lead(
             student_name=request.form.get('student_name'),
             phone=request.form.get('phone'),
@@ -137,7 +316,34 @@ def add_lead():
         flash('Lead added successfully.', 'success')
         return redirect(url_for('admin_leads.lead_list'))
         
-    return render_template('admin/leads/add_lead.html')
+    return render_template('admin/leads/add_lead.html', duplicates=[], form={})
+
+@admin_leads_bp.route('/leads/import', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def import_leads():
+    """Bulk lead import from CSV/XLSX"""
+    from app.utils.lead_import import import_leads as run_import
+    
+    result = None
+    if request.method == 'POST':
+        file = request.files.get('file')
+        if not file or file.filename == '':
+            flash('No selected file', 'danger')
+            return redirect(url_for('admin_leads.import_leads'))
+        
+        try:
+            result = run_import(file.stream, file.filename,
+                                skip_duplicates=not request.form.get('allow_duplicates'))
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), 'danger')
+            return redirect(url_for('admin_leads.import_leads'))
+        
+        flash(f"Imported {result['imported']} leads, skipped {result['skipped']} rows.",
+              'success' if result['imported'] else 'warning')
+    
+    return render_template('admin/leads/import.html', result=result)
 
 @admin_leads_bp.route('/leads/<int:lead_id>')
 @login_required
@@ -146,7 +352,27 @@ def lead_detail(lead_id):
     """Lead details and follow-up timeline"""
     lead = Lead.query.get_or_404(lead_id)
     admins = User.query.filter_by(role='admin').all()
-    return render_template('admin/leads/lead_detail.html', lead=lead, admins=admins)
+    duplicates = find_duplicates(lead.student_name, lead.phone, lead.email, lead.college, exclude_id=lead.id)
+    return render_template('admin/leads/lead_detail.html', lead=lead, admins=admins, duplicates=duplicates)
+
+@admin_leads_bp.route('/leads/<int:lead_id>/merge', methods=['POST'])
+@login_required
+@admin_required
+def merge_lead(lead_id):
+    """Merge a duplicate lead into this one"""
+    lead = Lead.query.get_or_404(lead_id)
+    duplicate = Lead.query.get_or_404(request.form.get('duplicate_id', type=int))
+    
+    try:
+        merge_leads(lead, duplicate)
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'danger')
+        return redirect(url_for('admin_leads.lead_detail', lead_id=lead_id))
+    
+    db.session.commit()
+    flash('Leads merged. Follow-up history moved to this lead.', 'success')
+    return redirect(url_for('admin_leads.lead_detail', lead_id=lead_id))
 
 @admin_leads_bp.route('/leads/<int:lead_id>/follow-up', methods=['POST'])
 @login_required
@@ -174,17 +400,35 @@ def add_follow_up(lead_id):
         lead_id=lead_id,
         interaction_notes=request.form.get('notes'),
         callback_datetime=callback_dt,
+        callback_status='pending' if callback_dt else None,
         status_at_time=request.form.get('status'),
         created_by=creator_id
     )
     
     lead.status = request.form.get('status')
+    # Logging an interaction completes any callback that was due for this lead
+    close_pending_callbacks(lead_id)
     db.session.add(follow_up)
     db.session.commit()
     
     flash('Follow-up record added.', 'success')
     return redirect(url_for('admin_leads.lead_detail', lead_id=lead_id))
 
+@admin_leads_bp.route('/callbacks')
+@login_required
+@admin_required
+def callbacks():
+    """My calls now - overdue and upcoming callbacks for one rep"""
+    rep_id = request.args.get('rep', type=int) or current_user.id
+    rep = User.query.get_or_404(rep_id)
+    queue = get_rep_queue(rep.id)
+    
+    return render_template('admin/leads/callbacks.html',
+                         rep=rep,
+                         queue=queue,
+                         team_counts=get_queue_counts(),
+                         now=platform_now())
+
 @admin_leads_bp.route('/leads/<int:lead_id>/confirm', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -266,15 +510,17 @@ def confirm_project(lead_id):
 
         flash('Project confirmed and developer assigned successfully.', 'success')
         db.session.commit()
+        invalidate_assignment_loads()
         
         return redirect(url_for('admin_leads.project_detail', project_id=project.id))
     
-    # Get verified developers for assignment
-    developers = User.query.filter_by(role='developer', status='verified').all()
+    # Verified developers ranked by domain fit and current workload
+    recommendations = recommend_assignees([lead.domain] if lead.domain else None)
     # Get all admins for responsibility tracking
     admins = User.query.filter_by(role='admin').all()
     
-    return render_template('admin/leads/confirm_project.html', lead=lead, developers=developers, admins=admins)
+    return render_template('admin/leads/confirm_project.html', lead=lead, recommendations=recommendations,
+                         developers=[r['developer'] for r in recommendations], admins=admins)
 
 @admin_leads_bp.route('/projects/<int:project_id>')
 @login_required
@@ -282,35 +528,34 @@ def confirm_project(lead_id):
 def project_detail(project_id):
     """Project details including commercials, assignments, and docs"""
     project = StudentProject.query.get_or_404(project_id)
-    developers = User.query.filter_by(role='developer', status='verified').all()
+    recommendations = recommend_assignees(project.get_tech_stack_list())
     
     return render_template('admin/leads/project_detail.html', 
                          project=project, 
-                         developers=developers)
+                         recommendations=recommendations,
+                         developers=[r['developer'] for r in recommendations])
 
 @admin_leads_bp.route('/projects/<int:project_id>/update-commercials', methods=['POST'])
 @login_required
 @admin_required
 def update_commercials(project_id):
-    """Update payment and balance"""
-    project = StudentProject.query.get_or_404(project_id)
-    payment = Payment.query.filter_by(project_id=project_id).first()
-    
-    amount_paid = Decimal(request.form.get('amount_paid', '0'))
-    payment.amount_paid += amount_paid
-    payment.pending_balance = Decimal(payment.total_cost) - Decimal(payment.amount_paid)
-    payment.payment_mode = request.form.get('payment_mode')
-    payment.invoice_ref = request.form.get('invoice_ref')
-    
-    # Record individual transaction history
-    transaction = PaymentTransaction(
-        payment=payment,
-        amount=amount_paid,
-        payment_mode=request.form.get('payment_mode'),
-        invoice_ref=request.form.get('invoice_ref'),
-        notes=f"Recorded on {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-    )
-    db.session.add(transaction)
+    """Record a payment against the project's ledger"""
+    from app.utils.payment_ledger import record_payment
+    
+    StudentProject.query.get_or_404(project_id)
+    payment = Payment.query.filter_by(project_id=project_id).first_or_404()
+    
+    try:
+        record_payment(
+            payment,
+            request.form.get('amount_paid', '0'),
+            payment_mode=request.form.get('payment_mode'),
+            invoice_ref=request.form.get('invoice_ref')
+        )
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'danger')
+        return redirect(url_for('admin_leads.project_detail', project_id=project_id))
     
     db.session.commit()
     flash('Payment details updated.', 'success')
@@ -400,6 +645,56 @@ def upload_doc(project_id):
         
     return redirect(url_for('admin_leads.project_detail', project_id=project_id))
 
+# Chunked uploads: init -> PUT chunks (resumable) -> complete
+
+@admin_leads_bp.route('/projects/<int:project_id>/uploads', methods=['POST'])
+@login_required
+@admin_required
+def init_chunked_upload(project_id):
+    """Start a resumable upload of a project document"""
+    StudentProject.query.get_or_404(project_id)
+    data = request.get_json(silent=True) or {}
+    try:
+        session = init_upload(project_id, current_user.id, data.get('filename'), data.get('size', 0),
+                              document_type=data.get('doc_type'), chunk_size=data.get('chunk_size'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(session.to_dict()), 201
+
+@admin_leads_bp.route('/uploads/<upload_id>', methods=['GET'])
+@login_required
+@admin_required
+def chunked_upload_status(upload_id):
+    """Where to resume an upload from"""
+    return jsonify(UploadSession.query.get_or_404(upload_id).to_dict())
+
+@admin_leads_bp.route('/uploads/<upload_id>', methods=['PUT'])
+@login_required
+@admin_required
+def append_chunked_upload(upload_id):
+    """Append the raw request body at ?offset=, verified against the X-Chunk-SHA256 header"""
+    session = UploadSession.query.get_or_404(upload_id)
+    try:
+        append_chunk(session, request.args.get('offset', -1, type=int), request.stream,
+                     checksum=request.headers.get('X-Chunk-SHA256'))
+    except ChunkOffsetError as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e), 'offset': session.received_bytes}), 400
+    return jsonify(session.to_dict())
+
+@admin_leads_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+@login_required
+@admin_required
+def complete_chunked_upload(upload_id):
+    """Finalize an upload as a ProjectDocument"""
+    session = UploadSession.query.get_or_404(upload_id)
+    try:
+        complete_upload(session)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'offset': session.received_bytes}), 400
+    return jsonify(session.to_dict())
+
 @admin_leads_bp.route('/projects/<int:project_id>/assign', methods=['POST'])
 @login_required
 @admin_required
@@ -417,6 +712,7 @@ def assign_developer(project_id):
     
     db.session.add(assignment)
     db.session.commit()
+    invalidate_assignment_loads()
     flash('Developer assigned.', 'success')
     return redirect(url_for('admin_leads.project_detail', project_id=project_id))
 
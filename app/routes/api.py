@@ -2,10 +2,12 @@
 API Routes - JSON API endpoints
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from flask_login import login_required, current_user
-from app.models import User, DeveloperProfile, Article, Project
+from app.models import User, DeveloperProfile, Article, Project, ProjectMessage
+from app.utils.scheduling import available_slots, available_slots_many, platform_now
 from app import db
+from datetime import datetime, timedelta
 
 api_bp = Blueprint('api', __name__)
 
@@ -78,6 +80,174 @@ def get_developers():
     })
 
 
+def _date_range_args(now):
+    """start/end query args as dates; a week from today by default"""
+    start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else now.date()
+    end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else start + timedelta(days=6)
+    return start, end
+
+
+@api_bp.route('/developers/<int:developer_id>/availability')
+def developer_availability(developer_id):
+    """Open booking slots for a developer, e.g. ?start=2025-01-06&end=2025-01-12&duration=60"""
+    developer = DeveloperProfile.query.get_or_404(developer_id)
+    if developer.user.status != 'verified':
+        return jsonify({'error': 'Developer not available.'}), 404
+    
+    now = platform_now()
+    try:
+        start, end = _date_range_args(now)
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD.'}), 400
+    duration = request.args.get('duration', 60, type=int)
+    
+    try:
+        slots = available_slots(developer, start, end, duration, not_before=now)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'developer_id': developer.id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'duration': duration,
+        'slots': [{'start': slot_start.isoformat(timespec='minutes'), 'end': slot_end.isoformat(timespec='minutes')}
+                  for slot_start, slot_end in slots]
+    })
+
+
+@api_bp.route('/availability')
+def developers_availability():
+    """Open slots for several developers at once, e.g. ?developer_ids=1,2,3&start=2025-01-06&limit=3"""
+    try:
+        ids = [int(i) for i in request.args.get('developer_ids', '').split(',') if i.strip()]
+    except ValueError:
+        return jsonify({'error': 'developer_ids must be a comma-separated list of ids.'}), 400
+    if not 1 <= len(ids) <= 50:
+        return jsonify({'error': 'Pass between 1 and 50 developer_ids.'}), 400
+    
+    now = platform_now()
+    try:
+        start, end = _date_range_args(now)
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD.'}), 400
+    duration = request.args.get('duration', 60, type=int)
+    limit = request.args.get('limit', type=int)
+    
+    developers = DeveloperProfile.query.join(User)\
+        .filter(DeveloperProfile.id.in_(ids), User.status == 'verified').all()
+    try:
+        slots = available_slots_many(developers, start, end, duration, not_before=now, limit=limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'duration': duration,
+        'developers': {
+            str(developer_id): [{'start': slot_start.isoformat(timespec='minutes'),
+                                 'end': slot_end.isoformat(timespec='minutes')}
+                                for slot_start, slot_end in developer_slots]
+            for developer_id, developer_slots in slots.items()
+        }
+    })
+
+
+@api_bp.route('/calendar/<token>.ics')
+def calendar_feed(token):
+    """Signed iCalendar feed of a developer's or client's appointments, for calendar apps to subscribe to"""
+    from app.utils.calendar_feed import user_from_token, feed_response
+    
+    user = user_from_token(token)
+    response = feed_response(user) if user and user.status != 'suspended' else None
+    if response is None:
+        return jsonify({'error': 'Calendar feed not found.'}), 404
+    return response
+
+
+MAX_MESSAGE_LENGTH = 5000
+
+
+@api_bp.route('/projects/<int:project_id>/messages/stream')
+@login_required
+def project_message_stream(project_id):
+    """Server-Sent Events stream of new messages on a project, resuming after Last-Event-ID or ?after="""
+    from app.utils.message_hub import project_access, open_stream
+    
+    project = Project.query.get_or_404(project_id)
+    allowed, include_internal = project_access(current_user, project)
+    if not allowed:
+        return jsonify({'error': 'Access denied.'}), 403
+    
+    after = request.headers.get('Last-Event-ID') or request.args.get('after') or 0
+    try:
+        after = int(after)
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID must be a message id.'}), 400
+    
+    response = current_app.response_class(open_stream(project.id, after, include_internal),
+                                          mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let nginx pass events through unbuffered
+    return response
+
+
+@api_bp.route('/projects/<int:project_id>/messages')
+@login_required
+def project_messages(project_id):
+    """A page of a project's message history, newest page first; pass next_before back as ?before= for older ones"""
+    from app.utils.message_hub import project_access, message_page, decode_cursor, MESSAGES_PER_PAGE, MAX_MESSAGES_PER_PAGE
+    
+    project = Project.query.get_or_404(project_id)
+    allowed, include_internal = project_access(current_user, project)
+    if not allowed:
+        return jsonify({'error': 'Access denied.'}), 403
+    
+    before = None
+    if request.args.get('before'):
+        try:
+            before = decode_cursor(request.args['before'])
+        except ValueError:
+            return jsonify({'error': 'Invalid before cursor.'}), 400
+    limit = min(max(request.args.get('limit', MESSAGES_PER_PAGE, type=int), 1), MAX_MESSAGES_PER_PAGE)
+    
+    messages, older = message_page(project.id, include_internal, before=before, limit=limit)
+    return jsonify({
+        'messages': [message.to_dict() for message in messages],
+        'next_before': older,
+        'has_more': older is not None
+    })
+
+
+@api_bp.route('/projects/<int:project_id>/messages', methods=['POST'])
+@login_required
+def post_project_message(project_id):
+    """Post a message to a project thread; internal messages are for admins only"""
+    from app.utils.message_hub import project_access
+    
+    project = Project.query.get_or_404(project_id)
+    allowed, include_internal = project_access(current_user, project)
+    if not allowed:
+        return jsonify({'error': 'Access denied.'}), 403
+    
+    content = (request.form.get('content') or '').strip()
+    if not content:
+        return jsonify({'error': 'Message cannot be empty.'}), 400
+    if len(content) > MAX_MESSAGE_LENGTH:
+        return jsonify({'error': f'Messages are limited to {MAX_MESSAGE_LENGTH} characters.'}), 400
+    
+    message = ProjectMessage(
+        project_id=project.id,
+        sender_id=current_user.id,
+        content=content,
+        is_internal=include_internal and bool(request.form.get('is_internal'))
+    )
+    db.session.add(message)
+    db.session.commit()
+    return jsonify(message.to_dict()), 201
+
+
 @api_bp.route('/articles')
 def get_articles():
     """Get published articles"""
@@ -2,11 +2,14 @@
 Client Routes - Client dashboard and features
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user
 from app import db
 from app.models import User, DeveloperProfile, ClientProfile, Article, Project, Appointment
 from app.utils.decorators import client_required
+from app.utils.calendar_feed import feed_url
+from app.utils.message_hub import message_page
+from app.utils.scheduling import check_availability, check_within_calendar, platform_now, SchedulingConflict
 from datetime import datetime
 import json
 
@@ -110,7 +113,6 @@ def new_project():
         project.set_technologies_list([t.strip() for t in techs.split(',') if t.strip()])
         
         db.session.add(project)
-        current_user.client_profile.projects_submitted += 1
         db.session.commit()
         
         flash('Project submitted! Asan team will review and contact you.', 'success')
@@ -128,7 +130,9 @@ def project_detail(project_id):
     if project.client_id != current_user.client_profile.id:
         flash('Access denied.', 'danger')
         return redirect(url_for('client.projects'))
-    return render_template('client/project_detail.html', project=project)
+    messages, older_cursor = message_page(project.id, include_internal=False)
+    return render_template('client/project_detail.html', project=project,
+                           messages=messages, older_cursor=older_cursor)
 
 
 @client_bp.route('/appointments')
@@ -146,7 +150,8 @@ def appointments():
         query = query.filter_by(status=status)
     
     appointments = query.order_by(Appointment.scheduled_at.desc()).paginate(page=page, per_page=10)
-    return render_template('client/appointments.html', appointments=appointments, current_status=status)
+    return render_template('client/appointments.html', appointments=appointments, current_status=status,
+                           calendar_feed_url=feed_url(current_user))
 
 
 @client_bp.route('/book-appointment/<int:developer_id>', methods=['GET', 'POST'])
@@ -164,7 +169,28 @@ def book_appointment(developer_id):
         scheduled_date = request.form.get('scheduled_date')
         scheduled_time = request.form.get('scheduled_time')
         
-        scheduled_at = datetime.strptime(f"{scheduled_date} {scheduled_time}", '%Y-%m-%d %H:%M')
+        try:
+            scheduled_at = datetime.strptime(f"{scheduled_date} {scheduled_time}", '%Y-%m-%d %H:%M')
+        except (TypeError, ValueError):
+            flash('Please choose a valid date and time.', 'danger')
+            return redirect(url_for('client.book_appointment', developer_id=developer_id))
+        duration = request.form.get('duration', 60, type=int)
+        
+        if scheduled_at <= platform_now():
+            flash('Please choose a time in the future.', 'danger')
+            return redirect(url_for('client.book_appointment', developer_id=developer_id))
+        
+        try:
+            check_within_calendar(developer_id, scheduled_at, duration)
+            check_availability(developer_id, scheduled_at, duration)
+        except SchedulingConflict as e:
+            db.session.rollback()
+            flash(f'That time is no longer available. {e} Please pick another slot.', 'danger')
+            return redirect(url_for('client.book_appointment', developer_id=developer_id))
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), 'danger')
+            return redirect(url_for('client.book_appointment', developer_id=developer_id))
         
         appointment = Appointment(
             client_id=current_user.client_profile.id,
@@ -173,7 +199,8 @@ def book_appointment(developer_id):
             title=request.form.get('title', ''),
             description=request.form.get('description', ''),
             scheduled_at=scheduled_at,
-            duration_minutes=request.form.get('duration', 60, type=int),
+            duration_minutes=duration,
+            timezone=current_app.config['SCHEDULING_TIMEZONE'],
             client_notes=request.form.get('notes', '')
         )
         
@@ -183,7 +210,7 @@ def book_appointment(developer_id):
         flash('Appointment request sent! Developer will confirm.', 'success')
         return redirect(url_for('client.appointments'))
     
-    return render_template('client/book_appointment.html', developer=developer)
+    return render_template('client/book_appointment.html', developer=developer, today=platform_now().date().isoformat())
 
 
 @client_bp.route('/appointment/<int:id>/cancel', methods=['POST'])
@@ -2,13 +2,21 @@
 Developer Routes - Developer dashboard and management
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user
 from app import db
-from app.models import User, DeveloperProfile, Article, Appointment, Project, Team, TeamMember, KYCDocument
+from app.models import (
+    User, DeveloperProfile, Article, Appointment, AvailabilityRule, Project, Team, TeamMember, KYCDocument
+)
 from app.utils.decorators import developer_required, verified_developer_required
-from app.utils.helpers import save_file
-from datetime import datetime
+from app.utils.helpers import save_file, delete_file
+from app.utils.calendar_feed import feed_url
+from app.utils.message_hub import message_page
+from app.utils.scheduling import (
+    check_availability, available_slots, is_valid_timezone, platform_now, SchedulingConflict,
+    CONFIRMED_STATUSES, COMMON_TIMEZONES
+)
+from datetime import datetime, timedelta
 import json
 
 developer_bp = Blueprint('developer', __name__)
@@ -86,6 +94,9 @@ def kyc():
         db.session.add(kyc_doc)
         db.session.commit()
         
+        from app.utils.kyc_checks import schedule_precheck
+        schedule_precheck(kyc_doc.id)
+        
         flash('Document submitted for verification.', 'success')
         return redirect(url_for('developer.verification_pending'))
     
@@ -125,6 +136,7 @@ def profile():
         if 'avatar' in request.files and request.files['avatar'].filename:
             filename = save_file(request.files['avatar'], 'avatars')
             if filename:
+                delete_file(current_user.avatar, 'avatars')
                 current_user.avatar = filename
         
         db.session.commit()
@@ -204,7 +216,14 @@ def edit_article(article_id):
         
         techs = request.form.get('technologies', '')
         article.set_technologies_list([t.strip() for t in techs.split(',') if t.strip()])
-        
+
+        if 'cover_image' in request.files and request.files['cover_image'].filename:
+            filename = save_file(request.files['cover_image'], 'articles')
+            if filename:
+                # Release the previous cover so its stored file can be collected
+                delete_file(article.cover_image, 'articles')
+                article.cover_image = filename
+
         if request.form.get('submit_type') == 'publish' and article.status == 'draft':
             article.status = 'pending'
         
@@ -229,7 +248,8 @@ def appointments():
         query = query.filter_by(status=status)
         
     appointments = query.order_by(Appointment.scheduled_at.desc()).paginate(page=page, per_page=10)
-    return render_template('developer/appointments.html', appointments=appointments, current_status=status)
+    return render_template('developer/appointments.html', appointments=appointments, current_status=status,
+                           calendar_feed_url=feed_url(current_user))
 
 
 @developer_bp.route('/appointment/<int:id>/confirm', methods=['POST'])
@@ -240,6 +260,14 @@ def confirm_appointment(id):
     if appt.developer_id != current_user.developer_profile.id:
         flash('Access denied.', 'danger')
         return redirect(url_for('developer.appointments'))
+    try:
+        # Legacy bookings may have durations the booking form no longer allows
+        check_availability(appt.developer_id, appt.scheduled_at, appt.duration_minutes or 60,
+                           statuses=CONFIRMED_STATUSES, exclude_id=appt.id, validate=False)
+    except SchedulingConflict as e:
+        db.session.rollback()
+        flash(f'Cannot confirm: {e} Cancel one of the bookings first.', 'danger')
+        return redirect(url_for('developer.appointments'))
     link = request.form.get('meeting_link', '').strip()
     if link and not link.startswith(('http://', 'https://')):
         link = 'https://' + link
@@ -275,6 +303,87 @@ def cancel_appointment(id):
     return redirect(url_for('developer.appointments'))
 
 
+@developer_bp.route('/availability', methods=['GET', 'POST'])
+@login_required
+@developer_required
+def availability():
+    """Weekly recurring availability that clients book against"""
+    profile = current_user.developer_profile
+    
+    if request.method == 'POST':
+        weekdays = [d for d in request.form.getlist('weekdays', type=int) if 0 <= d <= 6]
+        timezone = request.form.get('timezone', '').strip()
+        interval_weeks = request.form.get('interval_weeks', 1, type=int)
+        try:
+            start_time = datetime.strptime(request.form.get('start_time', ''), '%H:%M').time()
+            end_time = datetime.strptime(request.form.get('end_time', ''), '%H:%M').time()
+            valid_from = datetime.strptime(request.form['valid_from'], '%Y-%m-%d').date() \
+                if request.form.get('valid_from') else platform_now().date()
+            valid_until = datetime.strptime(request.form['valid_until'], '%Y-%m-%d').date() \
+                if request.form.get('valid_until') else None
+        except ValueError:
+            flash('Please enter valid times and dates.', 'danger')
+            return redirect(url_for('developer.availability'))
+        
+        error = None
+        if not weekdays:
+            error = 'Select at least one day.'
+        elif end_time <= start_time:
+            error = 'The window must end after it starts.'
+        elif not is_valid_timezone(timezone):
+            error = 'Unknown timezone.'
+        elif not 1 <= interval_weeks <= 4:
+            error = 'Repeat every 1 to 4 weeks.'
+        elif valid_until and valid_until < valid_from:
+            error = 'The end date must be after the start date.'
+        if error:
+            flash(error, 'danger')
+            return redirect(url_for('developer.availability'))
+        
+        for weekday in weekdays:
+            db.session.add(AvailabilityRule(
+                developer_id=profile.id,
+                weekday=weekday,
+                start_time=start_time,
+                end_time=end_time,
+                timezone=timezone,
+                interval_weeks=interval_weeks,
+                valid_from=valid_from,
+                valid_until=valid_until
+            ))
+        db.session.commit()
+        flash('Availability added.', 'success')
+        return redirect(url_for('developer.availability'))
+    
+    rules = profile.availability_rules.order_by(AvailabilityRule.weekday, AvailabilityRule.start_time).all()
+    
+    # Next week's open hour-long slots, grouped by day
+    now = platform_now()
+    today = now.date()
+    preview = {}
+    for start, end in available_slots(profile, today, today + timedelta(days=6), 60, not_before=now):
+        preview.setdefault(start.date(), []).append(start)
+    
+    return render_template('developer/availability.html', rules=rules, preview=preview,
+                           weekdays=AvailabilityRule.WEEKDAYS, timezones=COMMON_TIMEZONES,
+                           default_timezone=rules[-1].timezone if rules else current_app.config['SCHEDULING_TIMEZONE'],
+                           today=today.isoformat())
+
+
+@developer_bp.route('/availability/<int:rule_id>/delete', methods=['POST'])
+@login_required
+@developer_required
+def delete_availability(rule_id):
+    rule = AvailabilityRule.query.get_or_404(rule_id)
+    if rule.developer_id != current_user.developer_profile.id:
+        flash('Access denied.', 'danger')
+        return redirect(url_for('developer.availability'))
+    db.session.delete(rule)
+    db.session.commit()
+    flash('Availability removed.', 'info')
+    return redirect(url_for('developer.availability'))
+
+
 @developer_bp.route('/teams')
 @login_required
 @developer_required
@@ -302,4 +411,6 @@ def project_detail(project_id):
         flash('Access denied. You are not a member of this project team.', 'danger')
         return redirect(url_for('developer.teams'))
         
-    return render_template('developer/project_detail.html', project=project)
+    messages, older_cursor = message_page(project.id, include_internal=False)
+    return render_template('developer/project_detail.html', project=project,
+                           messages=messages, older_cursor=older_cursor)
@@ -4,6 +4,8 @@ Main Routes - Public pages and landing
 
 from flask import Blueprint, render_template, request
 from app.models import User, DeveloperProfile, Article
+from app.utils.scheduling import available_slots_many
+from datetime import datetime, timedelta
 
 main_bp = Blueprint('main', __name__)
 
@@ -15,7 +17,7 @@ def index():
     featured_developers = DeveloperProfile.query\
         .join(User)\
         .filter(User.status == 'verified')\
-        .order_by(DeveloperProfile.articles_count.desc())\
+        .order_by(DeveloperProfile.articles_count.desc(), DeveloperProfile.id)\
         .limit(4)\
         .all()
     
@@ -111,16 +113,23 @@ def developers_list():
     if availability:
         query = query.filter(DeveloperProfile.availability == availability)
     
-    developers = query.order_by(DeveloperProfile.rating.desc()).paginate(
+    developers = query.order_by(DeveloperProfile.rating.desc(), DeveloperProfile.reviews_count.desc(),
+                                DeveloperProfile.id).paginate(
         page=page, per_page=per_page, error_out=False
     )
     
+    # Next open hour for every developer on the page, computed in one batch
+    now = datetime.now()
+    next_slots = available_slots_many(developers.items, now.date(), now.date() + timedelta(days=13), 60,
+                                      not_before=now, limit=1)
+    
     # Get all unique skills and domains for filters
     all_skills = ['Python', 'JavaScript', 'React', 'Node.js', 'Flutter', 'AWS', 'Docker', 'Kubernetes', 'TensorFlow', 'PyTorch']
     all_domains = ['FinTech', 'HealthTech', 'E-commerce', 'SaaS', 'AI/ML', 'Mobile Apps', 'Cloud Infrastructure', 'EdTech']
     
     return render_template('public/developers_list.html',
                          developers=developers,
+                         next_slots=next_slots,
                          all_skills=all_skills,
                          all_domains=all_domains,
                          current_skill=skill,
@@ -0,0 +1,119 @@
+"""
+Accounts Receivable Aging - Outstanding student project balances bucketed by days since last payment
+"""
+
+from datetime import datetime, timedelta
+from app import db
+from app.models import User, Lead, StudentProject, Payment, PaymentTransaction
+import csv
+import io
+
+
+# (upper bound in days, label); None is open-ended
+AGING_BUCKETS = [(30, '0-30'), (60, '31-60'), (90, '61-90'), (None, '90+')]
+
+EXPORT_COLUMNS = ['Project ID', 'Project', 'Student', 'Domain', 'Closer', 'Total Cost', 'Paid',
+                  'Outstanding', 'Last Payment', 'Days Outstanding', 'Bucket']
+
+
+def aging_query(closer_id=None, domain=None, as_of=None):
+    """
+    One row per payment with an outstanding balance, aged from the latest
+    PaymentTransaction (or from when the payment was set up if nothing has
+    been paid yet). Oldest first. The result is a Query, so it can be
+    paginated or streamed.
+    """
+    as_of = as_of or datetime.utcnow()
+    last_payment = db.func.max(PaymentTransaction.transaction_date)
+    anchor = db.func.coalesce(last_payment, Payment.created_at)
+
+    bucket = db.case(
+        *[(anchor >= as_of - timedelta(days=limit), label) for limit, label in AGING_BUCKETS if limit],
+        else_=AGING_BUCKETS[-1][1]
+    )
+
+    group_columns = [
+        Payment.id, Payment.total_cost, Payment.amount_paid, Payment.pending_balance, Payment.created_at,
+        StudentProject.id, StudentProject.title, Lead.student_name, Lead.domain, User.full_name
+    ]
+    query = db.session.query(
+        Payment.id.label('payment_id'),
+        StudentProject.id.label('project_id'),
+        StudentProject.title.label('title'),
+        Lead.student_name.label('student_name'),
+        Lead.domain.label('domain'),
+        User.full_name.label('closer_name'),
+        Payment.total_cost.label('total_cost'),
+        Payment.amount_paid.label('amount_paid'),
+        Payment.pending_balance.label('pending_balance'),
+        last_payment.label('last_payment'),
+        anchor.label('aged_from'),
+        bucket.label('bucket')
+    ).join(StudentProject, StudentProject.id == Payment.project_id)\
+     .outerjoin(Lead, Lead.id == StudentProject.lead_id)\
+     .outerjoin(User, User.id == StudentProject.closed_by_id)\
+     .outerjoin(PaymentTransaction, PaymentTransaction.payment_id == Payment.id)\
+     .filter(Payment.pending_balance > 0)
+
+    if closer_id:
+        query = query.filter(StudentProject.closed_by_id == closer_id)
+    if domain:
+        query = query.filter(Lead.domain == domain)
+
+    return query.group_by(*group_columns).order_by(anchor.asc(), Payment.id.asc())
+
+
+def aging_summary(query):
+    """{bucket: {'count', 'outstanding'}} for every bucket, from the aging query"""
+    rows = query.order_by(None).subquery()
+    totals = db.session.query(
+        rows.c.bucket, db.func.count(), db.func.sum(rows.c.pending_balance)
+    ).group_by(rows.c.bucket).all()
+
+    summary = {label: {'count': 0, 'outstanding': 0} for _, label in AGING_BUCKETS}
+    for label, count, outstanding in totals:
+        summary[label] = {'count': count, 'outstanding': outstanding or 0}
+    return summary
+
+
+def days_outstanding(row, as_of=None):
+    aged_from = row.aged_from
+    if isinstance(aged_from, str):
+        aged_from = datetime.fromisoformat(aged_from)
+    return max(((as_of or datetime.utcnow()) - aged_from).days, 0) if aged_from else None
+
+
+def stream_aging_csv(query, as_of=None, chunk_size=500):
+    """Yield the aging report as CSV text, fetching `chunk_size` rows at a time"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    def flush():
+        value = output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+        return value
+
+    writer.writerow(EXPORT_COLUMNS)
+    yield flush()
+
+    for index, row in enumerate(query.yield_per(chunk_size), start=1):
+        last_payment = row.last_payment
+        if last_payment and not isinstance(last_payment, str):
+            last_payment = last_payment.strftime('%Y-%m-%d')
+        writer.writerow([
+            row.project_id,
+            row.title,
+            row.student_name or '',
+            row.domain or '',
+            row.closer_name or '',
+            row.total_cost,
+            row.amount_paid,
+            row.pending_balance,
+            (last_payment or '')[:10],
+            days_outstanding(row, as_of),
+            row.bucket
+        ])
+        if index % chunk_size == 0:
+            yield flush()
+    yield flush()
@@ -0,0 +1,232 @@
+"""
+Calendar Feed - Signed per-user iCalendar (.ics) feeds of appointments
+"""
+
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from flask import current_app, request, url_for, has_request_context
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy import event
+from app import db
+from app.models import User, DeveloperProfile, ClientProfile, Appointment
+from app.utils.scheduling import platform_now
+import hashlib
+import threading
+
+
+FEED_SALT = 'calendar-feed'
+# Past appointments older than this drop out of the feed
+HISTORY_DAYS = 90
+# How long a worker trusts its cached fingerprint before re-checking the
+# database. Writes made by this process invalidate it immediately.
+FINGERPRINT_TTL = 60
+# Calendar apps may reuse the feed for this long before revalidating
+CLIENT_MAX_AGE = 300
+MAX_CACHED_FEEDS = 512
+
+STATUS_MAP = {
+    'pending': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+    'in_progress': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'cancelled': 'CANCELLED',
+    'no_show': 'CANCELLED',
+}
+
+# (role, profile_id) -> {'checked': monotonic time, 'etag': str, 'last_modified': datetime, 'body': bytes}
+_feeds = {}
+# Guards evictions against other request threads evicting or invalidating at the same time
+_feeds_lock = threading.Lock()
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=FEED_SALT)
+
+
+def feed_token(user):
+    return _serializer().dumps(user.id)
+
+
+def user_from_token(token):
+    """The User a feed token was issued to, or None for a forged token"""
+    try:
+        user_id = _serializer().loads(token)
+    except BadSignature:
+        return None
+    return db.session.get(User, user_id)
+
+
+def feed_url(user):
+    return url_for('api.calendar_feed', token=feed_token(user), _external=True)
+
+
+def _owner(user):
+    """(role, profile id) whose appointments make up the user's feed"""
+    if user.role == 'developer' and user.developer_profile:
+        return 'developer', user.developer_profile.id
+    if user.role == 'client' and user.client_profile:
+        return 'client', user.client_profile.id
+    return None
+
+
+def _owner_filter(owner):
+    role, profile_id = owner
+    column = Appointment.developer_id if role == 'developer' else Appointment.client_id
+    return column == profile_id
+
+
+def _fingerprint(user, owner, since):
+    """
+    ETag and Last-Modified for a feed from aggregate queries - no appointment
+    rows are loaded. SUM(id) and SUM(revision) change on every insert, delete
+    and update, and the names shown in the feed are hashed in as well.
+    """
+    count, id_sum, revision_sum, last_modified = db.session.query(
+        db.func.count(Appointment.id), db.func.sum(Appointment.id),
+        db.func.sum(Appointment.revision), db.func.max(Appointment.updated_at)
+    ).filter(_owner_filter(owner)).one()
+
+    role = owner[0]
+    other_profile = ClientProfile if role == 'developer' else DeveloperProfile
+    other_column = Appointment.client_id if role == 'developer' else Appointment.developer_id
+    names = db.session.query(User.id, User.full_name)\
+        .join(other_profile, other_profile.user_id == User.id)\
+        .join(Appointment, other_column == other_profile.id)\
+        .filter(_owner_filter(owner)).distinct().order_by(User.id).all()
+
+    key = f'{owner}:{count}:{id_sum}:{revision_sum}:{last_modified}:{since}:{user.full_name}:{names}'
+    etag = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return etag, last_modified
+
+
+def _escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')\
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _fold(line):
+    """Split content lines longer than 75 octets, as RFC 5545 requires"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    parts = []
+    while data:
+        cut = min(len(data), 75 if not parts else 74)
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:  # don't split a UTF-8 sequence
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    return '\r\n '.join(parts)
+
+
+def _utc(moment, zone_name):
+    try:
+        zone = ZoneInfo(zone_name or current_app.config.get('SCHEDULING_TIMEZONE', 'UTC'))
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = ZoneInfo('UTC')
+    return moment.replace(tzinfo=zone).astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event_lines(appt, role, host):
+    other = appt.client.user.full_name if role == 'developer' and appt.client and appt.client.user \
+        else (appt.developer.user.full_name if appt.developer and appt.developer.user else '')
+    summary = appt.title or appt.get_type_display()
+    if other:
+        summary = f'{summary} with {other}'
+    description = '\n'.join(filter(None, [appt.description, appt.client_notes,
+                                          f'Meeting link: {appt.meeting_link}' if appt.meeting_link else None]))
+    end = appt.scheduled_at + timedelta(minutes=appt.duration_minutes or 60)
+    modified = _utc(appt.updated_at or appt.created_at or datetime.utcnow(), 'UTC')
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:appointment-{appt.id}@{host}',
+        f'DTSTAMP:{modified}',
+        f'LAST-MODIFIED:{modified}',
+        f'DTSTART:{_utc(appt.scheduled_at, appt.timezone)}',
+        f'DTEND:{_utc(end, appt.timezone)}',
+        f'SUMMARY:{_escape(summary)}',
+        f'STATUS:{STATUS_MAP.get(appt.status, "TENTATIVE")}',
+    ]
+    if description:
+        lines.append(f'DESCRIPTION:{_escape(description)}')
+    if appt.meeting_link:
+        lines.append(f'LOCATION:{_escape(appt.meeting_link)}')
+        lines.append(f'URL:{appt.meeting_link}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def render_feed(user, owner, since):
+    role = owner[0]
+    appointments = Appointment.query.filter(_owner_filter(owner), Appointment.scheduled_at >= since)\
+        .order_by(Appointment.scheduled_at).all()
+    host = request.host.split(':')[0] if has_request_context() else 'asandevnest'
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Asan DevNest//Appointments//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(f"Asan DevNest - {user.full_name}")}',
+        f'REFRESH-INTERVAL;VALUE=DURATION:PT{CLIENT_MAX_AGE // 60}M',
+    ]
+    for appt in appointments:
+        lines.extend(_event_lines(appt, role, host))
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(_fold(line) for line in lines) + '\r\n').encode('utf-8')
+
+
+def _cached_feed(user, owner):
+    """The feed entry for `owner`, re-checked at most every FINGERPRINT_TTL and re-rendered only when it changed"""
+    since = datetime.combine(platform_now().date() - timedelta(days=HISTORY_DAYS), datetime.min.time())
+    entry = _feeds.get(owner)
+    if entry and monotonic() - entry['checked'] < FINGERPRINT_TTL:
+        return entry
+
+    etag, last_modified = _fingerprint(user, owner, since)
+    if entry and entry['etag'] == etag:
+        entry['checked'] = monotonic()
+        return entry
+
+    entry = {
+        'checked': monotonic(),
+        'etag': etag,
+        'last_modified': last_modified,
+        'body': render_feed(user, owner, since),
+    }
+    with _feeds_lock:
+        if len(_feeds) >= MAX_CACHED_FEEDS:
+            _feeds.pop(next(iter(_feeds)), None)
+        _feeds[owner] = entry
+    return entry
+
+
+def feed_response(user):
+    """Conditional .ics response for a user's feed; None if the user has no appointments feed"""
+    owner = _owner(user)
+    if owner is None:
+        return None
+    entry = _cached_feed(user, owner)
+
+    response = current_app.response_class(entry['body'], mimetype='text/calendar')
+    response.headers['Content-Disposition'] = 'inline; filename="appointments.ics"'
+    response.set_etag(entry['etag'])
+    if entry['last_modified']:
+        response.last_modified = entry['last_modified'].replace(tzinfo=timezone.utc)
+    response.cache_control.private = True
+    response.cache_control.max_age = CLIENT_MAX_AGE
+    return response.make_conditional(request)
+
+
+def _invalidate_for(mapper, connection, target):
+    with _feeds_lock:
+        _feeds.pop(('developer', target.developer_id), None)
+        _feeds.pop(('client', target.client_id), None)
+
+
+def register_feed_events():
+    """Drop cached feeds whenever an appointment is written by this process"""
+    for name in ('after_insert', 'after_update', 'after_delete'):
+        if not event.contains(Appointment, name, _invalidate_for):
+            event.listen(Appointment, name, _invalidate_for)
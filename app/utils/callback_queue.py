@@ -0,0 +1,113 @@
+"""
+Callback Queue - Due/overdue lead callbacks per rep, missed-call sweeping and daily rollups
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import User, LeadFollowUp, CallbackDailyStat
+from app.utils.scheduling import platform_now
+
+
+# How far ahead "my calls now" looks
+DEFAULT_HORIZON = timedelta(hours=2)
+# Pending callbacks older than this are marked missed by the sweeper
+MISSED_GRACE = timedelta(hours=24)
+# Overdue callbacks older than this drop out of the live queue
+MAX_OVERDUE_AGE = timedelta(days=7)
+
+
+def get_rep_queue(user_id, now=None, horizon=DEFAULT_HORIZON):
+    """
+    Return {'overdue': [...], 'due': [...]} pending callbacks for one rep in
+    a single range query over ix_follow_ups_callback_due. Callback times are
+    the rep's wall-clock time, so they are compared on the platform clock.
+    """
+    now = now or platform_now()
+    follow_ups = LeadFollowUp.query.options(joinedload(LeadFollowUp.lead))\
+        .filter(
+            LeadFollowUp.callback_datetime >= now - MAX_OVERDUE_AGE,
+            LeadFollowUp.callback_datetime <= now + horizon,
+            LeadFollowUp.created_by == user_id,
+            LeadFollowUp.callback_status == 'pending'
+        ).order_by(LeadFollowUp.callback_datetime.asc()).all()
+
+    return {
+        'overdue': [f for f in follow_ups if f.callback_datetime < now],
+        'due': [f for f in follow_ups if f.callback_datetime >= now]
+    }
+
+
+def get_queue_counts(now=None, horizon=DEFAULT_HORIZON):
+    """Return [(User, overdue, due)] for every rep with pending callbacks in the window"""
+    now = now or platform_now()
+    overdue = db.func.sum(db.case((LeadFollowUp.callback_datetime < now, 1), else_=0))
+    due = db.func.sum(db.case((LeadFollowUp.callback_datetime >= now, 1), else_=0))
+
+    rows = db.session.query(LeadFollowUp.created_by, overdue, due)\
+        .filter(
+            LeadFollowUp.callback_datetime >= now - MAX_OVERDUE_AGE,
+            LeadFollowUp.callback_datetime <= now + horizon,
+            LeadFollowUp.callback_status == 'pending'
+        ).group_by(LeadFollowUp.created_by).all()
+
+    users = {u.id: u for u in User.query.filter(User.id.in_([r[0] for r in rows if r[0]]))} if rows else {}
+    return [(users.get(user_id), int(o or 0), int(d or 0)) for user_id, o, d in rows]
+
+
+def close_pending_callbacks(lead_id, before=None):
+    """Mark a lead's pending callbacks as done once a new interaction is logged"""
+    return LeadFollowUp.query.filter(
+        LeadFollowUp.lead_id == lead_id,
+        LeadFollowUp.callback_status == 'pending',
+        LeadFollowUp.callback_datetime <= (before or platform_now()) + DEFAULT_HORIZON
+    ).update({'callback_status': 'done'}, synchronize_session=False)
+
+
+def sweep_missed_callbacks(now=None, grace=MISSED_GRACE):
+    """Mark pending callbacks past the grace period as missed. Returns affected days."""
+    now = now or platform_now()
+    cutoff = now - grace
+
+    days = [d for (d,) in db.session.query(db.func.date(LeadFollowUp.callback_datetime))
+            .filter(LeadFollowUp.callback_status == 'pending', LeadFollowUp.callback_datetime < cutoff)
+            .distinct()]
+
+    LeadFollowUp.query.filter(
+        LeadFollowUp.callback_status == 'pending',
+        LeadFollowUp.callback_datetime < cutoff
+    ).update({'callback_status': 'missed'}, synchronize_session=False)
+    db.session.commit()
+
+    return [datetime.strptime(d, '%Y-%m-%d').date() if isinstance(d, str) else d for d in days]
+
+
+def roll_up_daily_counts(days):
+    """Recompute CallbackDailyStat rows for the given dates with one grouped query per day"""
+    for day in set(days):
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1)
+
+        rows = db.session.query(
+            LeadFollowUp.created_by,
+            db.func.count(LeadFollowUp.id),
+            db.func.sum(db.case((LeadFollowUp.callback_status == 'done', 1), else_=0)),
+            db.func.sum(db.case((LeadFollowUp.callback_status == 'missed', 1), else_=0))
+        ).filter(LeadFollowUp.callback_datetime >= start, LeadFollowUp.callback_datetime < end)\
+         .group_by(LeadFollowUp.created_by).all()
+
+        CallbackDailyStat.query.filter_by(day=day).delete(synchronize_session=False)
+        db.session.add_all([
+            CallbackDailyStat(day=day, user_id=user_id, scheduled=scheduled,
+                              completed=int(completed or 0), missed=int(missed or 0))
+            for user_id, scheduled, completed, missed in rows
+        ])
+    db.session.commit()
+
+
+def run_sweep(now=None):
+    """Sweep missed callbacks and refresh rollups for those days plus today"""
+    now = now or platform_now()
+    days = sweep_missed_callbacks(now)
+    roll_up_daily_counts(days + [now.date(), (now - timedelta(days=1)).date()])
+    return days
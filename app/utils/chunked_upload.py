@@ -0,0 +1,209 @@
+"""
+Chunked Uploads - Resumable init/append/complete uploads for large project documents
+"""
+
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models import UploadSession, ProjectDocument
+from app.utils.file_store import INCOMING_DIR, CHUNK_SIZE, store_local_file
+import hashlib
+import os
+import shutil
+import uuid
+
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_UPLOAD_SIZE = 1024 * 1024 * 1024
+# Project deliverables: documents, decks and archives
+ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'ppt', 'pptx', 'xls', 'xlsx', 'txt', 'md',
+                      'zip', 'rar', '7z', 'tar', 'gz', 'tgz'}
+# Sessions idle for longer than this are dropped along with their partial file
+SESSION_TTL = timedelta(hours=24)
+
+
+class ChunkOffsetError(ValueError):
+    """The chunk does not start where the server's copy ends; the client should resume from `offset`"""
+
+    def __init__(self, offset):
+        super().__init__(f'Expected a chunk at offset {offset}.')
+        self.offset = offset
+
+
+def part_path(upload_id):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], INCOMING_DIR, f'{upload_id}.part')
+
+
+def _extension(filename):
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
+
+def init_upload(project_id, user_id, filename, size, document_type=None, chunk_size=None):
+    """Start a chunked upload. Raises ValueError for files that cannot be accepted."""
+    filename = os.path.basename((filename or '').replace('\\', '/')).strip()
+    if _extension(filename) not in ALLOWED_EXTENSIONS:
+        raise ValueError('File type not allowed.')
+    size = int(size)
+    max_size = current_app.config.get('CHUNKED_UPLOAD_MAX_SIZE', MAX_UPLOAD_SIZE)
+    if size <= 0 or size > max_size:
+        raise ValueError(f'File size must be between 1 byte and {max_size // (1024 * 1024)} MB.')
+
+    # Each chunk is one request, so it has to fit under MAX_CONTENT_LENGTH
+    limit = current_app.config.get('MAX_CONTENT_LENGTH') or DEFAULT_CHUNK_SIZE
+    chunk_size = min(int(chunk_size or DEFAULT_CHUNK_SIZE), DEFAULT_CHUNK_SIZE, limit)
+
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        folder='projects',
+        project_id=project_id,
+        created_by=user_id,
+        original_name=filename,
+        document_type=document_type,
+        total_size=size,
+        chunk_size=chunk_size,
+        received_bytes=0
+    )
+    os.makedirs(os.path.dirname(part_path(session.id)), exist_ok=True)
+    open(part_path(session.id), 'wb').close()
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def append_chunk(session, offset, stream, checksum=None):
+    """
+    Write one chunk at `offset`. The request body is streamed into a file of
+    its own and validated there (a chunk whose SHA-256 does not match
+    `checksum` is discarded), so a bad or duplicate request never touches the
+    partial file. Raises ChunkOffsetError when the client is out of step (e.g.
+    it is retrying a chunk that already arrived) and ValueError for a bad chunk.
+    """
+    if session.status != 'open':
+        raise ValueError('Upload is already complete.')
+    if offset != session.received_bytes:
+        raise ChunkOffsetError(session.received_bytes)
+
+    chunk_path = f'{part_path(session.id)}.{uuid.uuid4().hex}.chunk'
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(chunk_path, 'wb') as out:
+            while written <= session.chunk_size:
+                data = stream.read(CHUNK_SIZE)
+                if not data:
+                    break
+                digest.update(data)
+                written += len(data)
+                out.write(data)
+
+        if written == 0:
+            raise ValueError('Empty chunk.')
+        if written > session.chunk_size or offset + written > session.total_size:
+            raise ValueError('Chunk is larger than allowed.')
+        if checksum and digest.hexdigest() != checksum.lower():
+            raise ValueError('Chunk checksum mismatch.')
+
+        # The conditional UPDATE both picks the one request that may write at
+        # this offset and locks the session (row lock, or SQLite's write lock)
+        # until commit, so the splice below never runs twice at once
+        updated = UploadSession.query.filter_by(id=session.id, received_bytes=offset)\
+            .update({'received_bytes': offset + written, 'updated_at': datetime.utcnow()},
+                    synchronize_session=False)
+        if not updated:
+            db.session.rollback()
+            db.session.refresh(session)
+            raise ChunkOffsetError(session.received_bytes)
+        try:
+            with open(part_path(session.id), 'r+b') as part, open(chunk_path, 'rb') as chunk:
+                part.seek(offset)
+                for data in iter(lambda: chunk.read(CHUNK_SIZE), b''):
+                    part.write(data)
+                part.truncate(offset + written)  # Drop bytes left by a splice whose commit failed
+        except OSError:
+            db.session.rollback()
+            raise
+        db.session.commit()
+    finally:
+        if os.path.exists(chunk_path):
+            os.remove(chunk_path)
+    db.session.refresh(session)
+    return session
+
+
+def _link_for_store(path):
+    """A second name for the assembled file for store_local_file to consume, so the part survives a failed commit"""
+    temp_path = f'{path}.{uuid.uuid4().hex}.store'
+    try:
+        os.link(path, temp_path)
+    except OSError:
+        shutil.copyfile(path, temp_path)
+    return temp_path
+
+
+def complete_upload(session):
+    """
+    Hash the assembled file, move it into content-addressed storage and record
+    it as a ProjectDocument. Returns the document.
+    """
+    if session.status == 'complete':
+        return db.session.get(ProjectDocument, session.document_id)
+    if session.received_bytes != session.total_size:
+        raise ValueError(f'Upload incomplete: {session.received_bytes} of {session.total_size} bytes received.')
+
+    # Like append_chunk, the conditional UPDATE picks the one request that
+    # completes the upload and holds the session's row lock until commit; a
+    # concurrent or retried complete waits for it and returns its document
+    claimed = UploadSession.query.filter_by(id=session.id, status='open', received_bytes=session.total_size)\
+        .update({'status': 'complete', 'updated_at': datetime.utcnow()}, synchronize_session=False)
+    if not claimed:
+        db.session.rollback()
+        db.session.refresh(session)
+        if session.status == 'complete':
+            return db.session.get(ProjectDocument, session.document_id)
+        raise ValueError(f'Upload incomplete: {session.received_bytes} of {session.total_size} bytes received.')
+
+    path = part_path(session.id)
+    temp_path = None
+    try:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for data in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(data)
+
+        temp_path = _link_for_store(path)
+        stored_path = store_local_file(temp_path, session.folder, _extension(session.original_name),
+                                       digest.hexdigest(), session.total_size)
+        document = ProjectDocument(
+            project_id=session.project_id,
+            document_type=session.document_type,
+            file_path=stored_path,
+            original_name=session.original_name
+        )
+        db.session.add(document)
+        db.session.flush()
+        session.status = 'complete'
+        session.document_id = document.id
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    # Only now is the upload recorded; until here a retry can start over from the part file
+    if os.path.exists(path):
+        os.remove(path)
+    return document
+
+
+def expire_sessions():
+    """Drop open sessions idle past SESSION_TTL and their partial files. Returns how many."""
+    cutoff = datetime.utcnow() - SESSION_TTL
+    stale = UploadSession.query.filter(UploadSession.status == 'open', UploadSession.updated_at < cutoff).all()
+    for session in stale:
+        if os.path.exists(part_path(session.id)):
+            os.remove(part_path(session.id))
+        db.session.delete(session)
+    db.session.commit()
+    return len(stale)
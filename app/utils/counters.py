@@ -0,0 +1,145 @@
+"""
+Counters - Event-driven maintenance and nightly reconciliation of profile stats
+"""
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models import DeveloperProfile, ClientProfile, Article, Appointment, Project, Team, TeamMember
+
+
+def _developer_counters():
+    """Column -> correlated subquery computing it from the source rows"""
+    rated = db.and_(Appointment.developer_id == DeveloperProfile.id,
+                    Appointment.status == 'completed', Appointment.rating.isnot(None))
+    return {
+        'articles_count': db.select(db.func.count(Article.id)).where(
+            Article.developer_id == DeveloperProfile.id, Article.status == 'approved'
+        ).scalar_subquery(),
+        'projects_completed': db.select(db.func.count(db.distinct(Project.id)))
+            .select_from(TeamMember)
+            .join(Team, Team.id == TeamMember.team_id)
+            .join(Project, Project.id == Team.project_id)
+            .where(TeamMember.developer_id == DeveloperProfile.id, TeamMember.status == 'active',
+                   Project.status == 'completed')
+            .scalar_subquery(),
+        'rating': db.select(db.func.coalesce(db.func.round(db.func.avg(Appointment.rating), 2), 0))
+            .where(rated).scalar_subquery(),
+        'reviews_count': db.select(db.func.count(Appointment.id)).where(rated).scalar_subquery(),
+    }
+
+
+def _client_counters():
+    return {
+        'projects_submitted': db.select(db.func.count(Project.id))
+            .where(Project.client_id == ClientProfile.id).scalar_subquery(),
+        'projects_completed': db.select(db.func.count(Project.id))
+            .where(Project.client_id == ClientProfile.id, Project.status == 'completed').scalar_subquery(),
+    }
+
+
+def _refresh(connection, model, counters, ids):
+    if not ids:
+        return 0
+    return connection.execute(
+        db.update(model).where(model.id.in_(sorted(ids))).values(**counters)
+    ).rowcount
+
+
+def refresh_developer_stats(developer_ids, connection=None):
+    """Recompute every counter for the given DeveloperProfile ids in one UPDATE"""
+    return _refresh(connection or db.session.connection(), DeveloperProfile, _developer_counters(), set(developer_ids))
+
+
+def refresh_client_stats(client_ids, connection=None):
+    """Recompute every counter for the given ClientProfile ids in one UPDATE"""
+    return _refresh(connection or db.session.connection(), ClientProfile, _client_counters(), set(client_ids))
+
+
+def reconcile_counters():
+    """
+    Rewrite every profile whose stored counters drifted from the source rows,
+    one UPDATE per table. Returns {'developer_profiles': n, 'client_profiles': n}.
+    """
+    fixed = {}
+    for model, counters in ((DeveloperProfile, _developer_counters()), (ClientProfile, _client_counters())):
+        drifted = db.or_(*[db.func.coalesce(getattr(model, column), -1) != value
+                           for column, value in counters.items()])
+        fixed[model.__tablename__] = db.session.execute(
+            db.update(model).where(drifted).values(**counters)
+        ).rowcount
+    db.session.commit()
+    return fixed
+
+
+COUNTER_COLUMNS = {
+    DeveloperProfile: ('articles_count', 'projects_completed', 'rating', 'reviews_count'),
+    ClientProfile: ('projects_submitted', 'projects_completed'),
+}
+
+# Attributes that feed a counter; other edits (e.g. article views) do not trigger a refresh
+WATCHED = {
+    Article: ('status', 'developer_id'),
+    Appointment: ('status', 'rating', 'developer_id'),
+    TeamMember: ('status', 'developer_id', 'team_id'),
+    Team: ('project_id',),
+    Project: ('status', 'client_id'),
+}
+
+
+def _changed(obj, attrs):
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _value_history(obj, attr):
+    """Current and previous values, so moving a row refreshes both the old and new owner"""
+    history = inspect(obj).attrs[attr].history
+    return {v for v in (*history.unchanged, *history.added, *history.deleted) if v is not None}
+
+
+def _affected_profiles(session):
+    """DeveloperProfile and ClientProfile ids whose counters this flush may have changed"""
+    developer_ids, client_ids, team_ids, project_ids = set(), set(), set(), set()
+    dirty = [obj for obj in session.dirty if type(obj) in WATCHED and _changed(obj, WATCHED[type(obj)])]
+
+    for obj in [*session.new, *session.deleted, *dirty]:
+        if isinstance(obj, (Article, Appointment, TeamMember)):
+            developer_ids |= _value_history(obj, 'developer_id')
+        elif isinstance(obj, Team):
+            team_ids |= _value_history(obj, 'id')
+        elif isinstance(obj, Project):
+            client_ids |= _value_history(obj, 'client_id')
+            project_ids |= _value_history(obj, 'id')
+
+    if team_ids or project_ids:
+        members = db.select(TeamMember.developer_id).join(Team, Team.id == TeamMember.team_id)\
+            .where(db.or_(Team.id.in_(team_ids), Team.project_id.in_(project_ids)))
+        developer_ids.update(session.execute(members).scalars())
+    return developer_ids, client_ids
+
+
+def _after_flush(session, flush_context):
+    developer_ids, client_ids = _affected_profiles(session)
+    if not developer_ids and not client_ids:
+        return
+    connection = session.connection()
+    refresh_developer_stats(developer_ids, connection)
+    refresh_client_stats(client_ids, connection)
+    session.info.setdefault('refreshed_counters', set()).update(
+        [(DeveloperProfile, i) for i in developer_ids] + [(ClientProfile, i) for i in client_ids])
+
+
+def _after_flush_postexec(session, flush_context):
+    # Profiles already loaded in this session would otherwise show the old values until commit
+    for model, profile_id in session.info.pop('refreshed_counters', ()):
+        profile = session.identity_map.get(session.identity_key(model, profile_id))
+        if profile is not None:
+            session.expire(profile, COUNTER_COLUMNS[model])
+
+
+def register_counter_events():
+    """Keep profile counters in step with every ORM flush; bulk query updates refresh explicitly"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'after_flush_postexec', _after_flush_postexec)
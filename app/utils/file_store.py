@@ -0,0 +1,211 @@
+"""
+File Store - Content-addressed, reference-counted upload storage and orphan collection
+"""
+
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User, Article, KYCDocument, ProjectDocument, StoredFile
+from app.utils.storage import get_storage
+from app.utils.images import delete_variants, variant_source
+import hashlib
+import os
+import time
+import uuid
+
+
+CHUNK_SIZE = 64 * 1024
+# Uploads are hashed into here before being handed to the storage backend
+INCOMING_DIR = '.incoming'
+
+# Upload folder -> (model, column) holding references to files in it
+FOLDER_REFERENCES = {
+    'avatars': (User, 'avatar'),
+    'articles': (Article, 'cover_image'),
+    'kyc': (KYCDocument, 'document_path'),
+    'projects': (ProjectDocument, 'file_path'),
+}
+
+# Files younger than this are never collected - they may belong to an upload
+# whose record has not been committed yet
+GC_GRACE = timedelta(hours=1)
+
+
+def _incoming_path():
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], INCOMING_DIR)
+
+
+def blob_path(sha256, ext):
+    """Relative path of a blob inside its folder: ab/abcdef....ext"""
+    name = f'{sha256}.{ext}' if ext else sha256
+    return f'{sha256[:2]}/{name}'
+
+
+def _stream_to_temp(file):
+    """Write the upload to a temp file while hashing it. Returns (temp_path, sha256, size)."""
+    os.makedirs(_incoming_path(), exist_ok=True)
+    temp_path = os.path.join(_incoming_path(), uuid.uuid4().hex)
+
+    digest = hashlib.sha256()
+    size = 0
+    stream = getattr(file, 'stream', file)
+    with open(temp_path, 'wb') as out:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+            out.write(chunk)
+    return temp_path, digest.hexdigest(), size
+
+
+def store_upload(file, folder, ext):
+    """
+    Store an upload under its content hash, reusing the existing blob if the
+    same bytes were uploaded to this folder before. The StoredFile row is added
+    to the session; the caller commits along with the record that references it.
+    Returns the path to save on that record.
+    """
+    temp_path, sha256, size = _stream_to_temp(file)
+    return store_local_file(temp_path, folder, ext, sha256, size, getattr(file, 'mimetype', None))
+
+
+def store_local_file(temp_path, folder, ext, sha256, size, content_type=None):
+    """
+    store_upload for a file already written and hashed under the incoming
+    directory (e.g. an assembled chunked upload). The temp file is consumed.
+    """
+    relative = blob_path(sha256, ext)
+
+    stored = StoredFile.query.filter_by(folder=folder, sha256=sha256).first()
+    if stored is None:
+        get_storage().put_file(temp_path, f'{folder}/{relative}', content_type)
+        try:
+            with db.session.begin_nested():
+                db.session.add(StoredFile(folder=folder, sha256=sha256, path=relative, size=size))
+            return relative
+        except IntegrityError:
+            # Another worker stored the same bytes first - share its row
+            stored = StoredFile.query.filter_by(folder=folder, sha256=sha256).first()
+    else:
+        os.remove(temp_path)
+
+    StoredFile.query.filter_by(id=stored.id)\
+        .update({'ref_count': StoredFile.ref_count + 1}, synchronize_session=False)
+    return stored.path
+
+
+def release(path, folder):
+    """
+    Drop one reference to a stored file. A blob whose last reference goes
+    loses its StoredFile row and is left for gc-uploads, which only collects
+    files nothing references; files saved before content addressing are
+    deleted once the caller's transaction commits.
+    """
+    if not path:
+        return False
+
+    stored = StoredFile.query.filter_by(folder=folder, path=path).first()
+    if stored is not None:
+        StoredFile.query.filter_by(id=stored.id)\
+            .update({'ref_count': StoredFile.ref_count - 1}, synchronize_session=False)
+        db.session.refresh(stored, ['ref_count'])
+        if stored.ref_count > 0:
+            return False
+        db.session.delete(stored)
+        return True
+
+    db.session.info.setdefault('released_files', []).append((folder, path))
+    return True
+
+
+def _after_commit(session):
+    released = session.info.pop('released_files', ())
+    if not released:
+        return
+    storage = get_storage()
+    for folder, path in released:
+        try:
+            delete_variants(storage, folder, path)
+            storage.delete(f'{folder}/{path}')
+        except OSError as e:
+            current_app.logger.warning(f'Could not delete {folder}/{path}: {e}')
+
+
+def _after_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop('released_files', None)
+
+
+def register_release_events():
+    """Delete released legacy files only once the transaction that released them commits"""
+    if not event.contains(Session, 'after_commit', _after_commit):
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_soft_rollback', _after_rollback)
+
+
+# ============ Garbage Collection ============
+
+def _referenced_paths(folder):
+    """{path: reference count} for one folder, from a grouped query on its referencing column"""
+    model, column_name = FOLDER_REFERENCES[folder]
+    column = getattr(model, column_name)
+    return dict(db.session.query(column, db.func.count()).filter(column.isnot(None), column != '')
+                .group_by(column).all())
+
+
+def collect_garbage(dry_run=False):
+    """
+    Delete files under uploads/ that no record references, drop StoredFile rows
+    nothing references and correct drifted reference counts.
+    Returns {'deleted': [paths], 'freed_bytes': int, 'fixed_rows': int}.
+    """
+    row_cutoff = datetime.utcnow() - GC_GRACE
+    file_cutoff = time.time() - GC_GRACE.total_seconds()
+    report = {'deleted': [], 'freed_bytes': 0, 'fixed_rows': 0}
+
+    storage = get_storage()
+
+    for folder in FOLDER_REFERENCES:
+        referenced = _referenced_paths(folder)
+
+        for stored in StoredFile.query.filter_by(folder=folder).all():
+            count = referenced.get(stored.path, 0)
+            if count and count != stored.ref_count:
+                stored.ref_count = count
+                report['fixed_rows'] += 1
+            elif not count and stored.created_at < row_cutoff:
+                db.session.delete(stored)
+                report['fixed_rows'] += 1
+
+        for key, size, modified in list(storage.iter_keys(f'{folder}/')):
+            # Resized variants live as long as their original
+            original = variant_source(key) or key
+            if original[len(folder) + 1:] in referenced or modified >= file_cutoff:
+                continue
+            report['deleted'].append(key)
+            report['freed_bytes'] += size
+            if not dry_run:
+                storage.delete(key)
+
+    # Temp files left behind by interrupted uploads. Chunked uploads stay
+    # resumable for longer and are expired together with their sessions.
+    if os.path.isdir(_incoming_path()) and not dry_run:
+        from app.utils.chunked_upload import SESSION_TTL, expire_sessions
+        expire_sessions()
+        part_cutoff = time.time() - SESSION_TTL.total_seconds()
+        for name in os.listdir(_incoming_path()):
+            temp_path = os.path.join(_incoming_path(), name)
+            cutoff = part_cutoff if name.endswith('.part') else file_cutoff
+            if os.stat(temp_path).st_mtime < cutoff:
+                os.remove(temp_path)
+
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    return report
@@ -2,11 +2,9 @@
 Helper Functions
 """
 
-import os
 import uuid
 from datetime import datetime
 from flask import current_app
-from werkzeug.utils import secure_filename
 
 
 def allowed_file(filename):
@@ -28,6 +26,9 @@ def save_file(file, folder, custom_name=None):
     """
     Save uploaded file to specified folder
     Returns the saved filename or None if failed
+    
+    Uploads are content-addressed: identical files in the same folder share
+    one blob (see app.utils.file_store). A custom_name bypasses this.
     """
     if not file or not file.filename:
         return None
@@ -35,33 +36,26 @@ def save_file(file, folder, custom_name=None):
     if not allowed_file(file.filename):
         return None
     
-    # Generate unique filename
-    filename = custom_name or generate_unique_filename(secure_filename(file.filename))
+    from app.utils.images import schedule_variants
     
-    # Ensure upload folder exists
-    upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], folder)
-    os.makedirs(upload_path, exist_ok=True)
+    if not custom_name:
+        from app.utils.file_store import store_upload
+        ext = file.filename.rsplit('.', 1)[1].lower()
+        path = store_upload(file, folder, ext)
+        schedule_variants(folder, path)
+        return path
     
-    # Save file
-    file_path = os.path.join(upload_path, filename)
-    file.save(file_path)
+    from app.utils.storage import get_storage
+    get_storage().put_stream(file.stream, f'{folder}/{custom_name}', file.mimetype)
+    schedule_variants(folder, custom_name)
     
-    return filename
+    return custom_name
 
 
 def delete_file(filename, folder):
-    """Delete a file from the specified folder"""
-    if not filename:
-        return False
-    
-    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], folder, filename)
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            return True
-    except Exception:
-        pass
-    return False
+    """Release a file from the specified folder, deleting it once nothing references it"""
+    from app.utils.file_store import release
+    return release(filename, folder)
 
 
 def format_currency(amount, currency='USD'):
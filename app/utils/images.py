@@ -0,0 +1,175 @@
+"""
+Image Variants - Resized, EXIF-free renditions of avatars and article covers
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app.utils.storage import get_storage
+import io
+import re
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is optional; without it the originals are served
+    Image = None
+
+
+# Upload folder -> {size: (width, height, crop)}. Cropped sizes are filled
+# exactly; the others are scaled to fit inside the box.
+IMAGE_VARIANTS = {
+    'avatars': {
+        'thumb': (128, 128, True),
+        'card': (320, 320, True),
+        'full': (800, 800, False),
+    },
+    'articles': {
+        'thumb': (400, 225, True),
+        'card': (800, 450, True),
+        'full': (1600, 1600, False),
+    },
+}
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+# WebP where Pillow was built with it, otherwise progressive JPEG
+if Image is not None and features.check('webp'):
+    VARIANT_FORMAT, VARIANT_MIMETYPE = 'webp', 'image/webp'
+else:
+    VARIANT_FORMAT, VARIANT_MIMETYPE = 'jpg', 'image/jpeg'
+QUALITY = 80
+
+# <original path>.<size>.<format>, e.g. ab/ab12....png.thumb.webp
+VARIANT_NAME = re.compile(r'^(?P<source>.+\.\w+)\.(?P<size>thumb|card|full)\.(?:webp|jpg)$')
+
+_executor = None
+# Variant keys confirmed to exist, so object stores are not asked twice
+_available = set()
+MAX_AVAILABLE_CACHE = 10000
+
+
+def variants_enabled(folder, path=None):
+    if Image is None or folder not in IMAGE_VARIANTS:
+        return False
+    return path is None or ('.' in path and path.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS)
+
+
+def variant_path(path, size):
+    return f'{path}.{size}.{VARIANT_FORMAT}'
+
+
+def variant_url(folder, path, size):
+    """URL of one rendition of an upload, or of the original when it has none"""
+    if size and variants_enabled(folder, path):
+        return f'/uploads/{folder}/{variant_path(path, size)}'
+    return f'/uploads/{folder}/{path}'
+
+
+def variant_source(key):
+    """'folder/path.png.thumb.webp' -> 'folder/path.png'; None for anything else"""
+    folder = key.split('/', 1)[0]
+    match = VARIANT_NAME.match(key)
+    if match and folder in IMAGE_VARIANTS:
+        return match.group('source')
+    return None
+
+
+def variant_available(key):
+    if key in _available:
+        return True
+    if not get_storage().exists(key):
+        return False
+    if len(_available) >= MAX_AVAILABLE_CACHE:
+        _available.clear()
+    _available.add(key)
+    return True
+
+
+def _render(image, width, height, crop):
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    copy = image.copy()
+    copy.thumbnail((width, height), Image.LANCZOS)
+    return copy
+
+
+def build_variants(storage, folder, path, force=False):
+    """
+    Write every rendition of one upload. Re-encoding drops EXIF (camera
+    details, GPS) after it has been used to fix the orientation.
+    Returns the number of variants written.
+    """
+    sizes = IMAGE_VARIANTS[folder]
+    if not force and all(storage.exists(f'{folder}/{variant_path(path, size)}') for size in sizes):
+        return 0
+
+    with storage.open(f'{folder}/{path}') as stream:
+        image = Image.open(io.BytesIO(stream.read()))
+    largest = max(max(width, height) for width, height, _ in sizes.values())
+    image.draft('RGB', (largest, largest))  # JPEG decodes at reduced scale
+    image = ImageOps.exif_transpose(image)
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    image = image.convert('RGBA' if has_alpha and VARIANT_FORMAT == 'webp' else 'RGB')
+
+    for size, (width, height, crop) in sizes.items():
+        output = io.BytesIO()
+        rendition = _render(image, width, height, crop)
+        if VARIANT_FORMAT == 'webp':
+            rendition.save(output, 'WEBP', quality=QUALITY, method=4)
+        else:
+            rendition.save(output, 'JPEG', quality=QUALITY, optimize=True, progressive=True)
+        output.seek(0)
+        storage.put_stream(output, f'{folder}/{variant_path(path, size)}', VARIANT_MIMETYPE)
+    return len(sizes)
+
+
+def _build_logged(storage, logger, folder, path, force=False):
+    try:
+        return build_variants(storage, folder, path, force)
+    except Exception as e:
+        logger.warning(f'Image variants failed for {folder}/{path}: {e}')
+        return 0
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=current_app.config.get('IMAGE_WORKERS', 2),
+                                       thread_name_prefix='image-variants')
+    return _executor
+
+
+def schedule_variants(folder, path):
+    """Render an upload's variants in the background pool; pages fall back to the original until then"""
+    if not variants_enabled(folder, path):
+        return None
+    return _get_executor().submit(_build_logged, get_storage(), current_app.logger, folder, path)
+
+
+def delete_variants(storage, folder, path):
+    for size in IMAGE_VARIANTS.get(folder, {}):
+        key = f'{folder}/{variant_path(path, size)}'
+        _available.discard(key)
+        storage.delete(key)
+
+
+def backfill_variants(folders=None, workers=4, force=False):
+    """
+    Render variants for every stored image in `folders` (default: all with
+    variants). Returns (images processed, variants written).
+    """
+    from app.models import User, Article
+    columns = {'avatars': User.avatar, 'articles': Article.cover_image}
+    storage = get_storage()
+    logger = current_app.logger
+
+    jobs = []
+    for folder in folders or IMAGE_VARIANTS:
+        column = columns[folder]
+        for (path,) in column.class_.query.with_entities(column).filter(column.isnot(None), column != '').distinct():
+            if variants_enabled(folder, path):
+                jobs.append((folder, path))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        written = sum(pool.map(lambda job: _build_logged(storage, logger, job[0], job[1], force), jobs))
+    return len(jobs), written
@@ -154,3 +154,101 @@ def generate_invoice_pdf(transaction, project, student):
     doc.build(elements)
     buffer.seek(0)
     return buffer
+
+
+def generate_payout_statement_pdf(statement):
+    """
+    Developer payout statement. `statement` is a plain dict (see
+    app.utils.payouts.build_statements) so it can be rendered in a worker process.
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    elements = []
+    
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='HeadingRight', parent=styles['Heading1'], alignment=2, fontSize=22, textColor=colors.HexColor('#4338ca')))
+    styles.add(ParagraphStyle(name='SubHeading', parent=styles['Normal'], fontSize=12, textColor=colors.gray))
+    styles.add(ParagraphStyle(name='FooterText', parent=styles['Normal'], fontSize=10, textColor=colors.gray, alignment=1))
+    
+    # 1. Header
+    logo_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'img', 'logo.png')
+    logo = []
+    if os.path.exists(logo_path):
+        logo = Image(logo_path, width=2*inch, height=0.6*inch)
+        logo.hAlign = 'LEFT'
+    
+    header_data = [
+        [logo, Paragraph("PAYOUT STATEMENT", styles['HeadingRight'])],
+        ["", Paragraph(f"Period: {statement['period_label']}", styles['Normal'])],
+        ["", Paragraph(f"Generated: {datetime.utcnow().strftime('%b %d, %Y')}", styles['Normal'])]
+    ]
+    t_header = Table(header_data, colWidths=[3*inch, 3.5*inch])
+    t_header.setStyle(TableStyle([
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+        ('ALIGN', (1,0), (1,-1), 'RIGHT'),
+        ('LEFTPADDING', (0,0), (-1,-1), 0),
+        ('RIGHTPADDING', (0,0), (-1,-1), 0),
+    ]))
+    elements.append(t_header)
+    elements.append(Spacer(1, 0.4 * inch))
+    
+    # 2. Developer
+    elements.append(Paragraph("<b>Pay To:</b>", styles['Normal']))
+    elements.append(Paragraph(f"<b>{statement['developer_name']}</b>", styles['Normal']))
+    elements.append(Paragraph(statement['developer_email'] or '', styles['Normal']))
+    elements.append(Spacer(1, 0.3 * inch))
+    
+    # 3. Per-project earnings
+    line_data = [["Project", "Milestones", "Payout", "Earned", "Paid", "Due"]]
+    for line in statement['lines']:
+        line_data.append([
+            Paragraph(line['project_title'], styles['Normal']),
+            f"{line['milestones_done']}/{line['milestones_total']}",
+            f"₹ {line['payout_amount']:,.2f}",
+            f"₹ {line['earned']:,.2f}",
+            f"₹ {line['paid']:,.2f}",
+            f"₹ {line['outstanding']:,.2f}"
+        ])
+    line_data.append(["TOTAL", "", "", f"₹ {statement['earned']:,.2f}", f"₹ {statement['paid']:,.2f}",
+                      f"₹ {statement['outstanding']:,.2f}"])
+    
+    t_lines = Table(line_data, colWidths=[2.1*inch, 0.9*inch, 0.9*inch, 0.9*inch, 0.9*inch, 0.9*inch])
+    t_lines.setStyle(TableStyle([
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4f46e5')),
+        ('ALIGN', (1,0), (-1,-1), 'RIGHT'),
+        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+        ('FONTSIZE', (0,0), (-1,-1), 8),
+        ('BACKGROUND', (0,-1), (-1,-1), colors.HexColor('#e0e7ff')),
+        ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'),
+    ]))
+    elements.append(Paragraph("<b>Earnings</b>", styles['SubHeading']))
+    elements.append(Spacer(1, 0.1 * inch))
+    elements.append(t_lines)
+    elements.append(Spacer(1, 0.3 * inch))
+    
+    # 4. Payouts made during the period
+    if statement['payouts']:
+        elements.append(Paragraph("<b>Payouts This Period</b>", styles['SubHeading']))
+        elements.append(Spacer(1, 0.1 * inch))
+        payout_data = [["Date", "Project", "Reference", "Amount"]]
+        for payout in statement['payouts']:
+            payout_data.append([payout['paid_at'], payout['project_title'], payout['reference'] or '-',
+                                f"₹ {payout['amount']:,.2f}"])
+        t_payouts = Table(payout_data, colWidths=[1.2*inch, 2.6*inch, 1.5*inch, 1.2*inch])
+        t_payouts.setStyle(TableStyle([
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+            ('ALIGN', (3,0), (3,-1), 'RIGHT'),
+            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+            ('FONTSIZE', (0,0), (-1,-1), 8),
+        ]))
+        elements.append(t_payouts)
+    
+    elements.append(Spacer(1, 0.5 * inch))
+    elements.append(Paragraph("Earnings accrue as project milestones are completed. Thank you for building with Asan Innovators!", styles['FooterText']))
+    
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,279 @@
+"""
+KYC Pre-checks - Automated document checks that rank the review queue by confidence
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models import KYCDocument
+from app.utils.storage import get_storage
+import base64
+import io
+import re
+
+try:
+    from PIL import Image, ImageFilter, ImageStat
+except ImportError:  # Pillow is optional; without it only type and page checks run
+    Image = None
+
+
+# Magic bytes -> detected type
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'%PDF-', 'pdf'),
+]
+EXTENSION_TYPES = {'jpg': 'jpeg', 'jpeg': 'jpeg', 'png': 'png', 'gif': 'gif', 'pdf': 'pdf'}
+
+MIN_SHORT_SIDE = 600  # px; smaller scans are hard to read
+MIN_SHARPNESS = 100.0  # Variance of the Laplacian on a 1024px greyscale copy
+MIN_BRIGHTNESS, MAX_BRIGHTNESS = 40, 245
+MAX_PDF_PAGES = 4
+# Hashes this many bits apart or closer are treated as the same document
+DUPLICATE_DISTANCE = 6
+
+# Issue penalties, subtracted from a confidence of 1.0
+PENALTIES = {
+    'unreadable': 1.0,
+    'type_mismatch': 0.4,
+    'low_resolution': 0.25,
+    'blurry': 0.2,
+    'exposure': 0.1,
+    'no_image': 0.15,
+    'many_pages': 0.05,
+    'duplicate_other_user': 0.6,
+    'duplicate_same_user': 0.1,
+}
+
+# Below this many documents, checking in-process beats starting a pool
+POOL_THRESHOLD = 4
+# Files held in memory at once during a run
+BATCH_SIZE = 32
+
+_executor = None
+
+
+def sniff_type(data):
+    for signature, detected in SIGNATURES:
+        if data.startswith(signature):
+            return detected
+    return 'unknown'
+
+
+def _pdf_page_count(data):
+    return len(re.findall(rb'/Type\s*/Page(?![a-zA-Z])', data))
+
+
+def _pdf_first_image(data):
+    """Bytes of the first JPEG embedded in a PDF - for scanned documents, the scan itself"""
+    match = re.search(rb'/DCTDecode.*?stream\r?\n', data, re.S)
+    if not match:
+        return None
+    end = data.find(b'endstream', match.end())
+    if end == -1:
+        return None
+    image = data[match.end():end]
+    # Filters are listed in decoding order, so ASCII85 wrapping shows up before /DCTDecode
+    header = data[data.rfind(b'obj', 0, match.start()):match.start()]
+    if b'/ASCII85Decode' in header:
+        image = image.strip()
+        image = base64.a85decode(image, adobe=image.endswith(b'~>'))
+    return image
+
+
+def difference_hash(image):
+    """64-bit perceptual (difference) hash as 16 hex characters; robust to rescaling and recompression"""
+    small = image.convert('L').resize((9, 8), Image.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f'{bits:016x}'
+
+
+def hash_distance(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def _check_image(data, result):
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    result['image_width'], result['image_height'] = image.size
+    if min(image.size) < MIN_SHORT_SIDE:
+        result['issues'].append(('low_resolution', f'Low resolution ({image.size[0]}x{image.size[1]})'))
+
+    grey = image.convert('L')
+    grey.thumbnail((1024, 1024))
+    laplacian = grey.filter(ImageFilter.Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=1, offset=128))
+    result['sharpness'] = round(ImageStat.Stat(laplacian).var[0], 1)
+    if result['sharpness'] < MIN_SHARPNESS:
+        result['issues'].append(('blurry', f"Blurry (sharpness {result['sharpness']})"))
+
+    brightness = ImageStat.Stat(grey).mean[0]
+    if not MIN_BRIGHTNESS <= brightness <= MAX_BRIGHTNESS:
+        result['issues'].append(('exposure', 'Too dark' if brightness < MIN_BRIGHTNESS else 'Overexposed'))
+
+    result['perceptual_hash'] = difference_hash(image)
+
+
+def analyze_document(data, extension):
+    """
+    Worker entry point - every check that needs only the file's bytes.
+    Returns a dict of column values plus 'issues': [(code, message)].
+    """
+    result = {'detected_type': sniff_type(data), 'image_width': None, 'image_height': None,
+              'sharpness': None, 'perceptual_hash': None, 'page_count': None, 'issues': []}
+
+    expected = EXTENSION_TYPES.get((extension or '').lower())
+    if result['detected_type'] == 'unknown':
+        result['issues'].append(('unreadable', 'File is not a recognised image or PDF'))
+        return result
+    if expected and expected != result['detected_type']:
+        result['issues'].append(('type_mismatch', f".{extension} file contains {result['detected_type']} data"))
+
+    image_data = data
+    if result['detected_type'] == 'pdf':
+        result['page_count'] = _pdf_page_count(data)
+        if result['page_count'] > MAX_PDF_PAGES:
+            result['issues'].append(('many_pages', f"{result['page_count']} pages"))
+        try:
+            image_data = _pdf_first_image(data)
+        except ValueError:
+            image_data = None
+        if image_data is None:
+            result['issues'].append(('no_image', 'PDF has no scanned page image to check'))
+            return result
+    else:
+        result['page_count'] = 1
+
+    if Image is None:
+        return result
+    try:
+        _check_image(image_data, result)
+    except Exception as e:
+        if result['detected_type'] == 'pdf':
+            result['issues'].append(('no_image', 'Scanned page image in the PDF could not be decoded'))
+        else:
+            result['issues'].append(('unreadable', f'Image could not be decoded: {e}'))
+    return result
+
+
+def _find_duplicate(doc, result, by_path, hashed):
+    """Earlier document with the same bytes or a near-identical perceptual hash"""
+    same_file = by_path.get(doc.document_path)
+    if same_file and same_file[0] != doc.id:
+        return same_file
+    if result['perceptual_hash']:
+        for other_id, other_user_id, other_hash in hashed:
+            if other_id != doc.id and hash_distance(result['perceptual_hash'], other_hash) <= DUPLICATE_DISTANCE:
+                return other_id, other_user_id
+    return None, None
+
+
+def _remember(doc, by_path, hashed):
+    by_path.setdefault(doc.document_path, (doc.id, doc.user_id))
+    if doc.perceptual_hash:
+        hashed.append((doc.id, doc.user_id, doc.perceptual_hash))
+
+
+def _read_document(storage, doc):
+    """The document's bytes, or None when storage could not be read (the row stays pending)"""
+    try:
+        with storage.open(f'kyc/{doc.document_path}') as stream:
+            return stream.read()
+    except Exception as e:
+        current_app.logger.warning(f'KYC pre-check could not read document {doc.id}: {e}')
+        return None
+
+
+def run_prechecks(doc_ids=None, recheck=False, workers=None):
+    """
+    Check documents (default: every one not yet checked), in a process pool
+    when there are enough of them, and store the results and confidence.
+    Files are read BATCH_SIZE at a time; documents whose file can't be read
+    are skipped and left for the next run. Returns the number checked.
+    """
+    query = KYCDocument.query
+    if doc_ids:
+        query = query.filter(KYCDocument.id.in_(doc_ids))
+    elif not recheck:
+        query = query.filter(db.or_(KYCDocument.check_status.is_(None), KYCDocument.check_status == 'pending'))
+    docs = query.order_by(KYCDocument.id).all()
+    if not docs:
+        return 0
+
+    # Compare against every document checked before these, then against each other in order
+    checking = {doc.id for doc in docs}
+    by_path, hashed = {}, []
+    for row in (db.session.query(KYCDocument.id, KYCDocument.user_id, KYCDocument.document_path,
+                                 KYCDocument.perceptual_hash)
+                .filter(KYCDocument.check_status == 'done').order_by(KYCDocument.id)):
+        if row.id not in checking:
+            _remember(row, by_path, hashed)
+
+    storage = get_storage()
+    pool = ProcessPoolExecutor(max_workers=workers) if len(docs) >= POOL_THRESHOLD else None
+    checked = 0
+    try:
+        for start in range(0, len(docs), BATCH_SIZE):
+            batch = []
+            for doc in docs[start:start + BATCH_SIZE]:
+                data = _read_document(storage, doc)
+                if data is not None:
+                    extension = doc.document_path.rsplit('.', 1)[-1] if '.' in doc.document_path else ''
+                    batch.append((doc, data, extension))
+            if not batch:
+                continue
+
+            payloads = [(data, extension) for _, data, extension in batch]
+            if pool is None:
+                results = [analyze_document(*payload) for payload in payloads]
+            else:
+                results = list(pool.map(analyze_document, *zip(*payloads), chunksize=4))
+            del payloads
+
+            now = datetime.utcnow()
+            for (doc, _, _), result in zip(batch, results):
+                duplicate_id, duplicate_user_id = _find_duplicate(doc, result, by_path, hashed)
+                if duplicate_id:
+                    code = 'duplicate_same_user' if duplicate_user_id == doc.user_id else 'duplicate_other_user'
+                    owner = 'this developer' if code == 'duplicate_same_user' else 'another developer'
+                    result['issues'].append((code, f'Matches document #{duplicate_id} from {owner}'))
+
+                for column in ('detected_type', 'image_width', 'image_height', 'sharpness', 'perceptual_hash',
+                               'page_count'):
+                    setattr(doc, column, result[column])
+                doc.duplicate_of_id = duplicate_id
+                doc.confidence = round(max(0.0, 1.0 - sum(PENALTIES[code] for code, _ in result['issues'])), 2)
+                doc.check_notes = '\n'.join(message for _, message in result['issues']) or None
+                doc.check_status = 'failed' if any(code == 'unreadable' for code, _ in result['issues']) else 'done'
+                doc.checked_at = now
+                _remember(doc, by_path, hashed)
+            checked += len(batch)
+            db.session.commit()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return checked
+
+
+def _precheck_in_background(app, doc_id):
+    with app.app_context():
+        try:
+            run_prechecks([doc_id])
+        except Exception as e:
+            app.logger.warning(f'KYC pre-check failed for document {doc_id}: {e}')
+        finally:
+            db.session.remove()
+
+
+def schedule_precheck(doc_id):
+    """Check a newly submitted document in a background thread"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='kyc-precheck')
+    return _executor.submit(_precheck_in_background, current_app._get_current_object(), doc_id)
@@ -0,0 +1,65 @@
+"""
+KYC Review - Single-transaction approve/reject of many documents with user status rollup
+"""
+
+from datetime import datetime
+from app import db
+from app.models import User, KYCDocument
+
+
+REVIEW_ACTIONS = {'approve': 'approved', 'reject': 'rejected'}
+
+
+def roll_up_user_status(user_ids):
+    """
+    Mark every user in `user_ids` verified once none of their documents is
+    left unapproved - one UPDATE with a correlated NOT EXISTS, so no documents
+    are loaded. Suspended users stay suspended. Returns how many users changed.
+    """
+    unapproved = db.session.query(KYCDocument.id).filter(
+        KYCDocument.user_id == User.id, KYCDocument.status != 'approved'
+    ).exists()
+    any_document = db.session.query(KYCDocument.id).filter(KYCDocument.user_id == User.id).exists()
+
+    return User.query.filter(
+        User.id.in_(user_ids),
+        User.status.notin_(['verified', 'suspended']),
+        any_document,
+        ~unapproved
+    ).update({'status': 'verified'}, synchronize_session=False)
+
+
+def review_documents(doc_ids, action, admin_id, reason=None, notes=None):
+    """
+    Approve or reject pending documents in one transaction. Documents already
+    reviewed are left alone, so a retried request changes nothing.
+    Returns {'updated', 'skipped', 'verified_users'}.
+    """
+    if action not in REVIEW_ACTIONS:
+        raise ValueError(f"Unknown review action '{action}'.")
+    ids = sorted({int(doc_id) for doc_id in doc_ids})
+    if not ids:
+        return {'updated': 0, 'skipped': 0, 'verified_users': 0}
+
+    now = datetime.utcnow()
+    values = {
+        'status': REVIEW_ACTIONS[action],
+        'reviewed_by': admin_id,
+        'reviewed_at': now,
+        'admin_notes': notes or None,
+        'updated_at': now,
+    }
+    if action == 'reject':
+        values['rejection_reason'] = reason or 'Document rejected'
+
+    try:
+        updated = KYCDocument.query.filter(KYCDocument.id.in_(ids), KYCDocument.status == 'pending')\
+            .update(values, synchronize_session=False)
+        affected_users = db.select(KYCDocument.user_id).where(KYCDocument.id.in_(ids))
+        verified = roll_up_user_status(affected_users) if action == 'approve' else 0
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {'updated': updated, 'skipped': len(ids) - updated, 'verified_users': verified}
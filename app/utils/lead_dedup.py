@@ -0,0 +1,125 @@
+"""
+Lead Deduplication - Match incoming leads against existing ones and merge duplicates
+"""
+
+from difflib import SequenceMatcher
+from app import db
+from app.utils.validators import normalize_phone, normalize_email
+import re
+
+
+# Minimum combined name/college similarity for a fuzzy duplicate
+FUZZY_THRESHOLD = 0.85
+NAME_WEIGHT = 0.7
+COLLEGE_WEIGHT = 0.3
+
+# Words that carry no signal in college names
+COLLEGE_STOPWORDS = {'of', 'and', 'the', 'college', 'university', 'institute', 'engineering', 'technology'}
+
+
+def normalize_name(name):
+    """Lowercase, strip punctuation and sort tokens so word order does not matter"""
+    tokens = re.findall(r'[a-z]+', (name or '').lower())
+    return ' '.join(sorted(tokens))
+
+
+def normalize_college(college):
+    """Lowercase college name without filler words"""
+    tokens = re.findall(r'[a-z0-9]+', (college or '').lower())
+    return ' '.join(t for t in tokens if t not in COLLEGE_STOPWORDS)
+
+
+def blocking_key(name, college):
+    """
+    Coarse key used to bucket leads before fuzzy comparison: the sorted
+    initials of the name plus the first three letters of the college.
+    Only leads sharing a key are compared, keeping matching near-linear.
+    """
+    initials = ''.join(sorted(token[0] for token in normalize_name(name).split()))
+    return f"{initials}:{normalize_college(college)[:3]}"[:50]
+
+
+def match_keys(student_name, phone, email, college):
+    """Return the indexed dedup columns for a lead's raw field values"""
+    return {
+        'phone_normalized': normalize_phone(phone),
+        'email_normalized': normalize_email(email),
+        'match_key': blocking_key(student_name, college)
+    }
+
+
+def similarity(name_a, college_a, name_b, college_b):
+    """Weighted name + college similarity between 0 and 1"""
+    name_score = SequenceMatcher(None, normalize_name(name_a), normalize_name(name_b)).ratio()
+    college_a, college_b = normalize_college(college_a), normalize_college(college_b)
+    if college_a and college_b:
+        college_score = SequenceMatcher(None, college_a, college_b).ratio()
+    else:
+        college_score = 0.5  # Unknown - neutral
+    return NAME_WEIGHT * name_score + COLLEGE_WEIGHT * college_score
+
+
+def find_duplicates(student_name, phone=None, email=None, college=None, exclude_id=None):
+    """
+    Return possible duplicates of the given lead details as a list of
+    (Lead, reason) tuples. Exact phone/email matches use the indexed
+    normalized columns; fuzzy matches only scan leads in the same block.
+    """
+    from app.models import Lead
+
+    keys = match_keys(student_name, phone, email, college)
+    matches = {}
+
+    exact_filters = []
+    if keys['phone_normalized']:
+        exact_filters.append(Lead.phone_normalized == keys['phone_normalized'])
+    if keys['email_normalized']:
+        exact_filters.append(Lead.email_normalized == keys['email_normalized'])
+
+    if exact_filters:
+        for lead in Lead.query.filter(db.or_(*exact_filters)).all():
+            if keys['phone_normalized'] and lead.phone_normalized == keys['phone_normalized']:
+                matches[lead.id] = (lead, 'Same phone number')
+            else:
+                matches[lead.id] = (lead, 'Same email address')
+
+    for lead in Lead.query.filter(Lead.match_key == keys['match_key']).all():
+        if lead.id in matches:
+            continue
+        score = similarity(student_name, college, lead.student_name, lead.college)
+        if score >= FUZZY_THRESHOLD:
+            matches[lead.id] = (lead, f'Similar name and college ({score:.0%})')
+
+    matches.pop(exclude_id, None)
+    return sorted(matches.values(), key=lambda m: m[0].id)
+
+
+def merge_leads(survivor, duplicate):
+    """
+    Merge `duplicate` into `survivor`: move follow-up history, fill blank
+    fields and carry over a confirmed project. The caller commits.
+    Raises ValueError if both leads already have a confirmed project.
+    """
+    from app.models import LeadFollowUp
+
+    if survivor.id == duplicate.id:
+        raise ValueError('Cannot merge a lead into itself.')
+    if survivor.confirmed_project and duplicate.confirmed_project:
+        raise ValueError('Both leads have confirmed projects.')
+
+    # Set-based move of the whole follow-up history
+    LeadFollowUp.query.filter_by(lead_id=duplicate.id)\
+        .update({'lead_id': survivor.id}, synchronize_session=False)
+
+    for field in ('email', 'college', 'domain', 'source', 'requirement_summary'):
+        if not getattr(survivor, field) and getattr(duplicate, field):
+            setattr(survivor, field, getattr(duplicate, field))
+
+    if duplicate.confirmed_project:
+        duplicate.confirmed_project.lead_id = survivor.id
+        survivor.status = duplicate.status
+
+    db.session.expire(duplicate, ['follow_ups', 'confirmed_project'])
+    db.session.delete(duplicate)
+    db.session.expire(survivor, ['follow_ups'])
+    return survivor
@@ -0,0 +1,197 @@
+"""
+Lead Funnel Analytics - Stage conversion, transitions and time-in-stage for lead cohorts
+"""
+
+from datetime import datetime, timedelta
+from app import db
+from app.models import Lead, LeadFollowUp
+
+
+# Ordered progression; Dropped can be reached from any stage
+FUNNEL_STAGES = ['New Lead', 'Follow-up', 'Interested', 'Confirmed']
+DROPPED = 'Dropped'
+DIMENSIONS = ('source', 'domain', 'college')
+
+# Time-in-stage histogram bucket upper bounds, in days
+DURATION_BUCKETS = [(1, '< 1 day'), (3, '1-3 days'), (7, '3-7 days'), (14, '1-2 weeks'), (30, '2-4 weeks')]
+DURATION_OVERFLOW = '> 4 weeks'
+
+FUNNEL_CACHE_TTL = timedelta(minutes=5)
+FUNNEL_CACHE_SIZE = 32
+
+_funnel_cache = {}
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _bucket_label(days):
+    for limit, label in DURATION_BUCKETS:
+        if days < limit:
+            return label
+    return DURATION_OVERFLOW
+
+
+def _stage_rank(status):
+    return FUNNEL_STAGES.index(status) if status in FUNNEL_STAGES else -1
+
+
+def _walk_stages(leads, history):
+    """
+    Replay each lead's stage path - creation, then follow-ups in time order,
+    then any status change made outside a follow-up (e.g. project confirmation).
+    Returns ({(from, to): count}, {stage: [hours spent before leaving]}, [furthest funnel rank]).
+    """
+    transitions = {}
+    durations = {}
+    furthest = []
+
+    for lead_id, status, created_at, updated_at in leads:
+        stage, entered, rank = FUNNEL_STAGES[0], created_at, 0
+        events = history.get(lead_id, ())
+        if status and status != (events[-1][0] if events else stage):
+            events = list(events) + [(status, max(updated_at or created_at, events[-1][1] if events else created_at))]
+
+        for next_stage, at in events:
+            if not next_stage or next_stage == stage or at is None:
+                continue
+            transitions[(stage, next_stage)] = transitions.get((stage, next_stage), 0) + 1
+            durations.setdefault(stage, []).append((at - entered).total_seconds() / 3600)
+            rank = max(rank, _stage_rank(next_stage))
+            stage, entered = next_stage, at
+        furthest.append(rank)
+
+    return transitions, durations, furthest
+
+
+def compute_funnel(start, end):
+    """
+    Funnel report for leads created in [start, end). Returns a JSON-ready dict:
+        stages: leads that reached each stage and conversion from the previous one
+        transitions: [{'from', 'to', 'count'}]
+        time_in_stage: {stage: {'count', 'median_hours', 'p90_hours', 'histogram'}}
+        breakdown: {dimension: [{'value', 'leads', 'confirmed', 'dropped', 'conversion'}]}
+        cohorts: [{'week', 'leads', 'confirmed', 'dropped'}]
+    """
+    in_range = db.and_(Lead.created_at >= start, Lead.created_at < end)
+
+    # Plain column selects - no ORM entity loading for a year of history
+    leads = db.session.execute(
+        db.select(Lead.id, Lead.status, Lead.created_at, Lead.updated_at).where(in_range)
+    ).all()
+    follow_ups = db.session.execute(
+        db.select(LeadFollowUp.lead_id, LeadFollowUp.status_at_time, LeadFollowUp.created_at)
+        .join(Lead, Lead.id == LeadFollowUp.lead_id)
+        .where(in_range)
+        .order_by(LeadFollowUp.lead_id, LeadFollowUp.created_at)
+    ).all()
+
+    history = {}
+    for lead_id, status, at in follow_ups:
+        history.setdefault(lead_id, []).append((status, at))
+
+    transitions, durations, furthest = _walk_stages(leads, history)
+
+    reached = [0] * len(FUNNEL_STAGES)
+    for rank in furthest:
+        for index in range(rank + 1):
+            reached[index] += 1
+
+    stages = []
+    for index, name in enumerate(FUNNEL_STAGES):
+        previous = reached[index - 1] if index else reached[0]
+        stages.append({
+            'stage': name,
+            'leads': reached[index],
+            'conversion': round(reached[index] / previous, 4) if previous else None
+        })
+    stages.append({
+        'stage': DROPPED,
+        'leads': sum(count for (_, to), count in transitions.items() if to == DROPPED),
+        'conversion': None
+    })
+
+    time_in_stage = {}
+    for stage, hours in durations.items():
+        hours.sort()
+        histogram = {label: 0 for _, label in DURATION_BUCKETS}
+        histogram[DURATION_OVERFLOW] = 0
+        for value in hours:
+            histogram[_bucket_label(value / 24)] += 1
+        time_in_stage[stage] = {
+            'count': len(hours),
+            'median_hours': round(_percentile(hours, 0.5), 1),
+            'p90_hours': round(_percentile(hours, 0.9), 1),
+            'histogram': histogram
+        }
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'total_leads': len(leads),
+        'stages': stages,
+        'transitions': [{'from': a, 'to': b, 'count': c} for (a, b), c in sorted(transitions.items())],
+        'time_in_stage': time_in_stage,
+        'breakdown': {dimension: _breakdown(dimension, in_range) for dimension in DIMENSIONS},
+        'cohorts': _weekly_cohorts(in_range)
+    }
+
+
+def _breakdown(dimension, in_range):
+    """Current-status counts per source/domain/college from one grouped query"""
+    column = getattr(Lead, dimension)
+    counts = db.session.query(column, Lead.status, db.func.count(Lead.id))\
+        .filter(in_range).group_by(column, Lead.status).all()
+
+    groups = {}
+    for value, status, count in counts:
+        group = groups.setdefault(value or 'Unknown', {'value': value or 'Unknown', 'leads': 0,
+                                                       'confirmed': 0, 'dropped': 0})
+        group['leads'] += count
+        if status == 'Confirmed':
+            group['confirmed'] += count
+        elif status == DROPPED:
+            group['dropped'] += count
+
+    for group in groups.values():
+        group['conversion'] = round(group['confirmed'] / group['leads'], 4) if group['leads'] else None
+    return sorted(groups.values(), key=lambda g: g['leads'], reverse=True)
+
+
+def _weekly_cohorts(in_range):
+    """Leads created per week and how many of them are now Confirmed/Dropped"""
+    day = db.func.date(Lead.created_at)
+    counts = db.session.query(day, Lead.status, db.func.count(Lead.id))\
+        .filter(in_range).group_by(day, Lead.status).all()
+
+    weeks = {}
+    for created, status, count in counts:
+        if isinstance(created, str):
+            created = datetime.strptime(created[:10], '%Y-%m-%d').date()
+        week = created - timedelta(days=created.weekday())
+        cohort = weeks.setdefault(week, {'week': week.isoformat(), 'leads': 0, 'confirmed': 0, 'dropped': 0})
+        cohort['leads'] += count
+        if status == 'Confirmed':
+            cohort['confirmed'] += count
+        elif status == DROPPED:
+            cohort['dropped'] += count
+    return [weeks[week] for week in sorted(weeks)]
+
+
+def get_funnel(start, end):
+    """compute_funnel() cached per date range for FUNNEL_CACHE_TTL"""
+    now = datetime.utcnow()
+    key = (start, end)
+    cached = _funnel_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    report = compute_funnel(start, end)
+    if len(_funnel_cache) >= FUNNEL_CACHE_SIZE:
+        _funnel_cache.pop(min(_funnel_cache, key=lambda k: _funnel_cache[k][0]))
+    _funnel_cache[key] = (now + FUNNEL_CACHE_TTL, report)
+    return report
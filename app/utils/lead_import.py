@@ -0,0 +1,202 @@
+"""
+Bulk Lead Import - Stream CSV/XLSX spreadsheets into the leads table in batches
+"""
+
+from datetime import datetime
+from app import db
+from app.models import Lead
+from app.utils.validators import validate_email, validate_phone
+from app.utils.lead_dedup import match_keys
+import csv
+import io
+
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 500
+
+# Spreadsheet header -> Lead column
+COLUMN_ALIASES = {
+    'student_name': 'student_name',
+    'student name': 'student_name',
+    'name': 'student_name',
+    'phone': 'phone',
+    'phone number': 'phone',
+    'mobile': 'phone',
+    'email': 'email',
+    'email address': 'email',
+    'college': 'college',
+    'university': 'college',
+    'domain': 'domain',
+    'source': 'source',
+    'lead source': 'source',
+    'requirement_summary': 'requirement_summary',
+    'requirement': 'requirement_summary',
+    'requirements': 'requirement_summary',
+    'status': 'status',
+}
+
+LEAD_STATUSES = ['New Lead', 'Follow-up', 'Interested', 'Confirmed', 'Dropped']
+
+
+def _map_header(header):
+    return [COLUMN_ALIASES.get(str(h or '').strip().lower()) for h in header]
+
+
+def iter_csv_rows(stream):
+    """Yield (row_number, dict) from a binary CSV stream without loading it whole"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = _map_header(next(reader, []))
+    for row_number, values in enumerate(reader, start=2):
+        if not any(v.strip() for v in values):
+            continue
+        yield row_number, {col: v for col, v in zip(header, values) if col}
+
+
+def iter_xlsx_rows(stream):
+    """Yield (row_number, dict) from an XLSX stream using openpyxl's read-only mode"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('XLSX import requires the openpyxl package. Upload a CSV instead.')
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _map_header(next(rows, []))
+        for row_number, values in enumerate(rows, start=2):
+            if not any(v not in (None, '') for v in values):
+                continue
+            yield row_number, {
+                col: ('' if v is None else str(v)) for col, v in zip(header, values) if col
+            }
+    finally:
+        workbook.close()
+
+
+def iter_rows(stream, filename):
+    """Pick a row reader based on the file extension"""
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext == 'csv':
+        return iter_csv_rows(stream)
+    if ext == 'xlsx':
+        return iter_xlsx_rows(stream)
+    raise ValueError('Unsupported file type. Upload a .csv or .xlsx file.')
+
+
+def clean_row(row):
+    """
+    Validate one spreadsheet row.
+    Returns (mapping, None) ready for insert, or (None, error_message).
+    """
+    data = {key: (value or '').strip() for key, value in row.items()}
+
+    if not data.get('student_name'):
+        return None, 'Student name is required'
+    if not data.get('phone'):
+        return None, 'Phone is required'
+
+    valid, error = validate_phone(data['phone'])
+    if not valid:
+        return None, error
+    if data.get('email'):
+        valid, error = validate_email(data['email'])
+        if not valid:
+            return None, error
+
+    status = data.get('status') or 'New Lead'
+    if status not in LEAD_STATUSES:
+        return None, f"Unknown status '{status}'"
+
+    mapping = {
+        'student_name': data['student_name'][:100],
+        'phone': data['phone'][:20],
+        'email': data.get('email') or None,
+        'college': data.get('college') or None,
+        'domain': data.get('domain') or None,
+        'source': data.get('source') or 'Import',
+        'requirement_summary': data.get('requirement_summary') or None,
+        'status': status,
+    }
+    # bulk_insert_mappings skips ORM events, so set the dedup keys here
+    mapping.update(match_keys(mapping['student_name'], mapping['phone'], mapping['email'], mapping['college']))
+    return mapping, None
+
+
+def _existing_keys(batch):
+    """Normalized phones/emails in `batch` that already exist, in two IN queries"""
+    phones = {m['phone_normalized'] for m in batch if m['phone_normalized']}
+    emails = {m['email_normalized'] for m in batch if m['email_normalized']}
+    existing = set()
+    if phones:
+        existing.update(('phone', p) for (p,) in db.session.query(Lead.phone_normalized)
+                        .filter(Lead.phone_normalized.in_(phones)))
+    if emails:
+        existing.update(('email', e) for (e,) in db.session.query(Lead.email_normalized)
+                        .filter(Lead.email_normalized.in_(emails)))
+    return existing
+
+
+def import_leads(stream, filename, skip_duplicates=True, batch_size=BATCH_SIZE):
+    """
+    Import leads from a CSV/XLSX stream.
+    Rows are validated one at a time and inserted with bulk_insert_mappings
+    every `batch_size` rows. Returns a summary dict:
+        {'imported': int, 'skipped': int, 'errors': [(row_number, message), ...]}
+    """
+    result = {'imported': 0, 'skipped': 0, 'errors': []}
+    seen = set()
+    batch = []
+
+    def report(row_number, message):
+        result['skipped'] += 1
+        if len(result['errors']) < MAX_REPORTED_ERRORS:
+            result['errors'].append((row_number, message))
+
+    def flush():
+        if not batch:
+            return
+        if skip_duplicates:
+            existing = _existing_keys([m for _, m in batch])
+            rows = []
+            for row_number, mapping in batch:
+                if ('phone', mapping['phone_normalized']) in existing:
+                    report(row_number, 'Duplicate: phone already exists')
+                elif ('email', mapping['email_normalized']) in existing:
+                    report(row_number, 'Duplicate: email already exists')
+                else:
+                    rows.append(mapping)
+        else:
+            rows = [mapping for _, mapping in batch]
+
+        now = datetime.utcnow()
+        for mapping in rows:
+            mapping['created_at'] = now
+            mapping['updated_at'] = now
+        if rows:
+            db.session.bulk_insert_mappings(Lead, rows)
+            db.session.commit()
+        result['imported'] += len(rows)
+        batch.clear()
+
+    for row_number, row in iter_rows(stream, filename):
+        mapping, error = clean_row(row)
+        if error:
+            report(row_number, error)
+            continue
+
+        if skip_duplicates:
+            keys = {('phone', mapping['phone_normalized']), ('email', mapping['email_normalized'])}
+            keys.discard(('phone', None))
+            keys.discard(('email', None))
+            if keys & seen:
+                report(row_number, 'Duplicate of an earlier row in this file')
+                continue
+            seen.update(keys)
+
+        batch.append((row_number, mapping))
+        if len(batch) >= batch_size:
+            flush()
+
+    flush()
+    return result
@@ -0,0 +1,271 @@
+"""
+Developer Matching - Rank verified developers against client and student projects
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import (
+    User, DeveloperProfile, Team, TeamMember, Appointment,
+    StudentProject, DeveloperAssignment, ProjectMilestone, DeveloperPayout
+)
+import json
+
+
+# Developers at or above this many active teams + upcoming sessions are skipped
+MAX_ACTIVE_LOAD = 4
+SHORTLIST_SIZE = 10
+# Developers returned per name search outside the shortlist
+LOOKUP_LIMIT = 20
+
+# Score weights (sum to 1.0)
+SKILL_WEIGHT = 0.6
+DOMAIN_WEIGHT = 0.2
+BUDGET_WEIGHT = 0.1
+LOAD_WEIGHT = 0.1
+
+HOURS_PER_WEEK = 40
+
+# StudentProject statuses that no longer count towards a developer's workload
+CLOSED_PROJECT_STATUSES = ['Delivered', 'Completed']
+
+# Assignment loads are reused for this long so confirming a batch of leads
+# does not re-run the aggregate for every form
+ASSIGNMENT_LOAD_TTL = timedelta(seconds=60)
+
+_assignment_load_cache = {'loads': None, 'expires_at': None}
+
+
+def _normalize_terms(raw):
+    """Parse a JSON list column into a set of lowercased terms"""
+    if not raw:
+        return set()
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except (ValueError, TypeError):
+            return set()
+    return {str(term).strip().lower() for term in raw if str(term).strip()}
+
+
+def get_developer_loads():
+    """
+    Return {developer_profile_id: load} where load is the number of active
+    team memberships plus upcoming pending/confirmed appointments.
+    Two grouped queries regardless of the number of developers.
+    """
+    loads = {}
+
+    team_counts = db.session.query(
+        TeamMember.developer_id, db.func.count(TeamMember.id)
+    ).join(Team, Team.id == TeamMember.team_id)\
+     .filter(TeamMember.status == 'active', Team.status.in_(['forming', 'active']))\
+     .group_by(TeamMember.developer_id).all()
+
+    appointment_counts = db.session.query(
+        Appointment.developer_id, db.func.count(Appointment.id)
+    ).filter(
+        Appointment.status.in_(['pending', 'confirmed']),
+        Appointment.scheduled_at >= datetime.utcnow()
+    ).group_by(Appointment.developer_id).all()
+
+    for developer_id, count in team_counts + appointment_counts:
+        loads[developer_id] = loads.get(developer_id, 0) + count
+    return loads
+
+
+def _budget_fit(hourly_rate, budget_max, timeline_weeks):
+    """1.0 when the estimated cost fits the budget, scaled down otherwise"""
+    if not hourly_rate or not budget_max or not timeline_weeks:
+        return 0.5  # Unknown - neutral
+    estimate = Decimal(hourly_rate) * HOURS_PER_WEEK * int(timeline_weeks)
+    if estimate <= Decimal(budget_max):
+        return 1.0
+    return float(Decimal(budget_max) / estimate)
+
+
+def rank_developers(technologies=None, domain=None, budget_max=None, timeline_weeks=None,
+                    exclude_ids=None, limit=SHORTLIST_SIZE):
+    """
+    Score every available verified developer against the given requirements
+    and return the top `limit` as a list of dicts:
+        {'developer': DeveloperProfile, 'score': float, 'matched_skills': [...], 'load': int}
+
+    Skills are encoded as bitmasks over a shared vocabulary so overlap for each
+    developer is a single AND + popcount instead of nested list scans.
+    """
+    wanted = _normalize_terms(technologies)
+    domain = (domain or '').strip().lower()
+    exclude_ids = set(exclude_ids or [])
+
+    # Only the columns needed for scoring - full profiles are loaded for the shortlist
+    rows = db.session.query(
+        DeveloperProfile.id,
+        DeveloperProfile.skills,
+        DeveloperProfile.domains,
+        DeveloperProfile.hourly_rate,
+        DeveloperProfile.rating
+    ).join(User, User.id == DeveloperProfile.user_id)\
+     .filter(User.status == 'verified')\
+     .filter(db.or_(DeveloperProfile.availability.is_(None), DeveloperProfile.availability != 'unavailable'))\
+     .all()
+
+    loads = get_developer_loads()
+
+    vocabulary = {term: 1 << bit for bit, term in enumerate(sorted(wanted))}
+    project_mask = sum(vocabulary.values())
+    bit_terms = {bit: term for term, bit in vocabulary.items()}
+
+    scored = []
+    for dev_id, skills, domains, hourly_rate, rating in rows:
+        if dev_id in exclude_ids:
+            continue
+        load = loads.get(dev_id, 0)
+        if load >= MAX_ACTIVE_LOAD:
+            continue
+
+        dev_mask = 0
+        for term in _normalize_terms(skills):
+            dev_mask |= vocabulary.get(term, 0)
+        overlap = dev_mask & project_mask
+
+        skill_score = overlap.bit_count() / len(wanted) if wanted else 0.0
+        domain_score = 1.0 if domain and domain in _normalize_terms(domains) else 0.0
+        budget_score = _budget_fit(hourly_rate, budget_max, timeline_weeks)
+        load_score = 1.0 - (load / MAX_ACTIVE_LOAD)
+
+        score = (SKILL_WEIGHT * skill_score + DOMAIN_WEIGHT * domain_score +
+                 BUDGET_WEIGHT * budget_score + LOAD_WEIGHT * load_score)
+        scored.append((score, float(rating or 0), dev_id, overlap, load))
+
+    # Rating breaks ties between equally scored developers
+    scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    scored = scored[:limit]
+
+    profiles = DeveloperProfile.query.options(joinedload(DeveloperProfile.user))\
+        .filter(DeveloperProfile.id.in_([item[2] for item in scored])).all() if scored else []
+    by_id = {p.id: p for p in profiles}
+
+    return [{
+        'developer': by_id[dev_id],
+        'score': round(score, 3),
+        'matched_skills': sorted(term for bit, term in bit_terms.items() if overlap & bit),
+        'load': load
+    } for score, _, dev_id, overlap, load in scored if dev_id in by_id]
+
+
+def match_developers_for_project(project, exclude_ids=None, limit=SHORTLIST_SIZE):
+    """Ranked developer shortlist for a client Project"""
+    if project is None:
+        return rank_developers(exclude_ids=exclude_ids, limit=limit)
+    return rank_developers(
+        technologies=project.get_technologies_list(),
+        domain=project.domain,
+        budget_max=project.budget_max,
+        timeline_weeks=project.timeline_weeks,
+        exclude_ids=exclude_ids,
+        limit=limit
+    )
+
+
+def search_developers(term, exclude_ids=None, limit=LOOKUP_LIMIT):
+    """Verified developers whose name or email contains `term`, for picking someone outside the shortlist"""
+    term = (term or '').strip()
+    if len(term) < 2:
+        return []
+    pattern = f"%{term.replace('%', '').replace('_', '')}%"
+    query = DeveloperProfile.query.join(User, User.id == DeveloperProfile.user_id)\
+        .options(joinedload(DeveloperProfile.user))\
+        .filter(User.status == 'verified', db.or_(User.full_name.ilike(pattern), User.email.ilike(pattern)))
+    if exclude_ids:
+        query = query.filter(DeveloperProfile.id.notin_(exclude_ids))
+    return query.order_by(User.full_name).limit(limit).all()
+
+
+# ============ Student Project Assignment ============
+
+def get_assignment_loads():
+    """
+    Return {user_id: {'active_assignments', 'pending_milestones', 'outstanding_payout'}}
+    for every developer with an open StudentProject, from a single aggregate query.
+    Outstanding payout is what each assignment still owes after recorded payouts.
+    Results are cached for ASSIGNMENT_LOAD_TTL; call invalidate_assignment_loads()
+    after creating assignments or recording payouts.
+    """
+    now = datetime.utcnow()
+    if _assignment_load_cache['loads'] is not None and _assignment_load_cache['expires_at'] > now:
+        return _assignment_load_cache['loads']
+
+    pending_milestones = db.session.query(
+        ProjectMilestone.project_id.label('project_id'),
+        db.func.count(ProjectMilestone.id).label('pending')
+    ).filter(ProjectMilestone.status == 'Pending')\
+     .group_by(ProjectMilestone.project_id).subquery()
+
+    paid = db.session.query(
+        DeveloperPayout.assignment_id.label('assignment_id'),
+        db.func.sum(DeveloperPayout.amount).label('paid')
+    ).group_by(DeveloperPayout.assignment_id).subquery()
+
+    # Still owed per assignment, never below zero for overpaid assignments
+    owed = db.func.coalesce(DeveloperAssignment.payout_amount, 0) - db.func.coalesce(paid.c.paid, 0)
+
+    rows = db.session.query(
+        DeveloperAssignment.developer_id,
+        db.func.count(DeveloperAssignment.id),
+        db.func.sum(db.func.coalesce(pending_milestones.c.pending, 0)),
+        db.func.sum(db.case((owed > 0, owed), else_=0))
+    ).join(StudentProject, StudentProject.id == DeveloperAssignment.project_id)\
+     .outerjoin(pending_milestones, pending_milestones.c.project_id == DeveloperAssignment.project_id)\
+     .outerjoin(paid, paid.c.assignment_id == DeveloperAssignment.id)\
+     .filter(StudentProject.status.notin_(CLOSED_PROJECT_STATUSES))\
+     .group_by(DeveloperAssignment.developer_id).all()
+
+    loads = {
+        developer_id: {
+            'active_assignments': active or 0,
+            'pending_milestones': int(pending or 0),
+            'outstanding_payout': Decimal(payout or 0)
+        }
+        for developer_id, active, pending, payout in rows
+    }
+
+    _assignment_load_cache['loads'] = loads
+    _assignment_load_cache['expires_at'] = now + ASSIGNMENT_LOAD_TTL
+    return loads
+
+
+def invalidate_assignment_loads():
+    """Drop cached assignment loads after assignments or payouts change"""
+    _assignment_load_cache['loads'] = None
+    _assignment_load_cache['expires_at'] = None
+
+
+def recommend_assignees(tech_stack=None, limit=None):
+    """
+    Rank verified developers (User rows) for a StudentProject by tech-stack
+    overlap, then by lightest workload. Returns a list of dicts:
+        {'developer': User, 'matched_skills': [...], 'active_assignments': int,
+         'pending_milestones': int, 'outstanding_payout': Decimal}
+    """
+    wanted = _normalize_terms(tech_stack)
+    loads = get_assignment_loads()
+    empty_load = {'active_assignments': 0, 'pending_milestones': 0, 'outstanding_payout': Decimal(0)}
+
+    developers = User.query.options(joinedload(User.developer_profile))\
+        .filter_by(role='developer', status='verified').all()
+
+    ranked = []
+    for user in developers:
+        skills = _normalize_terms(user.developer_profile.skills if user.developer_profile else None)
+        load = loads.get(user.id, empty_load)
+        ranked.append(dict(load, developer=user, matched_skills=sorted(wanted & skills)))
+
+    ranked.sort(key=lambda r: (
+        -len(r['matched_skills']),
+        r['active_assignments'],
+        r['pending_milestones'],
+        r['outstanding_payout']
+    ))
+    return ranked[:limit] if limit else ranked
@@ -0,0 +1,289 @@
+"""
+Message Hub - Project message history pages and per-process fan-out of new messages to Server-Sent Event streams
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from queue import Queue, Empty, Full
+from time import monotonic
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, object_session
+from app import db
+from app.models import ProjectMessage
+import json
+import threading
+
+
+# The poller re-checks the database this often, so messages posted through
+# another worker arrive within a second or so; messages posted through this
+# worker wake it straight away
+POLL_INTERVAL = 1.0
+POLL_BATCH = 500
+# A message can commit after one with a higher id (ids are handed out at
+# insert time on MySQL), so polls and replays re-read this many ids below the
+# newest one delivered and skip the ids already sent
+POLL_LOOKBACK = 100
+# A comment line keeps proxies from closing an idle stream
+HEARTBEAT_SECONDS = 15
+# Streams end after this long and the browser reconnects with Last-Event-ID,
+# which re-checks access and frees the worker thread
+STREAM_SECONDS = 600
+RECONNECT_MS = 3000
+# Messages replayed to a (re)connecting stream
+BACKLOG_LIMIT = 200
+# Messages per history page; the newest page is rendered with the project
+MESSAGES_PER_PAGE = 50
+MAX_MESSAGES_PER_PAGE = 100
+CURSOR_FORMAT = '%Y%m%d%H%M%S%f'
+# Events buffered for a slow stream before it is dropped to catch up on reconnect
+QUEUE_SIZE = 100
+
+
+def project_access(user, project):
+    """(can read the thread, can see internal messages) for a user on a project"""
+    if user.role == 'admin':
+        return True, True
+    if user.role == 'client':
+        return bool(user.client_profile) and project.client_id == user.client_profile.id, False
+    if user.role == 'developer' and user.developer_profile and project.team:
+        return any(member.developer_id == user.developer_profile.id for member in project.team.members), False
+    return False, False
+
+
+def format_event(message):
+    """A message as one SSE frame; built once and shared by every stream"""
+    return f'id: {message.id}\nevent: message\ndata: {json.dumps(message.to_dict())}\n\n'
+
+
+class Subscription:
+    """One open stream: the project it follows and a bounded queue of pending frames"""
+
+    def __init__(self, project_id, include_internal):
+        self.project_id = project_id
+        self.include_internal = include_internal
+        self.queue = Queue(maxsize=QUEUE_SIZE)
+        self.sent = set()
+        self.dropped = False
+
+    def push(self, message_id, frame):
+        try:
+            self.queue.put_nowait((message_id, frame))
+            return True
+        except Full:
+            self.dropped = True
+            return False
+
+
+class MessageHub:
+    """
+    One background poller per process reads new messages with a single
+    indexed query and hands each to every stream following its project, so
+    the database sees the same load for one subscriber as for hundreds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._wake = threading.Event()
+        self._thread = None
+        self._app = None
+        self._last_id = None
+        self._seen = set()
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def subscribe(self, project_id, include_internal):
+        subscription = Subscription(project_id, include_internal)
+        with self._lock:
+            if self._last_id is None:
+                # First stream since the hub went idle: live delivery starts after the newest message
+                self._last_id = db.session.query(db.func.max(ProjectMessage.id)).scalar() or 0
+                self._seen = {message_id for (message_id,) in db.session.query(ProjectMessage.id)
+                              .filter(ProjectMessage.id > self._last_id - POLL_LOOKBACK)}
+            self._subscribers[project_id].add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._app = current_app._get_current_object()
+                self._thread = threading.Thread(target=self._run, name='message-hub', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subs = self._subscribers.get(subscription.project_id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[subscription.project_id]
+
+    def notify(self):
+        """Poll now instead of waiting for the next interval"""
+        self._wake.set()
+
+    def _run(self):
+        with self._app.app_context():
+            while True:
+                self._wake.wait(POLL_INTERVAL)
+                self._wake.clear()
+                try:
+                    self._poll()
+                except Exception:
+                    current_app.logger.exception('Message hub poll failed')
+                finally:
+                    # End the transaction so the next poll sees newly committed rows
+                    db.session.remove()
+
+    def _poll(self):
+        with self._lock:
+            if not self._subscribers:
+                # Nothing to deliver; the next subscriber restarts from the newest message
+                self._last_id = None
+                self._seen = set()
+                return
+            last_id = self._last_id
+
+        # Ids first, from the primary key alone; only unsent messages are loaded
+        cursor = max(last_id - POLL_LOOKBACK, 0)
+        while True:
+            ids = [message_id for (message_id,) in db.session.query(ProjectMessage.id)
+                   .filter(ProjectMessage.id > cursor).order_by(ProjectMessage.id).limit(POLL_BATCH)]
+            if not ids:
+                break
+            with self._lock:
+                fresh = [message_id for message_id in ids if message_id not in self._seen]
+            if fresh:
+                messages = ProjectMessage.query.options(joinedload(ProjectMessage.sender))\
+                    .filter(ProjectMessage.id.in_(fresh)).order_by(ProjectMessage.id).all()
+                self.publish(messages)
+                with self._lock:
+                    self._seen.update(message.id for message in messages)
+            cursor = ids[-1]
+            if len(ids) < POLL_BATCH:
+                break
+
+        with self._lock:
+            if self._last_id is not None:
+                self._last_id = max(self._last_id, cursor)
+                self._seen = {message_id for message_id in self._seen
+                              if message_id > self._last_id - POLL_LOOKBACK}
+
+    def publish(self, messages):
+        """Queue each message for the streams following its project that may see it"""
+        with self._lock:
+            targets = {project_id: list(subs) for project_id, subs in self._subscribers.items()}
+        dropped = []
+        for message in messages:
+            subs = targets.get(message.project_id)
+            if not subs:
+                continue
+            frame = format_event(message)
+            for subscription in subs:
+                if message.is_internal and not subscription.include_internal:
+                    continue
+                if not subscription.push(message.id, frame):
+                    dropped.append(subscription)
+        for subscription in dropped:
+            self.unsubscribe(subscription)
+
+
+hub = MessageHub()
+
+
+def latest_messages(project_id, include_internal, after_id=0, limit=BACKLOG_LIMIT):
+    """The newest `limit` messages after `after_id` the reader may see, oldest first"""
+    query = ProjectMessage.query.options(joinedload(ProjectMessage.sender))\
+        .filter(ProjectMessage.project_id == project_id, ProjectMessage.id > after_id)
+    if not include_internal:
+        query = query.filter(ProjectMessage.is_internal.isnot(True))
+    return list(reversed(query.order_by(ProjectMessage.id.desc()).limit(limit).all()))
+
+
+def encode_cursor(message):
+    """Opaque position of a message in its thread, for ?before="""
+    return f'{message.created_at.strftime(CURSOR_FORMAT)}.{message.id}'
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor; ValueError if it was not made by encode_cursor"""
+    created_at, _, message_id = cursor.partition('.')
+    return datetime.strptime(created_at, CURSOR_FORMAT), int(message_id)
+
+
+def message_page(project_id, include_internal, before=None, limit=MESSAGES_PER_PAGE):
+    """
+    One page of a project's history, newest first from `before` (a decoded
+    cursor) or from the latest message. Keyset pagination on (created_at, id)
+    reads only the rows on the page from the history index, however long the
+    thread, and senders come from the same query.
+    Returns (messages oldest first, cursor for the next older page or None).
+    """
+    query = ProjectMessage.query.options(joinedload(ProjectMessage.sender))\
+        .filter(ProjectMessage.project_id == project_id)
+    if not include_internal:
+        query = query.filter(ProjectMessage.is_internal.isnot(True))
+    if before:
+        created_at, message_id = before
+        query = query.filter(db.or_(
+            ProjectMessage.created_at < created_at,
+            db.and_(ProjectMessage.created_at == created_at, ProjectMessage.id < message_id)
+        ))
+    rows = query.order_by(ProjectMessage.created_at.desc(), ProjectMessage.id.desc()).limit(limit + 1).all()
+    messages = rows[:limit]
+    older = encode_cursor(messages[-1]) if len(rows) > limit else None
+    return list(reversed(messages)), older
+
+
+def open_stream(project_id, after_id, include_internal):
+    """
+    Subscribe to a project and return a generator of SSE frames: the backlog
+    after `after_id`, then live messages and heartbeats until STREAM_SECONDS
+    pass or the client disconnects. The database is only touched here, before
+    streaming starts, so no connection is held while the stream is open.
+    """
+    subscription = hub.subscribe(project_id, include_internal)
+    # Subscribed first, so every message is either in the backlog or delivered live.
+    # The backlog reaches back POLL_LOOKBACK ids for messages that committed after
+    # `after_id` was sent; the page drops any it already shows.
+    replay = [(message.id, format_event(message))
+              for message in latest_messages(project_id, include_internal, max(after_id - POLL_LOOKBACK, 0))]
+
+    def generate():
+        deadline = monotonic() + STREAM_SECONDS
+        try:
+            yield f'retry: {RECONNECT_MS}\n\n'
+            for message_id, frame in replay:
+                subscription.sent.add(message_id)
+                yield frame
+            while monotonic() < deadline:
+                try:
+                    message_id, frame = subscription.queue.get(timeout=HEARTBEAT_SECONDS)
+                except Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if message_id not in subscription.sent:  # not already sent from the backlog
+                    subscription.sent.add(message_id)
+                    yield frame
+                if subscription.dropped and subscription.queue.empty():
+                    return  # Fell too far behind; the reconnect replays what was missed
+        finally:
+            hub.unsubscribe(subscription)
+
+    return generate()
+
+
+def _note_new_message(mapper, connection, target):
+    object_session(target).info['project_messages_added'] = True
+
+
+def _after_commit(session):
+    if session.info.pop('project_messages_added', False):
+        hub.notify()
+
+
+def register_message_events():
+    """Wake this worker's poller as soon as a message it wrote is committed"""
+    if not event.contains(ProjectMessage, 'after_insert', _note_new_message):
+        event.listen(ProjectMessage, 'after_insert', _note_new_message)
+        event.listen(Session, 'after_commit', _after_commit)
@@ -0,0 +1,92 @@
+"""
+Moderation - Set-based bulk actions on articles and developer accounts
+"""
+
+from datetime import datetime
+from app import db
+from app.models import User, Article
+from app.utils.counters import refresh_developer_stats
+
+
+ARTICLE_ACTIONS = {'approve': 'approved', 'reject': 'rejected', 'hide': 'hidden'}
+DEVELOPER_ACTIONS = {'verify': 'verified', 'reject': 'rejected', 'suspend': 'suspended'}
+
+
+def _summary(ids, current, target_status):
+    """Split ids into changed/unchanged/not found from their current statuses"""
+    results = []
+    for item_id in ids:
+        if item_id not in current:
+            results.append({'id': item_id, 'result': 'not_found'})
+        elif current[item_id] == target_status:
+            results.append({'id': item_id, 'result': 'unchanged'})
+        else:
+            results.append({'id': item_id, 'result': 'updated', 'previous_status': current[item_id]})
+    counts = {outcome: sum(1 for r in results if r['result'] == outcome)
+              for outcome in ('updated', 'unchanged', 'not_found')}
+    return dict(counts, results=results)
+
+
+def moderate_articles(article_ids, action, admin_id, reason=None):
+    """
+    Approve, reject or hide articles with one UPDATE, then refresh the stats
+    of every affected developer (bulk updates skip the counter events). Articles already in the target state
+    are left untouched. Returns {'updated', 'unchanged', 'not_found', 'results': [...]}.
+    """
+    if action not in ARTICLE_ACTIONS:
+        raise ValueError(f"Unknown article action '{action}'.")
+    status = ARTICLE_ACTIONS[action]
+    ids = sorted({int(article_id) for article_id in article_ids})
+
+    rows = db.session.query(Article.id, Article.status, Article.developer_id)\
+        .filter(Article.id.in_(ids)).all() if ids else []
+    summary = _summary(ids, {row.id: row.status for row in rows}, status)
+    changed = [r['id'] for r in summary['results'] if r['result'] == 'updated']
+    if not changed:
+        return summary
+
+    now = datetime.utcnow()
+    values = {'status': status, 'updated_at': now}
+    if action in ('approve', 'reject'):
+        values.update(reviewed_by=admin_id, reviewed_at=now)
+    if action == 'approve':
+        values['published_at'] = now
+    if action == 'reject':
+        values['rejection_reason'] = reason or None
+
+    try:
+        Article.query.filter(Article.id.in_(changed), Article.status != status)\
+            .update(values, synchronize_session=False)
+        refresh_developer_stats({row.developer_id for row in rows if row.id in changed})
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return summary
+
+
+def moderate_developers(user_ids, action):
+    """
+    Verify, reject or suspend developer accounts with one UPDATE.
+    Returns {'updated', 'unchanged', 'not_found', 'results': [...]}.
+    """
+    if action not in DEVELOPER_ACTIONS:
+        raise ValueError(f"Unknown developer action '{action}'.")
+    status = DEVELOPER_ACTIONS[action]
+    ids = sorted({int(user_id) for user_id in user_ids})
+
+    rows = db.session.query(User.id, User.status)\
+        .filter(User.id.in_(ids), User.role == 'developer').all() if ids else []
+    summary = _summary(ids, dict(rows), status)
+    changed = [r['id'] for r in summary['results'] if r['result'] == 'updated']
+    if not changed:
+        return summary
+
+    try:
+        User.query.filter(User.id.in_(changed), User.role == 'developer')\
+            .update({'status': status, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return summary
@@ -0,0 +1,123 @@
+"""
+Notifications - Pluggable delivery transports (SMTP, webhook, log) for outgoing messages
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from flask import current_app
+import json
+import smtplib
+import urllib.error
+import urllib.request
+
+
+class SMTPTransport:
+    """
+    Email over one SMTP connection per batch. The defaults (localhost:1025,
+    no TLS) match a local debugging server for development:
+        python -m aiosmtpd -n -l localhost:1025
+    """
+    name = 'smtp'
+
+    def __init__(self, host, port, sender, username=None, password=None, use_tls=False, timeout=30):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def _email(self, message):
+        email = EmailMessage()
+        email['From'] = self.sender
+        email['To'] = f"{message['to_name']} <{message['to_email']}>" if message.get('to_name') else message['to_email']
+        email['Subject'] = message['subject']
+        # Deterministic Message-ID from the idempotency key lets mail servers drop retried duplicates
+        email['Message-ID'] = f"<{message['key']}@{self.sender.rsplit('@', 1)[-1].strip('> ')}>"
+        email.set_content(message['body'])
+        return email
+
+    def send_many(self, messages):
+        """Send every message; returns {key: error or None}"""
+        results = {}
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                if self.use_tls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+                for message in messages:
+                    try:
+                        smtp.send_message(self._email(message))
+                        results[message['key']] = None
+                    except smtplib.SMTPException as e:
+                        results[message['key']] = str(e)
+        except (OSError, smtplib.SMTPException) as e:
+            for message in messages:
+                results.setdefault(message['key'], f'SMTP connection failed: {e}')
+        return results
+
+
+class WebhookTransport:
+    """JSON POST per message to a URL, in parallel, with the key as Idempotency-Key"""
+    name = 'webhook'
+
+    def __init__(self, url, secret=None, workers=8, timeout=10):
+        self.url = url
+        self.secret = secret
+        self.workers = workers
+        self.timeout = timeout
+
+    def _post(self, message):
+        payload = json.dumps({key: message[key] for key in ('key', 'to_email', 'to_name', 'subject', 'body', 'items')
+                              if key in message}, default=str).encode('utf-8')
+        request = urllib.request.Request(self.url, data=payload, method='POST', headers={
+            'Content-Type': 'application/json',
+            'Idempotency-Key': message['key'],
+        })
+        if self.secret:
+            request.add_header('Authorization', f'Bearer {self.secret}')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+            return None
+        except urllib.error.HTTPError as e:
+            return f'HTTP {e.code}'
+        except (urllib.error.URLError, OSError) as e:
+            return str(getattr(e, 'reason', e))
+
+    def send_many(self, messages):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(zip([m['key'] for m in messages], pool.map(self._post, messages)))
+
+
+class LogTransport:
+    """Writes messages to the app log instead of delivering them"""
+    name = 'log'
+
+    def send_many(self, messages):
+        for message in messages:
+            current_app.logger.info(f"Notification to {message['to_email']}: {message['subject']}")
+        return {message['key']: None for message in messages}
+
+
+def create_transport(config, name=None):
+    """Build a transport from app config; `name` overrides NOTIFICATION_TRANSPORT"""
+    name = name or config.get('NOTIFICATION_TRANSPORT', 'smtp')
+    if name == 'smtp':
+        return SMTPTransport(
+            config.get('SMTP_HOST', 'localhost'),
+            config.get('SMTP_PORT', 1025),
+            config.get('MAIL_DEFAULT_SENDER', 'Asan DevNest <no-reply@asandevnest.com>'),
+            username=config.get('SMTP_USERNAME'),
+            password=config.get('SMTP_PASSWORD'),
+            use_tls=config.get('SMTP_USE_TLS', False)
+        )
+    if name == 'webhook':
+        if not config.get('NOTIFICATION_WEBHOOK_URL'):
+            raise RuntimeError('NOTIFICATION_WEBHOOK_URL must be set to use the webhook transport.')
+        return WebhookTransport(config['NOTIFICATION_WEBHOOK_URL'], secret=config.get('NOTIFICATION_WEBHOOK_SECRET'))
+    if name == 'log':
+        return LogTransport()
+    raise RuntimeError(f"Unknown notification transport '{name}'.")
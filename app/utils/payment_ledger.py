@@ -0,0 +1,210 @@
+"""
+Payment Ledger - Atomic payment application, batch imports and balance reconciliation
+"""
+
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from app import db
+from app.models import Payment, PaymentTransaction
+from app.utils.revenue_facts import record_collections
+import csv
+import io
+
+
+BATCH_SIZE = 500
+
+
+def parse_amount(value):
+    """Decimal amount from user input; raises ValueError unless positive"""
+    try:
+        amount = Decimal(str(value).replace(',', '').strip())
+    except (InvalidOperation, AttributeError):
+        raise ValueError(f"Invalid amount '{value}'")
+    if amount <= 0:
+        raise ValueError('Amount must be greater than zero.')
+    return amount.quantize(Decimal('0.01'))
+
+
+def _apply_increment(payment_id, amount, payment_mode=None, invoice_ref=None):
+    """
+    Add `amount` to a payment in a single UPDATE so concurrent payments cannot
+    overwrite each other. pending_balance is listed first because MySQL
+    evaluates SET clauses left to right against already-updated values.
+    """
+    table = Payment.__table__
+    paid = db.func.coalesce(table.c.amount_paid, 0)
+    values = [
+        (table.c.pending_balance, table.c.total_cost - paid - amount),
+        (table.c.amount_paid, paid + amount),
+        (table.c.updated_at, datetime.utcnow()),
+    ]
+    if payment_mode:
+        values.append((table.c.payment_mode, payment_mode))
+    if invoice_ref:
+        values.append((table.c.invoice_ref, invoice_ref))
+
+    result = db.session.execute(table.update().where(table.c.id == payment_id).ordered_values(*values))
+    if result.rowcount == 0:
+        raise ValueError(f'Payment {payment_id} not found.')
+
+
+def record_payment(payment, amount, payment_mode=None, invoice_ref=None, notes=None):
+    """
+    Apply one payment and write its ledger transaction. The caller commits.
+    Returns the new PaymentTransaction.
+    """
+    amount = parse_amount(amount)
+    _apply_increment(payment.id, amount, payment_mode, invoice_ref)
+
+    transaction = PaymentTransaction(
+        payment_id=payment.id,
+        amount=amount,
+        payment_mode=payment_mode,
+        invoice_ref=invoice_ref,
+        notes=notes or f"Recorded on {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+    )
+    db.session.add(transaction)
+    # The row changed underneath the ORM - reload balances on next access
+    db.session.expire(payment, ['amount_paid', 'pending_balance', 'payment_mode', 'invoice_ref', 'updated_at'])
+    return transaction
+
+
+def apply_payment_batch(rows):
+    """
+    Apply many payments at once: one UPDATE per payment with the summed amount
+    and a single bulk insert of the transactions, all in one commit.
+    `rows` are dicts with payment_id, amount and optional payment_mode,
+    invoice_ref, transaction_date and notes. Rows for payments that do not
+    exist are left out, found with one IN query up front.
+    Returns (number applied, rows left out).
+    """
+    if not rows:
+        return 0, []
+
+    ids = {row['payment_id'] for row in rows}
+    known = {payment_id for (payment_id,) in db.session.query(Payment.id).filter(Payment.id.in_(ids))}
+    unknown = [row for row in rows if row['payment_id'] not in known]
+    rows = [row for row in rows if row['payment_id'] in known]
+    if not rows:
+        return 0, unknown
+
+    now = datetime.utcnow()
+    totals = {}
+    mappings = []
+    for row in rows:
+        amount = parse_amount(row['amount'])
+        totals[row['payment_id']] = totals.get(row['payment_id'], Decimal(0)) + amount
+        mappings.append({
+            'payment_id': row['payment_id'],
+            'amount': amount,
+            'payment_mode': row.get('payment_mode'),
+            'invoice_ref': row.get('invoice_ref'),
+            'transaction_date': row.get('transaction_date') or now,
+            'notes': row.get('notes') or 'Imported'
+        })
+
+    try:
+        for payment_id, amount in totals.items():
+            _apply_increment(payment_id, amount)
+        db.session.bulk_insert_mappings(PaymentTransaction, mappings)
+        # bulk_insert_mappings bypasses the revenue fact listener
+        record_collections(db.session.connection(), mappings)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(mappings), unknown
+
+
+def import_payments(stream, batch_size=BATCH_SIZE):
+    """
+    Import payments from a CSV stream with columns payment_id (or project_id),
+    amount, and optional payment_mode, invoice_ref, date (YYYY-MM-DD), notes.
+    Each batch is applied atomically; rows that cannot be applied are skipped
+    and reported. Returns {'imported', 'skipped', 'errors'}.
+    """
+    result = {'imported': 0, 'skipped': 0, 'errors': []}
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    payment_by_project = dict(db.session.query(Payment.project_id, Payment.id).all())
+    batch = []
+
+    def apply(batch):
+        try:
+            applied, unknown = apply_payment_batch(batch)
+        except ValueError as e:
+            # A payment deleted mid-import rolls its whole batch back
+            applied, unknown = 0, []
+            result['skipped'] += len(batch)
+            result['errors'].extend((row['row_number'], f'Batch not applied: {e}') for row in batch)
+        result['imported'] += applied
+        result['skipped'] += len(unknown)
+        result['errors'].extend((row['row_number'], f"Payment {row['payment_id']} not found.") for row in unknown)
+
+    for row_number, raw in enumerate(reader, start=2):
+        row = {(k or '').strip().lower(): (v or '').strip() for k, v in raw.items()}
+        try:
+            if row.get('payment_id'):
+                payment_id = int(row['payment_id'])
+            elif row.get('project_id') and int(row['project_id']) in payment_by_project:
+                payment_id = payment_by_project[int(row['project_id'])]
+            else:
+                raise ValueError('Unknown payment_id/project_id')
+            amount = parse_amount(row.get('amount'))
+            transaction_date = datetime.strptime(row['date'], '%Y-%m-%d') if row.get('date') else None
+        except ValueError as e:
+            result['skipped'] += 1
+            result['errors'].append((row_number, str(e)))
+            continue
+
+        batch.append({
+            'row_number': row_number,
+            'payment_id': payment_id,
+            'amount': amount,
+            'payment_mode': row.get('payment_mode') or None,
+            'invoice_ref': row.get('invoice_ref') or None,
+            'transaction_date': transaction_date,
+            'notes': row.get('notes') or None
+        })
+        if len(batch) >= batch_size:
+            apply(batch)
+            batch = []
+
+    apply(batch)
+    result['errors'].sort()
+    return result
+
+
+def reconcile_payments(fix=False):
+    """
+    Compare every Payment's amount_paid/pending_balance with its ledger in a
+    single grouped query. Returns the mismatches as dicts; with fix=True the
+    balances are rewritten from the ledger.
+    """
+    ledger = db.func.coalesce(db.func.sum(PaymentTransaction.amount), 0)
+    rows = db.session.query(
+        Payment.id, Payment.project_id, Payment.total_cost, Payment.amount_paid, Payment.pending_balance, ledger
+    ).outerjoin(PaymentTransaction, PaymentTransaction.payment_id == Payment.id)\
+     .group_by(Payment.id, Payment.project_id, Payment.total_cost, Payment.amount_paid, Payment.pending_balance)\
+     .all()
+
+    mismatches = []
+    for payment_id, project_id, total_cost, amount_paid, pending_balance, ledger_total in rows:
+        ledger_total = Decimal(ledger_total or 0)
+        expected_pending = Decimal(total_cost or 0) - ledger_total
+        if Decimal(amount_paid or 0) != ledger_total or Decimal(pending_balance or 0) != expected_pending:
+            mismatches.append({
+                'payment_id': payment_id,
+                'project_id': project_id,
+                'amount_paid': Decimal(amount_paid or 0),
+                'ledger_total': ledger_total,
+                'pending_balance': Decimal(pending_balance or 0),
+                'expected_pending': expected_pending
+            })
+
+    if fix and mismatches:
+        db.session.bulk_update_mappings(Payment, [
+            {'id': m['payment_id'], 'amount_paid': m['ledger_total'], 'pending_balance': m['expected_pending']}
+            for m in mismatches
+        ])
+        db.session.commit()
+    return mismatches
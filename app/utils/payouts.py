@@ -0,0 +1,198 @@
+"""
+Developer Payouts - Milestone-based earnings, payout statements and batch statement runs
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from flask import current_app
+from app import db
+from app.models import User, StudentProject, DeveloperAssignment, ProjectMilestone, DeveloperPayout
+from app.utils.matching import CLOSED_PROJECT_STATUSES
+import hashlib
+import os
+
+
+CENT = Decimal('0.01')
+# Below this many missing statements, rendering in-process beats starting a pool
+POOL_THRESHOLD = 4
+
+
+def period_bounds(period):
+    """'YYYY-MM' -> (first instant of the month, first instant of the next month)"""
+    start = datetime.strptime(period, '%Y-%m')
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
+
+def current_period():
+    return datetime.utcnow().strftime('%Y-%m')
+
+
+def compute_payouts(as_of=None, period_start=None, developer_ids=None):
+    """
+    Earned/paid/outstanding for every developer assignment as of `as_of`,
+    from one query over assignments joined to grouped milestone and payout
+    subqueries. Earnings accrue pro rata with completed milestones; projects
+    without milestones earn in full once delivered.
+
+    Returns {developer_id: {'earned', 'paid', 'paid_in_period', 'outstanding', 'lines': [...]}}
+    """
+    as_of = as_of or datetime.utcnow()
+
+    done = db.and_(ProjectMilestone.status == 'Completed',
+                   db.or_(ProjectMilestone.completed_at.is_(None), ProjectMilestone.completed_at < as_of))
+    milestones = db.session.query(
+        ProjectMilestone.project_id.label('project_id'),
+        db.func.count(ProjectMilestone.id).label('total'),
+        db.func.sum(db.case((done, 1), else_=0)).label('done')
+    ).group_by(ProjectMilestone.project_id).subquery()
+
+    in_period = DeveloperPayout.paid_at >= period_start if period_start else db.false()
+    payouts = db.session.query(
+        DeveloperPayout.assignment_id.label('assignment_id'),
+        db.func.sum(DeveloperPayout.amount).label('paid'),
+        db.func.sum(db.case((in_period, DeveloperPayout.amount), else_=0)).label('paid_in_period')
+    ).filter(DeveloperPayout.paid_at < as_of)\
+     .group_by(DeveloperPayout.assignment_id).subquery()
+
+    query = db.session.query(
+        DeveloperAssignment.id,
+        DeveloperAssignment.developer_id,
+        DeveloperAssignment.project_id,
+        DeveloperAssignment.role,
+        DeveloperAssignment.payout_amount,
+        StudentProject.title,
+        StudentProject.status,
+        milestones.c.total,
+        milestones.c.done,
+        payouts.c.paid,
+        payouts.c.paid_in_period
+    ).join(StudentProject, StudentProject.id == DeveloperAssignment.project_id)\
+     .outerjoin(milestones, milestones.c.project_id == DeveloperAssignment.project_id)\
+     .outerjoin(payouts, payouts.c.assignment_id == DeveloperAssignment.id)\
+     .filter(DeveloperAssignment.assigned_at < as_of)
+    if developer_ids:
+        query = query.filter(DeveloperAssignment.developer_id.in_(developer_ids))
+
+    results = {}
+    for (assignment_id, developer_id, project_id, role, payout_amount, title, status,
+         total, completed, paid, paid_in_period) in query.order_by(DeveloperAssignment.assigned_at):
+        payout_amount = Decimal(payout_amount or 0)
+        total, completed = int(total or 0), int(completed or 0)
+        if total:
+            earned = (payout_amount * completed / total).quantize(CENT)
+        else:
+            earned = payout_amount if status in CLOSED_PROJECT_STATUSES else Decimal(0)
+        paid = Decimal(paid or 0)
+
+        summary = results.setdefault(developer_id, {
+            'earned': Decimal(0), 'paid': Decimal(0), 'paid_in_period': Decimal(0),
+            'outstanding': Decimal(0), 'lines': []
+        })
+        summary['lines'].append({
+            'assignment_id': assignment_id,
+            'project_id': project_id,
+            'project_title': title,
+            'role': role,
+            'payout_amount': payout_amount,
+            'milestones_done': completed,
+            'milestones_total': total,
+            'earned': earned,
+            'paid': paid,
+            'outstanding': earned - paid
+        })
+        summary['earned'] += earned
+        summary['paid'] += paid
+        summary['paid_in_period'] += Decimal(paid_in_period or 0)
+        summary['outstanding'] += earned - paid
+    return results
+
+
+def build_statements(period, developer_ids=None):
+    """
+    Plain-dict statements for `period` ('YYYY-MM'), with balances as of the
+    end of the period and the payouts made during it.
+    """
+    start, end = period_bounds(period)
+    totals = compute_payouts(as_of=end, period_start=start, developer_ids=developer_ids)
+    if not totals:
+        return []
+
+    developers = {u.id: u for u in User.query.filter(User.id.in_(totals.keys()))}
+
+    period_payouts = {}
+    rows = db.session.query(DeveloperPayout, StudentProject.title)\
+        .join(DeveloperAssignment, DeveloperAssignment.id == DeveloperPayout.assignment_id)\
+        .join(StudentProject, StudentProject.id == DeveloperAssignment.project_id)\
+        .filter(DeveloperPayout.developer_id.in_(totals.keys()),
+                DeveloperPayout.paid_at >= start, DeveloperPayout.paid_at < end)\
+        .order_by(DeveloperPayout.paid_at).all()
+    for payout, title in rows:
+        period_payouts.setdefault(payout.developer_id, []).append({
+            'paid_at': payout.paid_at.strftime('%Y-%m-%d'),
+            'project_title': title,
+            'reference': payout.reference,
+            'amount': Decimal(payout.amount)
+        })
+
+    return [dict(
+        totals[developer_id],
+        period=period,
+        period_label=start.strftime('%B %Y'),
+        developer_id=developer_id,
+        developer_name=developers[developer_id].full_name if developer_id in developers else f'#{developer_id}',
+        developer_email=developers[developer_id].email if developer_id in developers else '',
+        payouts=period_payouts.get(developer_id, [])
+    ) for developer_id in sorted(totals)]
+
+
+def _render_statement(statement):
+    """Worker entry point - returns the PDF bytes for one statement"""
+    from app.utils.invoice_generator import generate_payout_statement_pdf
+    return generate_payout_statement_pdf(statement).getvalue()
+
+
+def _statement_path(statement):
+    """Cache path keyed by period, developer and a digest of the statement's figures"""
+    digest = hashlib.sha1(repr(sorted(statement.items())).encode()).hexdigest()[:16]
+    folder = os.path.join(current_app.instance_path, 'payout_statements', statement['period'])
+    return folder, os.path.join(folder, f"{statement['developer_id']}-{digest}.pdf")
+
+
+def render_statements(statements, workers=None):
+    """
+    Write PDFs for `statements`, reusing cached files whose figures are
+    unchanged. Missing ones are rendered in a process pool.
+    Returns {developer_id: path}.
+    """
+    paths = {}
+    missing = []
+    for statement in statements:
+        folder, path = _statement_path(statement)
+        paths[statement['developer_id']] = path
+        if not os.path.exists(path):
+            os.makedirs(folder, exist_ok=True)
+            missing.append((statement, path))
+
+    if len(missing) < POOL_THRESHOLD:
+        rendered = map(_render_statement, [statement for statement, _ in missing])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(_render_statement, [statement for statement, _ in missing], chunksize=4))
+
+    for (statement, path), pdf in zip(missing, rendered):
+        prefix = f"{statement['developer_id']}-"
+        folder = os.path.dirname(path)
+        for name in os.listdir(folder):
+            if name.startswith(prefix) and name != os.path.basename(path):
+                os.remove(os.path.join(folder, name))  # Superseded figures
+        with open(path, 'wb') as f:
+            f.write(pdf)
+    return paths
+
+
+def run_payouts(period, workers=None):
+    """Build and render every developer's statement for a period"""
+    statements = build_statements(period)
+    return statements, render_statements(statements, workers=workers)
@@ -0,0 +1,226 @@
+"""
+Reminders - Once-a-minute dispatcher for upcoming appointments and lead callbacks
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import User, DeveloperProfile, ClientProfile, Appointment, Lead, LeadFollowUp, ReminderDelivery
+from app.utils.notifications import create_transport
+from app.utils.scheduling import platform_now
+import hashlib
+
+
+# Appointment reminders go out this long before the start time
+APPOINTMENT_OFFSETS = {'24h': timedelta(hours=24), '1h': timedelta(hours=1)}
+# Reps are reminded of their lead callbacks this long before they are due
+CALLBACK_OFFSET = timedelta(minutes=15)
+# A reminder still goes out if the dispatcher was down for up to this long;
+# failed deliveries are retried on every tick within the same window
+CATCH_UP = timedelta(minutes=15)
+MAX_ATTEMPTS = 5
+# A claim this old with no outcome belongs to a dispatcher that crashed mid-send
+STALE_CLAIM = timedelta(minutes=10)
+# Keys per IN (...) clause
+KEY_CHUNK = 500
+
+
+def _chunks(items, size=KEY_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _due_appointments(now):
+    """Reminder items for both parties of every appointment entering a reminder window"""
+    developer_user = db.select(DeveloperProfile.user_id).where(DeveloperProfile.id == Appointment.developer_id)\
+        .scalar_subquery()
+    client_user = db.select(ClientProfile.user_id).where(ClientProfile.id == Appointment.client_id)\
+        .scalar_subquery()
+
+    items = []
+    for label, offset in APPOINTMENT_OFFSETS.items():
+        rows = db.session.query(
+            Appointment.id, Appointment.scheduled_at, Appointment.title, Appointment.appointment_type,
+            Appointment.meeting_link, developer_user, client_user
+        ).filter(
+            Appointment.scheduled_at > now + offset - CATCH_UP,
+            Appointment.scheduled_at <= now + offset,
+            Appointment.status.in_(('pending', 'confirmed'))
+        ).all()
+        for appt_id, scheduled_at, title, appt_type, link, developer_id, client_id in rows:
+            for recipient_id, other_id in ((developer_id, client_id), (client_id, developer_id)):
+                if recipient_id is None:
+                    continue
+                items.append({
+                    # The start time is part of the key, so a rescheduled appointment is reminded again
+                    'key': f'appointment:{appt_id}:{label}:{scheduled_at:%Y%m%d%H%M}:{recipient_id}',
+                    'kind': 'appointment',
+                    'recipient_id': recipient_id,
+                    'other_id': other_id,
+                    'when': scheduled_at,
+                    'title': title or appt_type.replace('_', ' ').title(),
+                    'link': link,
+                })
+    return items
+
+
+def _due_callbacks(now):
+    """Reminder items for reps whose lead callbacks are coming up"""
+    rows = db.session.query(
+        LeadFollowUp.id, LeadFollowUp.callback_datetime, LeadFollowUp.created_by, Lead.student_name, Lead.phone
+    ).join(Lead, Lead.id == LeadFollowUp.lead_id).filter(
+        LeadFollowUp.callback_datetime > now + CALLBACK_OFFSET - CATCH_UP,
+        LeadFollowUp.callback_datetime <= now + CALLBACK_OFFSET,
+        LeadFollowUp.callback_status == 'pending',
+        LeadFollowUp.created_by.isnot(None)
+    ).all()
+    return [{
+        'key': f'callback:{follow_up_id}:{due:%Y%m%d%H%M}:{rep_id}',
+        'kind': 'callback',
+        'recipient_id': rep_id,
+        'when': due,
+        'title': f'Call back {name}' + (f' ({phone})' if phone else ''),
+    } for follow_up_id, due, rep_id, name, phone in rows]
+
+
+def _claim(items, transport_name, now):
+    """
+    Record items as being sent, skipping any already sent or in flight.
+    Returns the claimed items. The unique key makes a second dispatcher's
+    claim of a new item fail, and a retry is only claimed if its row still
+    has the status and attempt count read here, so two dispatchers never
+    send the same reminder.
+    """
+    by_key = {item['key']: item for item in items}
+    existing = {}
+    for chunk in _chunks(list(by_key)):
+        existing.update((row[0], row[1:]) for row in db.session.query(
+            ReminderDelivery.idempotency_key, ReminderDelivery.status,
+            ReminderDelivery.attempts, ReminderDelivery.updated_at
+        ).filter(ReminderDelivery.idempotency_key.in_(chunk)))
+
+    new = [key for key in by_key if key not in existing]
+    retry = [key for key, (status, attempts, updated_at) in existing.items()
+             if attempts < MAX_ATTEMPTS and (status == 'failed' or
+                                             (status == 'sending' and updated_at < now - STALE_CLAIM))]
+    try:
+        if new:
+            db.session.execute(db.insert(ReminderDelivery), [{
+                'idempotency_key': key,
+                'kind': by_key[key]['kind'],
+                'recipient_id': by_key[key]['recipient_id'],
+                'transport': transport_name,
+                'status': 'sending',
+                'attempts': 1,
+                'created_at': now,
+                'updated_at': now,
+            } for key in new])
+        # One UPDATE per retry (there are few), so a row another dispatcher
+        # re-claimed since it was read matches nothing and is left to it
+        retried = []
+        for key in retry:
+            status, attempts, _ = existing[key]
+            matched = db.session.query(ReminderDelivery).filter(
+                ReminderDelivery.idempotency_key == key,
+                ReminderDelivery.status == status,
+                ReminderDelivery.attempts == attempts
+            ).update({'status': 'sending', 'attempts': attempts + 1,
+                      'transport': transport_name, 'updated_at': now}, synchronize_session=False)
+            if matched:
+                retried.append(key)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        current_app.logger.warning('Reminder claim collided with another dispatcher; skipping this tick.')
+        return []
+    return [by_key[key] for key in new + retried]
+
+
+def _format_line(item, users):
+    line = f"{item['when']:%a %d %b, %H:%M} - {item['title']}"
+    other = users.get(item.get('other_id'))
+    if other:
+        line += f' with {other.full_name}'
+    if item.get('link'):
+        line += f"\n    Join: {item['link']}"
+    return line
+
+
+def _build_messages(items):
+    """One message per recipient covering all of their reminders this tick"""
+    recipient_items = defaultdict(list)
+    for item in items:
+        recipient_items[item['recipient_id']].append(item)
+
+    user_ids = set(recipient_items) | {item['other_id'] for item in items if item.get('other_id')}
+    users = {}
+    for chunk in _chunks(list(user_ids)):
+        users.update((u.id, u) for u in User.query.filter(User.id.in_(chunk)))
+
+    messages = []
+    for recipient_id, batch in recipient_items.items():
+        recipient = users.get(recipient_id)
+        batch.sort(key=lambda item: item['when'])
+        keys = sorted(item['key'] for item in batch)
+        message = {
+            'key': hashlib.sha256('\n'.join(keys).encode()).hexdigest()[:40],
+            'item_keys': keys,
+            'to_email': recipient.email if recipient else None,
+            'to_name': recipient.full_name if recipient else None,
+            'subject': f"Reminder: {batch[0]['title']}" if len(batch) == 1 else f'Reminder: {len(batch)} things coming up',
+            'body': 'Coming up:\n\n' + '\n\n'.join(_format_line(item, users) for item in batch)
+                    + '\n\n- Asan DevNest',
+            'items': [{'kind': item['kind'], 'when': item['when'].isoformat(), 'title': item['title']} for item in batch],
+        }
+        messages.append(message)
+    return messages
+
+
+def _record(messages, results, now):
+    """Mark every item of each message sent or failed, one UPDATE per outcome"""
+    outcomes = defaultdict(list)
+    for message in messages:
+        outcomes[results.get(message['key'], 'No result from transport')].extend(message['item_keys'])
+
+    for error, keys in outcomes.items():
+        values = {'status': 'sent', 'sent_at': now, 'last_error': None, 'updated_at': now} if error is None \
+            else {'status': 'failed', 'last_error': error[:1000], 'updated_at': now}
+        for chunk in _chunks(keys):
+            db.session.query(ReminderDelivery).filter(ReminderDelivery.idempotency_key.in_(chunk))\
+                .update(values, synchronize_session=False)
+    db.session.commit()
+
+
+def dispatch_reminders(now=None, transport=None):
+    """
+    One dispatcher tick: find reminders entering their window, claim them,
+    send one batched message per recipient and record the outcome.
+    Returns {'due', 'claimed', 'messages', 'sent', 'failed'}.
+    """
+    transport = transport or create_transport(current_app.config)
+    # Appointment starts and callback times are both entered as platform wall-clock time
+    now = now or platform_now()
+
+    items = _due_appointments(now) + _due_callbacks(now)
+    summary = {'due': len(items), 'claimed': 0, 'messages': 0, 'sent': 0, 'failed': 0}
+    if not items:
+        return summary
+
+    claim_time = datetime.utcnow()
+    claimed = _claim(items, transport.name, claim_time)
+    summary['claimed'] = len(claimed)
+    if not claimed:
+        return summary
+
+    messages = _build_messages(claimed)
+    undeliverable = {m['key']: 'Recipient has no email address' for m in messages if not m['to_email']}
+    results = transport.send_many([m for m in messages if m['to_email']])
+    results.update(undeliverable)
+    _record(messages, results, datetime.utcnow())
+
+    summary['messages'] = len(messages)
+    summary['sent'] = sum(1 for m in messages if m['key'] in results and results[m['key']] is None)
+    summary['failed'] = summary['messages'] - summary['sent']
+    return summary
@@ -0,0 +1,394 @@
+"""
+Revenue Facts - Incremental daily revenue rollups per closer and domain
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import inspect
+from app import db
+from app.models import (
+    User, Lead, StudentProject, Payment, PaymentTransaction,
+    DeveloperAssignment, RevenueDailyFact
+)
+
+
+UNSPECIFIED_DOMAIN = 'Unspecified'
+MEASURES = ('projects_closed', 'booked_revenue', 'collected', 'dev_cost')
+PERIODS = ('week', 'month', 'quarter')
+
+
+def _day(value):
+    if value is None:
+        return datetime.utcnow().date()
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    return value.date() if isinstance(value, datetime) else value
+
+
+# ============ Incremental Updates (called from model listeners) ============
+
+def _closer(value):
+    return int(value) if value not in (None, '') else None
+
+
+def _project_dims(connection, project_id):
+    """(closer_id, domain) for a StudentProject, read on the flushing connection"""
+    row = connection.execute(
+        db.select(StudentProject.closed_by_id, Lead.domain)
+        .select_from(StudentProject)
+        .outerjoin(Lead, Lead.id == StudentProject.lead_id)
+        .where(StudentProject.id == project_id)
+    ).first()
+    if row is None:
+        return None, UNSPECIFIED_DOMAIN
+    return _closer(row[0]), row[1] or UNSPECIFIED_DOMAIN
+
+
+def _upsert(connection, table, values, deltas):
+    """INSERT ... ON CONFLICT/DUPLICATE KEY adding `deltas`, or None if the dialect has no upsert"""
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(**values)
+        return stmt.on_duplicate_key_update(**{name: table.c[name] + stmt.inserted[name] for name in deltas})
+    if dialect in ('sqlite', 'postgresql'):
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+        stmt = (sqlite_insert if dialect == 'sqlite' else postgresql_insert)(table).values(**values)
+        return stmt.on_conflict_do_update(
+            index_elements=['day', 'closer_id', 'domain'],
+            set_={name: table.c[name] + stmt.excluded[name] for name in deltas}
+        )
+    return None
+
+
+def bump_fact(connection, day, closer_id, domain, **deltas):
+    """Add `deltas` (which may be negative) to one fact row, inserting it on first use"""
+    table = RevenueDailyFact.__table__
+    values = {name: 0 for name in MEASURES}
+    values.update(deltas)
+    values.update(day=day, closer_id=closer_id, domain=domain)
+
+    # A single upsert, so two first writes for the same key cannot both insert.
+    # NULL closers never conflict on the unique key, so those rows keep the
+    # update-then-insert path; a rare duplicate row there is harmless as every
+    # report sums the facts.
+    stmt = _upsert(connection, table, values, deltas) if closer_id is not None else None
+    if stmt is not None:
+        connection.execute(stmt)
+        return
+
+    key = db.and_(
+        table.c.day == day,
+        table.c.closer_id.is_(None) if closer_id is None else table.c.closer_id == closer_id,
+        table.c.domain == domain
+    )
+    result = connection.execute(
+        table.update().where(key).values(
+            **{name: table.c[name] + delta for name, delta in deltas.items()}
+        )
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**values))
+
+
+def _previous(target, attr):
+    """An attribute's value before the pending change"""
+    history = inspect(target).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(target, attr)
+
+
+def _changed(target, *attrs):
+    state = inspect(target)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _payment_fact(connection, project_id, created_at, total_cost, sign=1):
+    closer_id, domain = _project_dims(connection, project_id)
+    bump_fact(connection, _day(created_at), closer_id, domain,
+              projects_closed=sign, booked_revenue=sign * Decimal(total_cost or 0))
+
+
+def _transaction_fact(connection, payment_id, transaction_date, amount, sign=1):
+    project_id = connection.execute(
+        db.select(Payment.project_id).where(Payment.id == payment_id)
+    ).scalar()
+    closer_id, domain = _project_dims(connection, project_id)
+    bump_fact(connection, _day(transaction_date), closer_id, domain,
+              collected=sign * Decimal(amount or 0))
+
+
+def _assignment_fact(connection, project_id, assigned_at, payout_amount, sign=1):
+    closer_id, domain = _project_dims(connection, project_id)
+    bump_fact(connection, _day(assigned_at), closer_id, domain,
+              dev_cost=sign * Decimal(payout_amount or 0))
+
+
+def record_payment(connection, payment):
+    _payment_fact(connection, payment.project_id, payment.created_at, payment.total_cost)
+
+
+def record_transaction(connection, transaction):
+    _transaction_fact(connection, transaction.payment_id, transaction.transaction_date, transaction.amount)
+
+
+def record_assignment(connection, assignment):
+    _assignment_fact(connection, assignment.project_id, assignment.assigned_at, assignment.payout_amount)
+
+
+# Fields whose edits move money between fact rows
+PAYMENT_FIELDS = ('project_id', 'created_at', 'total_cost')
+TRANSACTION_FIELDS = ('payment_id', 'transaction_date', 'amount')
+ASSIGNMENT_FIELDS = ('project_id', 'assigned_at', 'payout_amount')
+
+
+def update_payment(connection, payment):
+    if _changed(payment, *PAYMENT_FIELDS):
+        _payment_fact(connection, *[_previous(payment, f) for f in PAYMENT_FIELDS], sign=-1)
+        record_payment(connection, payment)
+
+
+def update_transaction(connection, transaction):
+    if _changed(transaction, *TRANSACTION_FIELDS):
+        _transaction_fact(connection, *[_previous(transaction, f) for f in TRANSACTION_FIELDS], sign=-1)
+        record_transaction(connection, transaction)
+
+
+def update_assignment(connection, assignment):
+    if _changed(assignment, *ASSIGNMENT_FIELDS):
+        _assignment_fact(connection, *[_previous(assignment, f) for f in ASSIGNMENT_FIELDS], sign=-1)
+        record_assignment(connection, assignment)
+
+
+def remove_payment(connection, payment):
+    _payment_fact(connection, payment.project_id, payment.created_at, payment.total_cost, sign=-1)
+
+
+def remove_transaction(connection, transaction):
+    _transaction_fact(connection, transaction.payment_id, transaction.transaction_date, transaction.amount, sign=-1)
+
+
+def remove_assignment(connection, assignment):
+    _assignment_fact(connection, assignment.project_id, assignment.assigned_at, assignment.payout_amount, sign=-1)
+
+
+def _project_contributions(connection, project_ids):
+    """[(day, deltas)] for everything the projects add to the facts"""
+    contributions = []
+    for created_at, total_cost in connection.execute(
+            db.select(Payment.created_at, Payment.total_cost).where(Payment.project_id.in_(project_ids))):
+        contributions.append((_day(created_at), {'projects_closed': 1, 'booked_revenue': Decimal(total_cost or 0)}))
+    for transaction_date, amount in connection.execute(
+            db.select(PaymentTransaction.transaction_date, PaymentTransaction.amount)
+            .join(Payment, Payment.id == PaymentTransaction.payment_id)
+            .where(Payment.project_id.in_(project_ids))):
+        contributions.append((_day(transaction_date), {'collected': Decimal(amount or 0)}))
+    for assigned_at, payout_amount in connection.execute(
+            db.select(DeveloperAssignment.assigned_at, DeveloperAssignment.payout_amount)
+            .where(DeveloperAssignment.project_id.in_(project_ids))):
+        contributions.append((_day(assigned_at), {'dev_cost': Decimal(payout_amount or 0)}))
+    return contributions
+
+
+def _move_facts(connection, project_ids, old_dims, new_dims):
+    """Re-file the projects' contributions from one (closer, domain) to another"""
+    if old_dims == new_dims or not project_ids:
+        return
+    for day, deltas in _project_contributions(connection, project_ids):
+        bump_fact(connection, day, *old_dims, **{name: -value for name, value in deltas.items()})
+        bump_fact(connection, day, *new_dims, **deltas)
+
+
+def _lead_domain(connection, lead_id):
+    if lead_id is None:
+        return UNSPECIFIED_DOMAIN
+    return connection.execute(db.select(Lead.domain).where(Lead.id == lead_id)).scalar() or UNSPECIFIED_DOMAIN
+
+
+def update_project_dims(connection, project):
+    """A project changed closer or lead: move its facts to the new closer/domain"""
+    if not _changed(project, 'closed_by_id', 'lead_id'):
+        return
+    old_dims = (_closer(_previous(project, 'closed_by_id')), _lead_domain(connection, _previous(project, 'lead_id')))
+    new_dims = (_closer(project.closed_by_id), _lead_domain(connection, project.lead_id))
+    _move_facts(connection, [project.id], old_dims, new_dims)
+
+
+def update_lead_domain(connection, lead):
+    """A lead's domain changed: move the facts of the project it converted into"""
+    if not _changed(lead, 'domain'):
+        return
+    for project_id, closer_id in connection.execute(
+            db.select(StudentProject.id, StudentProject.closed_by_id).where(StudentProject.lead_id == lead.id)):
+        _move_facts(connection, [project_id],
+                    (_closer(closer_id), _previous(lead, 'domain') or UNSPECIFIED_DOMAIN),
+                    (_closer(closer_id), lead.domain or UNSPECIFIED_DOMAIN))
+
+
+def record_collections(connection, transactions):
+    """
+    Fact updates for PaymentTransaction rows inserted in bulk (which skips
+    the after_insert listener). `transactions` are insert mappings with
+    payment_id, transaction_date and amount.
+    """
+    payment_ids = {t['payment_id'] for t in transactions}
+    if not payment_ids:
+        return
+    dims = {
+        payment_id: (_closer(closer_id), domain or UNSPECIFIED_DOMAIN)
+        for payment_id, closer_id, domain in connection.execute(
+            db.select(Payment.id, StudentProject.closed_by_id, Lead.domain)
+            .select_from(Payment)
+            .join(StudentProject, StudentProject.id == Payment.project_id)
+            .outerjoin(Lead, Lead.id == StudentProject.lead_id)
+            .where(Payment.id.in_(payment_ids))
+        )
+    }
+
+    totals = {}
+    for t in transactions:
+        closer_id, domain = dims.get(t['payment_id'], (None, UNSPECIFIED_DOMAIN))
+        key = (_day(t['transaction_date']), closer_id, domain)
+        totals[key] = totals.get(key, 0) + Decimal(t['amount'])
+    for (day, closer_id, domain), amount in totals.items():
+        bump_fact(connection, day, closer_id, domain, collected=amount)
+
+
+# ============ Rebuild ============
+
+def rebuild_revenue_facts(since=None):
+    """
+    Recompute facts from the source tables with grouped queries, for the
+    initial backfill and the nightly check. Edits through the ORM keep the
+    facts current; bulk query updates and changes made outside the app don't.
+    Returns the number of fact rows written.
+    """
+    domain = db.func.coalesce(Lead.domain, UNSPECIFIED_DOMAIN)
+
+    def grouped(date_column, source, *measures):
+        day = db.func.date(date_column)
+        query = db.session.query(day, StudentProject.closed_by_id, domain, *measures)\
+            .select_from(source)\
+            .outerjoin(Lead, Lead.id == StudentProject.lead_id)
+        if since:
+            query = query.filter(date_column >= datetime.combine(since, datetime.min.time()))
+        return query.group_by(day, StudentProject.closed_by_id, domain)
+
+    sources = [
+        (grouped(Payment.created_at,
+                 db.join(Payment, StudentProject, StudentProject.id == Payment.project_id),
+                 db.func.count(Payment.id), db.func.sum(Payment.total_cost)),
+         ('projects_closed', 'booked_revenue')),
+        (grouped(PaymentTransaction.transaction_date,
+                 db.join(PaymentTransaction, Payment, Payment.id == PaymentTransaction.payment_id)
+                   .join(StudentProject, StudentProject.id == Payment.project_id),
+                 db.func.sum(PaymentTransaction.amount)),
+         ('collected',)),
+        (grouped(DeveloperAssignment.assigned_at,
+                 db.join(DeveloperAssignment, StudentProject, StudentProject.id == DeveloperAssignment.project_id),
+                 db.func.sum(DeveloperAssignment.payout_amount)),
+         ('dev_cost',)),
+    ]
+
+    facts = {}
+    for query, names in sources:
+        for day, closer_id, fact_domain, *values in query.all():
+            closer_id = _closer(closer_id)
+            fact = facts.setdefault((_day(day), closer_id, fact_domain), {name: 0 for name in MEASURES})
+            for name, value in zip(names, values):
+                fact[name] += value or 0
+
+    delete = RevenueDailyFact.query
+    if since:
+        delete = delete.filter(RevenueDailyFact.day >= since)
+    delete.delete(synchronize_session=False)
+
+    db.session.bulk_insert_mappings(RevenueDailyFact, [
+        dict(values, day=day, closer_id=closer_id, domain=fact_domain)
+        for (day, closer_id, fact_domain), values in facts.items()
+    ])
+    db.session.commit()
+    return len(facts)
+
+
+# ============ Reporting ============
+
+def get_revenue_totals():
+    """
+    Lifetime {'projects_closed', 'booked_revenue', 'collected', 'dev_cost'},
+    plus 'outstanding': booked revenue not yet collected, which is what
+    SUM(Payment.pending_balance) comes to while the ledger reconciles
+    """
+    row = db.session.query(*[
+        db.func.coalesce(db.func.sum(getattr(RevenueDailyFact, name)), 0) for name in MEASURES
+    ]).one()
+    totals = dict(zip(MEASURES, row))
+    totals['outstanding'] = Decimal(totals['booked_revenue']) - Decimal(totals['collected'])
+    return totals
+
+
+def get_leaderboard(since=None):
+    """[(User, project_count, revenue)] ordered by booked revenue"""
+    query = db.session.query(
+        User,
+        db.func.sum(RevenueDailyFact.projects_closed).label('project_count'),
+        db.func.sum(RevenueDailyFact.booked_revenue).label('revenue')
+    ).join(RevenueDailyFact, User.id == RevenueDailyFact.closer_id)
+    if since:
+        query = query.filter(RevenueDailyFact.day >= since)
+    return query.group_by(User.id)\
+        .having(db.func.sum(RevenueDailyFact.projects_closed) > 0)\
+        .order_by(db.desc('revenue')).all()
+
+
+def period_start(day, period):
+    """First day of the week/month/quarter containing `day`"""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+
+
+def _previous_start(start, period):
+    if period == 'week':
+        return start - timedelta(days=7)
+    return period_start(start - timedelta(days=1), period)
+
+
+def revenue_by_period(period='month', count=6, today=None):
+    """
+    Totals for the last `count` periods, oldest first, each with the change in
+    booked revenue against the period before it. Reads one row per
+    day/closer/domain, so cost grows with days rather than transactions.
+    """
+    if period not in PERIODS:
+        raise ValueError(f'Unknown period: {period}')
+
+    starts = [period_start(today or datetime.utcnow().date(), period)]
+    for _ in range(count):  # One extra for the first period's comparison
+        starts.append(_previous_start(starts[-1], period))
+    starts.reverse()
+
+    rows = db.session.query(
+        RevenueDailyFact.day, *[db.func.sum(getattr(RevenueDailyFact, name)) for name in MEASURES]
+    ).filter(RevenueDailyFact.day >= starts[0])\
+     .group_by(RevenueDailyFact.day).all()
+
+    buckets = {start: {name: 0 for name in MEASURES} for start in starts}
+    for day, *values in rows:
+        bucket = buckets.get(period_start(_day(day), period))
+        if bucket is not None:
+            for name, value in zip(MEASURES, values):
+                bucket[name] += value or 0
+
+    results = []
+    for previous, start in zip(starts, starts[1:]):
+        totals = buckets[start]
+        before = Decimal(buckets[previous]['booked_revenue'])
+        change = None
+        if before:
+            change = float((Decimal(totals['booked_revenue']) - before) / before * 100)
+        results.append(dict(totals, start=start, profit=Decimal(totals['booked_revenue']) - Decimal(totals['dev_cost']),
+                            change=change))
+    return results
@@ -0,0 +1,310 @@
+"""
+Scheduling - Weekly availability, conflict detection and free-slot search over a developer's bookings
+"""
+
+from bisect import bisect_right
+from datetime import datetime, timedelta, time
+from time import monotonic
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from flask import current_app
+from sqlalchemy import event
+from app import db
+from app.models import Appointment, AvailabilityRule, DeveloperProfile
+import threading
+
+
+# Bookings in these states hold their time slot
+BLOCKING_STATUSES = ('pending', 'confirmed', 'in_progress')
+# Only accepted bookings stop a developer from confirming another request
+CONFIRMED_STATUSES = ('confirmed', 'in_progress')
+
+MIN_DURATION_MINUTES = 15
+MAX_DURATION_MINUTES = 8 * 60
+# Longest range the availability API searches in one request
+MAX_RANGE_DAYS = 31
+
+# Computed slots are cached per developer and dropped whenever their bookings or
+# calendar change. The cache is per process, so other workers may show a slot
+# for up to SLOT_CACHE_SECONDS after it is taken; booking re-checks under a lock.
+SLOT_CACHE_SECONDS = 300
+SLOT_CACHE_ENTRIES = 16  # Date ranges kept per developer
+
+_slot_cache = {}
+# Request threads share the cache; evictions and inserts happen under this lock
+_slot_cache_lock = threading.Lock()
+
+# Offered in the weekly calendar form; any IANA name is accepted
+COMMON_TIMEZONES = [
+    'Asia/Kolkata', 'Asia/Dubai', 'Asia/Singapore', 'Asia/Tokyo', 'Australia/Sydney',
+    'Europe/London', 'Europe/Berlin', 'Africa/Nairobi', 'America/New_York', 'America/Chicago',
+    'America/Los_Angeles', 'UTC',
+]
+
+
+class SchedulingConflict(ValueError):
+    """The requested time overlaps another booking"""
+
+    def __init__(self, appointment_id, start, end):
+        super().__init__(f"Overlaps another booking from {start:%Y-%m-%d %H:%M} to {end:%H:%M}.")
+        self.appointment_id = appointment_id
+        self.start = start
+        self.end = end
+
+
+class DeveloperSchedule:
+    """
+    A developer's bookings in a time window as sorted, merged busy intervals.
+    Overlapping bookings (e.g. legacy data) are merged, so both `starts` and
+    `ends` stay sorted and every lookup is a bisect.
+    """
+
+    def __init__(self, intervals):
+        self.starts, self.ends, self.ids = [], [], []
+        for start, end, appointment_id in sorted(intervals):
+            if self.ends and start < self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+                self.ids.append(appointment_id)
+
+    @classmethod
+    def load(cls, developer_id, window_start, window_end, statuses=BLOCKING_STATUSES, exclude_id=None):
+        """Bookings that could overlap [window_start, window_end), from one indexed range query"""
+        return cls.load_many([developer_id], window_start, window_end, statuses, exclude_id)[developer_id]
+
+    @classmethod
+    def load_many(cls, developer_ids, window_start, window_end, statuses=BLOCKING_STATUSES, exclude_id=None):
+        """{developer_id: DeveloperSchedule} for several developers from a single query"""
+        query = db.session.query(Appointment.developer_id, Appointment.id,
+                                 Appointment.scheduled_at, Appointment.duration_minutes)\
+            .filter(Appointment.developer_id.in_(developer_ids),
+                    Appointment.status.in_(statuses),
+                    Appointment.scheduled_at >= window_start - timedelta(minutes=MAX_DURATION_MINUTES),
+                    Appointment.scheduled_at < window_end)
+        if exclude_id:
+            query = query.filter(Appointment.id != exclude_id)
+        intervals = {developer_id: [] for developer_id in developer_ids}
+        for developer_id, appointment_id, scheduled_at, duration in query:
+            intervals[developer_id].append(
+                (scheduled_at, scheduled_at + timedelta(minutes=duration or 60), appointment_id))
+        return {developer_id: cls(items) for developer_id, items in intervals.items()}
+
+    def conflict(self, start, end):
+        """(appointment_id, start, end) of the busy interval overlapping [start, end), or None"""
+        i = bisect_right(self.ends, start)  # first interval still running after `start`
+        if i < len(self.starts) and self.starts[i] < end:
+            return self.ids[i], self.starts[i], self.ends[i]
+        return None
+
+    def free_slots(self, window_start, window_end, duration, step):
+        """Start times in [window_start, window_end) of free `duration` slots, aligned to `step`"""
+        slots = []
+        i = bisect_right(self.ends, window_start)
+        cursor = window_start
+        while cursor + duration <= window_end:
+            # Skip past every busy interval the candidate slot runs into
+            while i < len(self.starts) and self.starts[i] < cursor + duration:
+                if self.ends[i] > cursor:
+                    cursor = _align(self.ends[i], window_start, step)
+                i += 1
+            if cursor + duration > window_end:
+                break
+            slots.append(cursor)
+            cursor += step
+        return slots
+
+
+def _align(moment, origin, step):
+    """Round `moment` up to the next multiple of `step` after `origin`"""
+    remainder = (moment - origin) % step
+    return moment + (step - remainder) if remainder else moment
+
+
+def validate_duration(minutes):
+    if not MIN_DURATION_MINUTES <= minutes <= MAX_DURATION_MINUTES:
+        raise ValueError(f'Duration must be between {MIN_DURATION_MINUTES} and {MAX_DURATION_MINUTES} minutes.')
+
+
+def check_availability(developer_id, start, duration_minutes, statuses=BLOCKING_STATUSES, exclude_id=None, lock=True,
+                       validate=True):
+    """
+    Raise SchedulingConflict if [start, start + duration) overlaps a booking.
+    With `lock`, the developer's profile row is locked first so concurrent
+    bookings for the same developer are checked one at a time; commit or
+    roll back promptly afterwards. `validate=False` skips the booking-form
+    duration limits, for bookings that already exist.
+    """
+    if validate:
+        validate_duration(duration_minutes)
+    if lock:
+        db.session.query(DeveloperProfile.id).filter_by(id=developer_id).with_for_update().first()
+    end = start + timedelta(minutes=duration_minutes)
+    conflict = DeveloperSchedule.load(developer_id, start, end, statuses, exclude_id).conflict(start, end)
+    if conflict:
+        raise SchedulingConflict(*conflict)
+
+
+def _zone(name):
+    try:
+        return ZoneInfo(name or '')
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def is_valid_timezone(name):
+    return bool(name) and _zone(name) is not None
+
+
+def expand_rules(rules, range_start, range_end, platform_zone):
+    """
+    Lazily yield the (start, end) windows the rules produce inside
+    [range_start, range_end), converted to naive platform-timezone times like
+    Appointment.scheduled_at. Only the days in the range are ever expanded.
+    """
+    for rule in rules:
+        zone = _zone(rule.timezone) or platform_zone
+        # A window's local date can differ from its platform date by a day either way
+        day = range_start.date() - timedelta(days=1)
+        while day <= range_end.date() + timedelta(days=1):
+            if rule.occurs_on(day):
+                start = datetime.combine(day, rule.start_time, zone).astimezone(platform_zone).replace(tzinfo=None)
+                end = datetime.combine(day, rule.end_time, zone).astimezone(platform_zone).replace(tzinfo=None)
+                start, end = max(start, range_start), min(end, range_end)
+                if start < end:
+                    yield start, end
+            day += timedelta(days=1)
+
+
+def _default_windows(range_start, range_end):
+    """Platform booking hours, for developers who have not published a weekly calendar"""
+    config = current_app.config
+    day = range_start.date()
+    while day < range_end.date():
+        start = datetime.combine(day, time(config.get('SCHEDULING_DAY_START', 9)))
+        end = datetime.combine(day, time(config.get('SCHEDULING_DAY_END', 18)))
+        if start < end:
+            yield start, end
+        day += timedelta(days=1)
+
+
+def _platform_zone():
+    return _zone(current_app.config.get('SCHEDULING_TIMEZONE')) or ZoneInfo('UTC')
+
+
+def platform_now():
+    """Current wall-clock time in SCHEDULING_TIMEZONE, comparable with Appointment.scheduled_at"""
+    return datetime.now(_platform_zone()).replace(tzinfo=None)
+
+
+def check_within_calendar(developer_id, start, duration_minutes):
+    """
+    Raise ValueError if the developer publishes a weekly calendar and
+    [start, start + duration) does not fall inside it. Adjacent windows
+    count as one, so a booking may run from one into the next.
+    """
+    rules = AvailabilityRule.query.filter_by(developer_id=developer_id).all()
+    if not rules:
+        return
+    end = start + timedelta(minutes=duration_minutes)
+    day_start = datetime.combine(start.date(), time.min)
+    windows = sorted(expand_rules(rules, day_start, max(end, day_start + timedelta(days=1)), _platform_zone()))
+    covered_until = start
+    for window_start, window_end in windows:
+        if window_start <= covered_until < window_end:
+            covered_until = window_end
+    if covered_until < end:
+        raise ValueError("That time is outside the developer's weekly availability.")
+
+
+def _compute_slots(rules, schedule, range_start, range_end, duration, step):
+    windows = expand_rules(rules, range_start, range_end, _platform_zone()) if rules else _default_windows(range_start, range_end)
+    slots = set()
+    for window_start, window_end in windows:
+        # Align to the step from midnight so overlapping rules offer the same start times
+        window_start = _align(window_start, datetime.combine(window_start.date(), time.min), step)
+        slots.update(schedule.free_slots(window_start, window_end, duration, step))
+    return [(slot, slot + duration) for slot in sorted(slots)]
+
+
+def _cache_get(developer_id, key):
+    with _slot_cache_lock:
+        entry = _slot_cache.get(developer_id, {}).get(key)
+    if entry and entry[0] > monotonic():
+        return entry[1]
+    return None
+
+
+def _cache_put(developer_id, key, slots):
+    with _slot_cache_lock:
+        entries = _slot_cache.setdefault(developer_id, {})
+        if len(entries) >= SLOT_CACHE_ENTRIES:
+            entries.pop(next(iter(entries)))
+        entries[key] = (monotonic() + SLOT_CACHE_SECONDS, slots)
+
+
+def invalidate_slots(developer_id):
+    """Drop cached slots for a developer; called whenever their bookings or calendar change"""
+    with _slot_cache_lock:
+        _slot_cache.pop(developer_id, None)
+
+
+def available_slots_many(developers, start_date, end_date, duration_minutes, not_before=None, limit=None):
+    """
+    Open slots of `duration_minutes` between two dates (inclusive) for each
+    developer, as {developer_id: [(start, end)]}. Developers without cached
+    slots are computed together: one query for their calendars and one for
+    their bookings, however many developers there are.
+    """
+    validate_duration(duration_minutes)
+    if end_date < start_date or (end_date - start_date).days >= MAX_RANGE_DAYS:
+        raise ValueError(f'Date range must cover 1 to {MAX_RANGE_DAYS} days.')
+
+    duration = timedelta(minutes=duration_minutes)
+    step = timedelta(minutes=current_app.config.get('SCHEDULING_SLOT_MINUTES', 30))
+    range_start = datetime.combine(start_date, time.min)
+    range_end = datetime.combine(end_date + timedelta(days=1), time.min)
+    key = (start_date, end_date, duration_minutes, step)
+
+    results = {}
+    missing = []
+    for developer in developers:
+        cached = _cache_get(developer.id, key)
+        if cached is None:
+            missing.append(developer.id)
+        else:
+            results[developer.id] = cached
+
+    if missing:
+        rules = {developer_id: [] for developer_id in missing}
+        for rule in AvailabilityRule.query.filter(AvailabilityRule.developer_id.in_(missing)):
+            rules[rule.developer_id].append(rule)
+        schedules = DeveloperSchedule.load_many(missing, range_start, range_end)
+        for developer_id in missing:
+            slots = _compute_slots(rules[developer_id], schedules[developer_id], range_start, range_end, duration, step)
+            _cache_put(developer_id, key, slots)
+            results[developer_id] = slots
+
+    # The cache holds whole days; past times and the limit are applied per request
+    for developer_id, slots in results.items():
+        if not_before:
+            slots = [slot for slot in slots if slot[0] >= not_before]
+        results[developer_id] = slots[:limit] if limit else slots
+    return results
+
+
+def available_slots(developer, start_date, end_date, duration_minutes, not_before=None):
+    """Open slots for one developer as [(start, end)]; see available_slots_many"""
+    return available_slots_many([developer], start_date, end_date, duration_minutes, not_before)[developer.id]
+
+
+def _invalidate_for(mapper, connection, target):
+    invalidate_slots(target.developer_id)
+
+
+def register_schedule_events():
+    """Invalidate cached slots whenever a booking or availability rule is written"""
+    for model in (Appointment, AvailabilityRule):
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            if not event.contains(model, name, _invalidate_for):
+                event.listen(model, name, _invalidate_for)
@@ -0,0 +1,187 @@
+"""
+Upload Storage - Local filesystem and S3-compatible backends behind one interface
+"""
+
+from datetime import datetime
+from flask import current_app
+import os
+import shutil
+
+
+# S3 multipart settings: parts are streamed, never buffered whole in memory
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class LocalStorage:
+    """Files under a directory on this node (the default)"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def put_file(self, local_path, key, content_type=None):
+        """Move a finished local file into place under `key`"""
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(local_path, target)
+
+    def put_stream(self, stream, key, content_type=None):
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as out:
+            shutil.copyfileobj(stream, out)
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_keys(self, prefix=''):
+        """Yield (key, size, modified epoch) for every file under `prefix`"""
+        base = self.path(prefix.rstrip('/')) if prefix else self.root
+        for directory, _, filenames in os.walk(base):
+            for name in filenames:
+                full_path = os.path.join(directory, name)
+                stat = os.stat(full_path)
+                key = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+                yield key, stat.st_size, stat.st_mtime
+
+    def url(self, key, expires=None):
+        """Local files are served by the app itself"""
+        return None
+
+
+class S3Storage:
+    """Any S3-compatible object store (AWS S3, MinIO, R2, ...)"""
+
+    def __init__(self, bucket, endpoint_url=None, region=None, prefix='', url_expires=3600):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError:
+            raise RuntimeError('The S3 storage backend requires the boto3 package.')
+
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.url_expires = url_expires
+        self.transfer_config = TransferConfig(multipart_threshold=MULTIPART_THRESHOLD,
+                                              multipart_chunksize=MULTIPART_CHUNK_SIZE)
+
+    def _key(self, key):
+        return self.prefix + key
+
+    def _extra(self, content_type):
+        return {'ContentType': content_type} if content_type else None
+
+    def put_file(self, local_path, key, content_type=None):
+        """Upload a finished local file (multipart above the threshold), then remove it"""
+        self.client.upload_file(local_path, self.bucket, self._key(key),
+                                ExtraArgs=self._extra(content_type), Config=self.transfer_config)
+        os.remove(local_path)
+
+    def put_stream(self, stream, key, content_type=None):
+        self.client.upload_fileobj(stream, self.bucket, self._key(key),
+                                   ExtraArgs=self._extra(content_type), Config=self.transfer_config)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return True
+
+    def iter_keys(self, prefix=''):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for item in page.get('Contents', []):
+                key = item['Key'][len(self.prefix):]
+                modified = item['LastModified']
+                yield key, item['Size'], modified.timestamp() if isinstance(modified, datetime) else modified
+
+    def url(self, key, expires=None):
+        """Presigned GET so the browser downloads straight from the bucket"""
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': self._key(key)},
+            ExpiresIn=expires or self.url_expires
+        )
+
+
+def create_storage(config, backend=None):
+    """Build a backend from app config; `backend` overrides STORAGE_BACKEND"""
+    backend = backend or config.get('STORAGE_BACKEND', 'local')
+    if backend == 'local':
+        return LocalStorage(config['UPLOAD_FOLDER'])
+    if backend == 's3':
+        if not config.get('S3_BUCKET'):
+            raise RuntimeError('S3_BUCKET must be set to use the S3 storage backend.')
+        return S3Storage(
+            config['S3_BUCKET'],
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region=config.get('S3_REGION'),
+            prefix=config.get('S3_PREFIX', ''),
+            url_expires=config.get('S3_URL_EXPIRES', 3600)
+        )
+    raise RuntimeError(f"Unknown storage backend '{backend}'.")
+
+
+def get_storage():
+    """The app's storage backend, created once per app"""
+    storage = current_app.extensions.get('upload_storage')
+    if storage is None:
+        storage = current_app.extensions['upload_storage'] = create_storage(current_app.config)
+    return storage
+
+
+def migrate_files(source, target, prefixes, workers=8, overwrite=False):
+    """
+    Copy every file under `prefixes` from one backend to another with a thread
+    pool. Existing keys are skipped unless `overwrite`. Returns (copied, skipped, errors).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def copy(key):
+        if not overwrite and target.exists(key):
+            return 'skipped', key, None
+        try:
+            with source.open(key) as stream:
+                target.put_stream(stream, key)
+            return 'copied', key, None
+        except Exception as e:
+            return 'error', key, str(e)
+
+    keys = [key for prefix in prefixes for key, _, _ in source.iter_keys(prefix)
+            if not key.rsplit('/', 1)[-1].startswith('.')]
+
+    copied, skipped, errors = 0, 0, []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for outcome, key, error in pool.map(copy, keys):
+            if outcome == 'copied':
+                copied += 1
+            elif outcome == 'skipped':
+                skipped += 1
+            else:
+                errors.append((key, error))
+    return copied, skipped, errors
@@ -0,0 +1,92 @@
+"""
+Upload Serving - Cache headers, ETags and web-server offload for files under /uploads/
+"""
+
+from flask import current_app, request, redirect, send_from_directory, abort
+from werkzeug.security import safe_join
+from urllib.parse import quote
+from app.utils.storage import get_storage
+from app.utils.images import variant_source, variant_available
+import mimetypes
+import os
+import re
+
+
+# Content-addressed blobs (see file_store.blob_path) and their resized variants:
+# <folder>/ab/<sha256>.<ext>[.<size>.<format>]
+HASHED_NAME = re.compile(r'^[\w-]+/[0-9a-f]{2}/([0-9a-f]{64}(?:\.[A-Za-z0-9]+)*)$')
+
+# Hashed names never change content, so browsers and CDNs may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# Only these folders may be stored by shared caches; KYC and project files stay private
+PUBLIC_FOLDERS = {'avatars', 'articles'}
+
+
+def _cache_headers(response, filename, etag):
+    """
+    Hashed public files are immutable; private files and anything else are
+    revalidated against their ETag and never kept by shared caches.
+    """
+    if filename.split('/', 1)[0] not in PUBLIC_FOLDERS:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        if etag:
+            response.set_etag(etag)
+    elif etag:
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    return response
+
+
+def _accel_response(filename, etag):
+    """
+    Empty response telling nginx to serve the file from an internal location.
+    nginx then handles Range, ETag and If-Modified-Since itself.
+    """
+    path = safe_join(current_app.config['UPLOAD_FOLDER'], filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    response = current_app.response_class()
+    response.headers['X-Accel-Redirect'] = f"{current_app.config['UPLOAD_ACCEL_REDIRECT'].rstrip('/')}/{quote(filename)}"
+    response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    if not etag:
+        response.cache_control.no_cache = True
+    return _cache_headers(response, filename, etag)
+
+
+def serve_upload(filename):
+    """
+    Response for /uploads/<filename>:
+    - object stores: redirect to a presigned URL
+    - UPLOAD_ACCEL_REDIRECT set: X-Accel-Redirect to nginx
+    - USE_X_SENDFILE set: X-Sendfile to Apache/lighttpd (handled by send_file)
+    - otherwise the file is sent by the worker with Range and conditional support
+    Image variants that are still being rendered redirect to the original.
+    """
+    source = variant_source(filename)
+    if source and not variant_available(filename):
+        response = redirect(f'/uploads/{quote(source)}')
+        response.cache_control.no_cache = True
+        return response
+
+    url = get_storage().url(filename)
+    if url:
+        return redirect(url)
+
+    match = HASHED_NAME.match(filename)
+    etag = match.group(1) if match else None
+
+    # The hash is the ETag, so revalidation needs no disk access at all
+    if etag and etag in request.if_none_match:
+        return _cache_headers(current_app.response_class(status=304), filename, etag)
+
+    if current_app.config.get('UPLOAD_ACCEL_REDIRECT'):
+        return _accel_response(filename, etag)
+
+    response = send_from_directory(current_app.config['UPLOAD_FOLDER'], filename,
+                                   etag=etag or True, conditional=True)
+    return _cache_headers(response, filename, etag)
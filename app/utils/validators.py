@@ -57,6 +57,42 @@ def validate_phone(phone):
     return True, None
 
 
+def normalize_phone(phone, default_country_code='91'):
+    """
+    Normalize a phone number to E.164 (e.g. '+919876543210')
+    Bare 10-digit numbers are assumed to be in the default country.
+    Returns None if the number cannot be normalized.
+    """
+    if not phone:
+        return None
+    
+    cleaned = re.sub(r'[^\d+]', '', phone.strip())
+    if cleaned.startswith('00'):
+        cleaned = '+' + cleaned[2:]
+    
+    digits = cleaned.lstrip('+')
+    if not digits.isdigit():
+        return None
+    
+    if not cleaned.startswith('+'):
+        if len(digits) == 11 and digits.startswith('0'):
+            digits = digits[1:]
+        if len(digits) == 10:
+            digits = default_country_code + digits
+    
+    if not 10 <= len(digits) <= 15:
+        return None
+    
+    return '+' + digits
+
+
+def normalize_email(email):
+    """Lowercase and trim an email address, None if empty"""
+    if not email or not email.strip():
+        return None
+    return email.strip().lower()
+
+
 def validate_url(url):
     """Validate URL format"""
     if not url:
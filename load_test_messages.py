@@ -0,0 +1,196 @@
+"""
+Load test for live project messages: opens hundreds of Server-Sent Event
+streams against one threaded worker, posts messages both through that worker
+and straight into the database (as another worker would), and reports
+delivery, latency and how many queries the message hub's poller issued.
+
+Runs against its own SQLite database by default, so it never touches real data:
+
+    python load_test_messages.py --streams 350 --admins 50 --messages 40
+
+Set DATABASE_URL to test against MySQL instead; the script creates its own
+users and project there.
+"""
+
+from datetime import datetime
+from statistics import median
+from urllib.parse import urlencode
+import argparse
+import http.client
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--streams', type=int, default=350, help='Concurrent streams in total')
+    parser.add_argument('--admins', type=int, default=50, help='How many of the streams are admins (who see internal messages)')
+    parser.add_argument('--messages', type=int, default=40, help='Messages to post; every other one bypasses this worker')
+    parser.add_argument('--internal-every', type=int, default=5, help='Every Nth message is internal')
+    parser.add_argument('--interval', type=float, default=0.1, help='Seconds between messages')
+    parser.add_argument('--timeout', type=float, default=15.0, help='Seconds to wait for delivery after the last message')
+    return parser.parse_args()
+
+
+class StreamClient(threading.Thread):
+    """One SSE connection; records when each message id arrived"""
+
+    def __init__(self, port, project_id, cookie, is_admin):
+        super().__init__(daemon=True)
+        self.is_admin = is_admin
+        self.received = {}
+        self.contents = {}
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        self.conn.request('GET', f'/api/projects/{project_id}/messages/stream', headers={'Cookie': cookie})
+        self.response = self.conn.getresponse()
+        if self.response.status != 200:
+            raise RuntimeError(f'Stream returned HTTP {self.response.status}')
+
+    def run(self):
+        data = None
+        try:
+            while True:
+                line = self.response.readline()
+                if not line:
+                    return
+                line = line.decode('utf-8').rstrip('\n')
+                if line.startswith('data: '):
+                    data = json.loads(line[len('data: '):])
+                elif line == '' and data is not None:
+                    self.received.setdefault(data['id'], time.monotonic())
+                    self.contents[data['id']] = data.get('content')
+                    data = None
+        except OSError:
+            return
+
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load_test.db')}"
+
+    from werkzeug.serving import make_server
+    from sqlalchemy import create_engine, event, text
+    from app import create_app, db
+    from app.models import User, ClientProfile, Project
+    from app.utils.message_hub import hub
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    run_id = uuid.uuid4().hex[:8]
+    with app.app_context():
+        db.create_all()
+        admin = User(email=f'load-admin-{run_id}@example.com', full_name='Load Test Admin', role='admin', status='verified')
+        client = User(email=f'load-client-{run_id}@example.com', full_name='Load Test Client', role='client', status='verified')
+        for user in (admin, client):
+            user.set_password(uuid.uuid4().hex)
+            db.session.add(user)
+        db.session.flush()
+        profile = ClientProfile(user_id=client.id)
+        db.session.add(profile)
+        db.session.flush()
+        project = Project(client_id=profile.id, title='Load test project', description='Message stream load test')
+        db.session.add(project)
+        db.session.commit()
+        admin_id, client_id, project_id = admin.id, client.id, project.id
+
+        serializer = app.session_interface.get_signing_serializer(app)
+        cookie_name = app.config.get('SESSION_COOKIE_NAME', 'session')
+        cookies = {user_id: f"{cookie_name}={serializer.dumps({'_user_id': str(user_id), '_fresh': True})}"
+                   for user_id in (admin_id, client_id)}
+
+        # Queries issued by the hub's poller thread
+        poller_queries = [0]
+
+        def count_poller_query(*_):
+            if threading.current_thread().name == 'message-hub':
+                poller_queries[0] += 1
+        event.listen(db.engine, 'before_cursor_execute', count_poller_query)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # No access log line per request
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+
+    print(f'Opening {args.streams} streams ({args.admins} admin) on port {port}...')
+    streams = []
+    for i in range(args.streams):
+        is_admin = i < args.admins
+        stream = StreamClient(port, project_id, cookies[admin_id if is_admin else client_id], is_admin)
+        stream.start()
+        streams.append(stream)
+    while hub.subscriber_count() < args.streams:
+        time.sleep(0.05)
+    print(f'{hub.subscriber_count()} streams subscribed.')
+
+    # "Another worker": writes go straight to the database, so this process's hub only sees them by polling
+    other_worker = create_engine(os.environ['DATABASE_URL'])
+    sent = {}  # content -> (monotonic time sent, path, is_internal)
+    poller_queries[0] = 0
+    started = time.monotonic()
+    for i in range(args.messages):
+        content = f'load-test {run_id} #{i}'
+        internal = args.internal_every > 0 and i % args.internal_every == args.internal_every - 1
+        if i % 2 == 0:
+            sent[content] = (time.monotonic(), 'this worker', internal)
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            body = urlencode({'content': content, **({'is_internal': '1'} if internal else {})})
+            conn.request('POST', f'/api/projects/{project_id}/messages', body=body, headers={
+                'Cookie': cookies[admin_id], 'Content-Type': 'application/x-www-form-urlencoded'})
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status != 201:
+                raise RuntimeError(f'Posting a message returned HTTP {response.status}')
+        else:
+            sent[content] = (time.monotonic(), 'another worker', internal)
+            with other_worker.begin() as connection:
+                connection.execute(text(
+                    'INSERT INTO project_messages (project_id, sender_id, message_type, content, is_internal, created_at) '
+                    'VALUES (:project_id, :sender_id, :message_type, :content, :is_internal, :created_at)'
+                ), {'project_id': project_id, 'sender_id': admin_id, 'message_type': 'message', 'content': content,
+                    'is_internal': internal, 'created_at': datetime.utcnow()})
+        time.sleep(args.interval)
+
+    expected_admin = len(sent)
+    expected_client = sum(1 for _, _, internal in sent.values() if not internal)
+    deadline = time.monotonic() + args.timeout
+    while time.monotonic() < deadline:
+        if all(len(s.received) >= (expected_admin if s.is_admin else expected_client) for s in streams):
+            break
+        time.sleep(0.1)
+    elapsed = time.monotonic() - started
+
+    latencies = {'this worker': [], 'another worker': []}
+    complete = leaked = 0
+    for stream in streams:
+        got = {stream.contents[message_id]: arrived for message_id, arrived in stream.received.items()}
+        expected = {content for content, (_, _, internal) in sent.items() if stream.is_admin or not internal}
+        complete += expected <= set(got)
+        leaked += sum(1 for content in got if content in sent and sent[content][2] and not stream.is_admin)
+        for content, arrived in got.items():
+            if content in sent:
+                sent_at, path, _ = sent[content]
+                latencies[path].append((arrived - sent_at) * 1000)
+
+    print(f'Streams with every message they may see: {complete}/{len(streams)}')
+    print(f'Internal messages delivered to client streams: {leaked}')
+    for path, values in latencies.items():
+        if values:
+            print(f'Median latency, written by {path}: {median(values):.0f} ms ({len(values)} deliveries)')
+    print(f'Poller queries: {poller_queries[0]} in {elapsed:.1f}s ({poller_queries[0] / elapsed:.1f}/s)')
+
+    server.shutdown()
+    sys.exit(0 if complete == len(streams) and not leaked else 1)
+
+
+if __name__ == '__main__':
+    main()
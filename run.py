@@ -69,6 +69,205 @@ def seed_demo():
     click.echo('Demo data seeded successfully!')
 
 
+@app.cli.command('import-leads')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--allow-duplicates', is_flag=True, help='Import rows whose phone/email already exist')
+@click.option('--batch-size', default=1000, help='Rows per INSERT batch')
+def import_leads(path, allow_duplicates, batch_size):
+    """Bulk import leads from a CSV or XLSX file"""
+    from app.utils.lead_import import import_leads as run_import
+    
+    with open(path, 'rb') as f:
+        try:
+            result = run_import(f, path, skip_duplicates=not allow_duplicates, batch_size=batch_size)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    
+    for row_number, message in result['errors']:
+        click.echo(f'Row {row_number}: {message}')
+    click.echo(f"Imported {result['imported']} leads, skipped {result['skipped']} rows.")
+
+
+@app.cli.command('sweep-callbacks')
+@click.option('--loop', is_flag=True, help='Keep running, sweeping every --interval seconds')
+@click.option('--interval', default=300, help='Seconds between sweeps when looping')
+def sweep_callbacks(loop, interval):
+    """Mark missed lead callbacks and refresh daily callback stats"""
+    import time
+    from app.utils.callback_queue import run_sweep
+    
+    while True:
+        days = run_sweep()
+        click.echo(f'Swept missed callbacks on {len(days)} day(s).')
+        if not loop:
+            break
+        time.sleep(interval)
+
+
+@app.cli.command('rebuild-revenue-facts')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), help='Only rebuild days from this date')
+def rebuild_revenue(since):
+    """Recompute the daily revenue fact table from payments and assignments"""
+    from app.utils.revenue_facts import rebuild_revenue_facts
+    
+    count = rebuild_revenue_facts(since.date() if since else None)
+    click.echo(f'Wrote {count} revenue fact rows.')
+
+
+@app.cli.command('reconcile-payments')
+@click.option('--fix', is_flag=True, help='Rewrite mismatched balances from the transaction ledger')
+def reconcile_payments(fix):
+    """Check every payment balance against its transactions"""
+    from app.utils.payment_ledger import reconcile_payments as run_reconcile
+    
+    mismatches = run_reconcile(fix=fix)
+    for m in mismatches:
+        click.echo(f"Payment {m['payment_id']} (project {m['project_id']}): "
+                   f"paid {m['amount_paid']} vs ledger {m['ledger_total']}, "
+                   f"pending {m['pending_balance']} vs {m['expected_pending']}")
+    if not mismatches:
+        click.echo('All payments match their ledgers.')
+    elif fix:
+        click.echo(f'Fixed {len(mismatches)} payments.')
+    else:
+        raise SystemExit(1)
+
+
+@app.cli.command('import-payments')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=500, help='Payments applied per transaction')
+def import_payments(path, batch_size):
+    """Apply payments from a CSV (payment_id or project_id, amount, payment_mode, invoice_ref, date)"""
+    from app.utils.payment_ledger import import_payments as run_import
+    
+    with open(path, 'rb') as f:
+        result = run_import(f, batch_size=batch_size)
+    
+    for row_number, message in result['errors']:
+        click.echo(f'Row {row_number}: {message}')
+    click.echo(f"Imported {result['imported']} payments, skipped {result['skipped']} rows.")
+
+
+@app.cli.command('payout-run')
+@click.option('--period', default=None, help='Month as YYYY-MM (defaults to the current month)')
+@click.option('--workers', default=None, type=int, help='PDF worker processes (defaults to CPU count)')
+def payout_run(period, workers):
+    """Compute developer payouts and render every statement for a month"""
+    from app.utils.payouts import run_payouts, current_period, period_bounds
+    
+    period = period or current_period()
+    try:
+        period_bounds(period)
+    except ValueError:
+        raise click.BadParameter('Use YYYY-MM.', param_hint='--period')
+    
+    statements, paths = run_payouts(period, workers=workers)
+    for statement in statements:
+        click.echo(f"{statement['developer_name']}: earned {statement['earned']:,.2f}, "
+                   f"paid {statement['paid']:,.2f}, due {statement['outstanding']:,.2f} "
+                   f"-> {paths[statement['developer_id']]}")
+    click.echo(f'{len(statements)} statements for {period}.')
+
+
+@app.cli.command('gc-uploads')
+@click.option('--dry-run', is_flag=True, help='List orphaned files without deleting them')
+def gc_uploads(dry_run):
+    """Delete uploads no longer referenced by any avatar, cover image, KYC or project document"""
+    from app.utils.file_store import collect_garbage
+    
+    report = collect_garbage(dry_run=dry_run)
+    for path in report['deleted']:
+        click.echo(f"{'Would delete' if dry_run else 'Deleted'} {path}")
+    click.echo(f"{len(report['deleted'])} orphaned files, {report['freed_bytes'] / 1024 / 1024:.1f} MB; "
+               f"{report['fixed_rows']} reference counts corrected.")
+
+
+@app.cli.command('migrate-uploads')
+@click.option('--to', 'backend', default='s3', type=click.Choice(['local', 's3']), help='Backend to copy uploads into')
+@click.option('--workers', default=8, help='Parallel transfers')
+@click.option('--overwrite', is_flag=True, help='Copy files that already exist in the target')
+def migrate_uploads(backend, workers, overwrite):
+    """Copy every upload from the current storage backend into another one"""
+    from app.utils.storage import create_storage, migrate_files
+    from app.utils.file_store import FOLDER_REFERENCES
+    
+    source = create_storage(app.config)
+    target = create_storage(app.config, backend)
+    prefixes = [f'{folder}/' for folder in list(FOLDER_REFERENCES) + ['portfolios']]
+    copied, skipped, errors = migrate_files(source, target, prefixes, workers=workers, overwrite=overwrite)
+    for key, error in errors:
+        click.echo(f'Failed {key}: {error}')
+    click.echo(f'{copied} copied, {skipped} already present, {len(errors)} failed.')
+    if errors:
+        raise SystemExit(1)
+
+
+@app.cli.command('generate-image-variants')
+@click.option('--folder', type=click.Choice(['avatars', 'articles']), help='Only this upload folder')
+@click.option('--workers', default=4, help='Parallel renders')
+@click.option('--force', is_flag=True, help='Re-render variants that already exist')
+def generate_image_variants(folder, workers, force):
+    """Render resized variants for existing avatars and article covers"""
+    from app.utils.images import backfill_variants, variants_enabled
+    
+    if not variants_enabled(folder or 'avatars'):
+        click.echo('Pillow is not installed; image variants are disabled.')
+        raise SystemExit(1)
+    images, written = backfill_variants([folder] if folder else None, workers=workers, force=force)
+    click.echo(f'{images} images checked, {written} variants written.')
+
+
+@app.cli.command('kyc-precheck')
+@click.option('--recheck', is_flag=True, help='Re-run checks on every document, not just unchecked ones')
+@click.option('--workers', default=None, type=int, help='Worker processes (default: one per CPU)')
+def kyc_precheck(recheck, workers):
+    """Run automated checks on KYC documents and score them for review"""
+    from app.utils.kyc_checks import run_prechecks
+    
+    checked = run_prechecks(recheck=recheck, workers=workers)
+    click.echo(f'Checked {checked} KYC documents.')
+
+
+@app.cli.command('reconcile-counters')
+def reconcile_counters():
+    """Rewrite developer and client profile stats that drifted from their source rows (run nightly)"""
+    from app.utils.counters import reconcile_counters as run_reconcile
+    
+    fixed = run_reconcile()
+    for table, count in fixed.items():
+        click.echo(f'{table}: {count} rows corrected.')
+
+
+@app.cli.command('run-reminders')
+@click.option('--loop', is_flag=True, help='Keep running, dispatching at the start of every --interval')
+@click.option('--interval', default=60, help='Seconds between dispatcher ticks when looping')
+@click.option('--transport', type=click.Choice(['smtp', 'webhook', 'log']), help='Override NOTIFICATION_TRANSPORT')
+def run_reminders(loop, interval, transport):
+    """Send reminders for upcoming appointments and lead callbacks"""
+    import time
+    from app.utils.notifications import create_transport
+    from app.utils.reminders import dispatch_reminders
+    
+    backend = create_transport(app.config, transport)
+    while True:
+        started = time.monotonic()
+        try:
+            result = dispatch_reminders(transport=backend)
+        except Exception as e:
+            if not loop:
+                raise
+            db.session.rollback()
+            click.echo(f'Reminder tick failed: {e}', err=True)
+        else:
+            click.echo(f"{result['due']} due, {result['claimed']} claimed, "
+                       f"{result['sent']}/{result['messages']} messages sent.")
+        finally:
+            db.session.remove()
+        if not loop:
+            break
+        time.sleep(max(0, interval - (time.monotonic() - started)))
+
+
 if __name__ == '__main__':
     import os
     port = int(os.environ.get('PORT', 5000))
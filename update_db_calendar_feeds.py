@@ -0,0 +1,42 @@
+import sqlite3
+import os
+
+# Database path (adjust if running from different location)
+DB_PATH = os.path.join('instance', 'asan_devnest.db')
+
+def update_db():
+    if not os.path.exists(DB_PATH):
+        print(f"Error: Database not found at {DB_PATH}")
+        return None
+
+    print(f"Connecting to database at {DB_PATH}...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Feed ETags sum the per-appointment revision counter
+        try:
+            print("Adding revision column...")
+            cursor.execute("ALTER TABLE appointments ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+            print("Success.")
+        except sqlite3.OperationalError as e:
+            if "duplicate column" in str(e):
+                print("Column revision already exists.")
+            else:
+                print(f"Error adding revision: {e}")
+
+        # Client calendar feeds look up appointments by client
+        print("Creating appointment client index...")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_appointments_client_id ON appointments (client_id)")
+
+        conn.commit()
+        print("Database updated successfully.")
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    update_db()
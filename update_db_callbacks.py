@@ -0,0 +1,66 @@
+import sqlite3
+import os
+
+# Database path (adjust if running from different location)
+DB_PATH = os.path.join('instance', 'asan_devnest.db')
+
+def update_db():
+    if not os.path.exists(DB_PATH):
+        print(f"Error: Database not found at {DB_PATH}")
+        return None
+
+    print(f"Connecting to database at {DB_PATH}...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Add callback_status column
+        try:
+            print("Adding callback_status column...")
+            cursor.execute("ALTER TABLE lead_follow_ups ADD COLUMN callback_status VARCHAR(20)")
+            print("Success.")
+        except sqlite3.OperationalError as e:
+            if "duplicate column" in str(e):
+                print("Column callback_status already exists.")
+            else:
+                print(f"Error adding callback_status: {e}")
+
+        print("Creating due-queue index...")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS ix_follow_ups_callback_due "
+            "ON lead_follow_ups (callback_datetime, created_by)"
+        )
+
+        print("Creating callback_daily_stats table...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS callback_daily_stats (
+                id INTEGER PRIMARY KEY,
+                day DATE NOT NULL,
+                user_id INTEGER REFERENCES users (id),
+                scheduled INTEGER,
+                completed INTEGER,
+                missed INTEGER,
+                updated_at DATETIME,
+                CONSTRAINT unique_callback_day_user UNIQUE (day, user_id)
+            )
+        """)
+
+        # Existing callbacks start out pending; the sweeper marks old ones missed
+        print("Backfilling callback status...")
+        cursor.execute(
+            "UPDATE lead_follow_ups SET callback_status = 'pending' "
+            "WHERE callback_datetime IS NOT NULL AND callback_status IS NULL"
+        )
+        print(f"Updated {cursor.rowcount} follow-ups.")
+
+        conn.commit()
+        print("Database updated successfully.")
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    update_db()
@@ -0,0 +1,37 @@
+import sqlite3
+import os
+
+# Database path (adjust if running from different location)
+DB_PATH = os.path.join('instance', 'asan_devnest.db')
+
+INDEXES = [
+    ('ix_developer_profiles_articles_count', 'developer_profiles', 'articles_count'),
+    ('ix_developer_profiles_rating', 'developer_profiles', 'rating'),
+]
+
+def update_db():
+    if not os.path.exists(DB_PATH):
+        print(f"Error: Database not found at {DB_PATH}")
+        return None
+
+    print(f"Connecting to database at {DB_PATH}...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        print("Creating indexes...")
+        for name, table, column in INDEXES:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})")
+
+        conn.commit()
+        # Counters that drifted before this change are rewritten by `flask reconcile-counters`
+        print("Database updated successfully. Run `flask reconcile-counters` to fix existing stats.")
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    update_db()
@@ -0,0 +1,60 @@
+import sqlite3
+import os
+
+# Database path (adjust if running from different location)
+DB_PATH = os.path.join('instance', 'asan_devnest.db')
+
+COLUMNS = [
+    ('check_status', "VARCHAR(20) DEFAULT 'pending'"),
+    ('detected_type', 'VARCHAR(20)'),
+    ('image_width', 'INTEGER'),
+    ('image_height', 'INTEGER'),
+    ('sharpness', 'FLOAT'),
+    ('perceptual_hash', 'VARCHAR(16)'),
+    ('page_count', 'INTEGER'),
+    ('duplicate_of_id', 'INTEGER REFERENCES kyc_documents (id)'),
+    ('confidence', 'FLOAT'),
+    ('check_notes', 'TEXT'),
+    ('checked_at', 'DATETIME'),
+]
+
+def update_db():
+    if not os.path.exists(DB_PATH):
+        print(f"Error: Database not found at {DB_PATH}")
+        return None
+
+    print(f"Connecting to database at {DB_PATH}...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        for name, definition in COLUMNS:
+            try:
+                print(f"Adding {name} column...")
+                cursor.execute(f"ALTER TABLE kyc_documents ADD COLUMN {name} {definition}")
+                print("Success.")
+            except sqlite3.OperationalError as e:
+                if "duplicate column" in str(e):
+                    print(f"Column {name} already exists.")
+                else:
+                    print(f"Error adding {name}: {e}")
+
+        print("Creating indexes...")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_kyc_documents_perceptual_hash ON kyc_documents (perceptual_hash)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_kyc_documents_confidence ON kyc_documents (confidence)")
+
+        # Existing documents are picked up by `flask kyc-precheck`
+        cursor.execute("UPDATE kyc_documents SET check_status = 'pending' WHERE check_status IS NULL")
+        print(f"{cursor.rowcount} documents queued for pre-checks.")
+
+        conn.commit()
+        print("Database updated successfully.")
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    update_db()
@@ -0,0 +1,58 @@
+import sqlite3
+import os
+
+from app.utils.lead_dedup import match_keys
+
+# Database path (adjust if running from different location)
+DB_PATH = os.path.join('instance', 'asan_devnest.db')
+
+def update_db():
+    if not os.path.exists(DB_PATH):
+        print(f"Error: Database not found at {DB_PATH}")
+        return None
+
+    print(f"Connecting to database at {DB_PATH}...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # Add dedup columns
+        for column, col_type in [('phone_normalized', 'VARCHAR(20)'),
+                                 ('email_normalized', 'VARCHAR(120)'),
+                                 ('match_key', 'VARCHAR(50)')]:
+            try:
+                print(f"Adding {column} column...")
+                cursor.execute(f"ALTER TABLE leads ADD COLUMN {column} {col_type}")
+                print("Success.")
+            except sqlite3.OperationalError as e:
+                if "duplicate column" in str(e):
+                    print(f"Column {column} already exists.")
+                else:
+                    print(f"Error adding {column}: {e}")
+
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS ix_leads_{column} ON leads ({column})")
+
+        # Backfill keys for existing leads
+        print("Backfilling dedup keys...")
+        rows = cursor.execute("SELECT id, student_name, phone, email, college FROM leads").fetchall()
+        updates = []
+        for lead_id, name, phone, email, college in rows:
+            keys = match_keys(name, phone, email, college)
+            updates.append((keys['phone_normalized'], keys['email_normalized'], keys['match_key'], lead_id))
+        cursor.executemany(
+            "UPDATE leads SET phone_normalized = ?, email_normalized = ?, match_key = ? WHERE id = ?",
+            updates
+        )
+        print(f"Updated {len(updates)} leads.")
+
+        conn.commit()
+        print("Database updated successfully.")
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    update_db()
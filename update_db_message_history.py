@@ -0,0 +1,73 @@
+import sqlite3
+import os
+import re
+
+# Database path (adjust if running from different location)
+DB_PATH = os.path.join('instance', 'asan_devnest.db')
+
+def update_db():
+    if not os.path.exists(DB_PATH):
+        print(f"Error: Database not found at {DB_PATH}")
+        return None
+
+    print(f"Connecting to database at {DB_PATH}...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # History pages and cursors key on created_at; legacy rows without one
+        # take their project's creation time (or now) so keyset paging reaches them
+        print("Backfilling missing message timestamps...")
+        cursor.execute("""
+            UPDATE project_messages
+            SET created_at = COALESCE(
+                (SELECT projects.created_at FROM projects WHERE projects.id = project_messages.project_id),
+                CURRENT_TIMESTAMP
+            )
+            WHERE created_at IS NULL
+        """)
+        print(f"{cursor.rowcount} messages backfilled.")
+
+        # SQLite cannot add NOT NULL to an existing column, so rebuild the table
+        # from its own definition with created_at tightened, then restore indexes
+        columns = {row[1]: row for row in cursor.execute("PRAGMA table_info(project_messages)")}
+        if not columns['created_at'][3]:
+            print("Rebuilding project_messages with created_at NOT NULL...")
+            table_sql = cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'project_messages'"
+            ).fetchone()[0]
+            index_sql = [row[0] for row in cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' "
+                "AND tbl_name = 'project_messages' AND sql IS NOT NULL"
+            )]
+            new_sql, count = re.subn(r'(\bcreated_at\s+DATETIME)\b(?!\s+NOT NULL)',
+                                     r'\1 NOT NULL', table_sql, count=1, flags=re.IGNORECASE)
+            if not count:
+                raise RuntimeError("could not find the created_at column definition")
+            new_sql = new_sql.replace('project_messages', 'project_messages_new', 1)
+            column_list = ', '.join(columns)
+
+            cursor.execute(new_sql)
+            cursor.execute(f"INSERT INTO project_messages_new ({column_list}) "
+                           f"SELECT {column_list} FROM project_messages")
+            cursor.execute("DROP TABLE project_messages")
+            cursor.execute("ALTER TABLE project_messages_new RENAME TO project_messages")
+            for sql in index_sql:
+                cursor.execute(sql)
+            print("project_messages rebuilt.")
+
+        print("Creating project message history index...")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_project_messages_history "
+                       "ON project_messages (project_id, created_at, id)")
+
+        conn.commit()
+        print("Database updated successfully.")
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    update_db()
@@ -0,0 +1,31 @@
+import sqlite3
+import os
+
+# Database path (adjust if running from different location)
+DB_PATH = os.path.join('instance', 'asan_devnest.db')
+
+def update_db():
+    if not os.path.exists(DB_PATH):
+        print(f"Error: Database not found at {DB_PATH}")
+        return None
+
+    print(f"Connecting to database at {DB_PATH}...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # The reminder dispatcher scans upcoming appointments across all developers
+        print("Creating appointment start time index...")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_appointments_scheduled_at ON appointments (scheduled_at)")
+
+        conn.commit()
+        print("Database updated successfully.")
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    update_db()